@@ -28,7 +28,7 @@ target_metadata = Base.metadata
 
 
 def get_url():
-    return settings.database_config.DB_CONFIG[0]
+    return settings.database_config.DB_CONFIG
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,100 @@
+"""Partition service_auth_tokens by created
+
+Revision ID: 07574152aea8
+Revises: 3b836d28601f
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '07574152aea8'
+down_revision: Union[str, None] = '3b836d28601f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Daily partitions, kept in sync with the AuthTokenPartitions defaults.
+PARTITION_RETENTION_DAYS = 7
+PARTITION_PREMAKE = 7
+
+
+def upgrade() -> None:
+    op.rename_table('service_auth_tokens', 'service_auth_tokens_legacy')
+    op.drop_index('ix_service_auth_tokens_secret', table_name='service_auth_tokens_legacy')
+    op.execute('ALTER TABLE service_auth_tokens_legacy RENAME CONSTRAINT service_auth_tokens_pkey TO service_auth_tokens_legacy_pkey')
+    op.execute('ALTER TABLE service_auth_tokens_legacy RENAME CONSTRAINT service_auth_tokens_user_id_fkey TO service_auth_tokens_legacy_user_id_fkey')
+
+    op.create_table('service_auth_tokens',
+    sa.Column('secret', sa.String(length=64), nullable=False),
+    sa.Column('expiration', sa.DateTime(), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Uuid(), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['service_users.id'], ),
+    sa.PrimaryKeyConstraint('created', 'id'),
+    postgresql_partition_by='RANGE (created)'
+    )
+    op.create_index(op.f('ix_service_auth_tokens_secret'), 'service_auth_tokens', ['secret'], unique=False)
+    op.execute('CREATE TABLE service_auth_tokens_default PARTITION OF service_auth_tokens DEFAULT')
+
+    today = datetime.now(timezone.utc).date()
+    for offset in range(-PARTITION_RETENTION_DAYS, PARTITION_PREMAKE + 1):
+        start = today + timedelta(days=offset)
+        end = start + timedelta(days=1)
+        op.execute(
+            f"CREATE TABLE service_auth_tokens_p{start:%Y%m%d} PARTITION OF service_auth_tokens "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    op.create_table('service_auth_token_lookup',
+    sa.Column('secret', sa.String(length=64), nullable=False),
+    sa.Column('token_id', sa.UUID(), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('secret')
+    )
+    op.create_index(op.f('ix_service_auth_token_lookup_created'), 'service_auth_token_lookup', ['created'], unique=False)
+
+    # Tokens older than the retention window have long expired, so only the
+    # rows that fit into the new partitions are carried over.
+    cutoff = (today - timedelta(days=PARTITION_RETENTION_DAYS)).isoformat()
+    op.execute(
+        "INSERT INTO service_auth_tokens (secret, expiration, created, user_id, id) "
+        "SELECT secret, expiration, created, user_id, id FROM service_auth_tokens_legacy "
+        f"WHERE created >= '{cutoff}'"
+    )
+    op.execute(
+        "INSERT INTO service_auth_token_lookup (secret, token_id, created) "
+        "SELECT secret, id, created FROM service_auth_tokens"
+    )
+    op.drop_table('service_auth_tokens_legacy')
+
+
+def downgrade() -> None:
+    op.rename_table('service_auth_tokens', 'service_auth_tokens_partitioned')
+
+    op.create_table('service_auth_tokens',
+    sa.Column('secret', sa.String(length=64), nullable=False),
+    sa.Column('expiration', sa.DateTime(), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Uuid(), nullable=True),
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['service_users.id'], name='service_auth_tokens_legacy_user_id_fkey'),
+    sa.PrimaryKeyConstraint('id', name='service_auth_tokens_legacy_pkey')
+    )
+    op.execute(
+        "INSERT INTO service_auth_tokens (secret, expiration, created, user_id, id) "
+        "SELECT secret, expiration, created, user_id, id FROM service_auth_tokens_partitioned"
+    )
+
+    op.drop_index(op.f('ix_service_auth_token_lookup_created'), table_name='service_auth_token_lookup')
+    op.drop_table('service_auth_token_lookup')
+    op.drop_index(op.f('ix_service_auth_tokens_secret'), table_name='service_auth_tokens_partitioned')
+    op.drop_table('service_auth_tokens_partitioned')
+
+    op.execute('ALTER TABLE service_auth_tokens RENAME CONSTRAINT service_auth_tokens_legacy_pkey TO service_auth_tokens_pkey')
+    op.execute('ALTER TABLE service_auth_tokens RENAME CONSTRAINT service_auth_tokens_legacy_user_id_fkey TO service_auth_tokens_user_id_fkey')
+    op.create_index(op.f('ix_service_auth_tokens_secret'), 'service_auth_tokens', ['secret'], unique=True)
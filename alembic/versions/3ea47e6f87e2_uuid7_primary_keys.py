@@ -0,0 +1,53 @@
+"""UUIDv7 primary key defaults
+
+Revision ID: 3ea47e6f87e2
+Revises: 07574152aea8
+Create Date: 2026-10-19 13:00:00.000000
+
+Existing rows keep their uuid4 ids: they are exposed through the API, and
+both versions share the uuid column type, so only new rows are time-ordered.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3ea47e6f87e2'
+down_revision: Union[str, None] = '07574152aea8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('service_users', 'service_teams', 'service_auth_tokens')
+
+
+def upgrade() -> None:
+    op.execute("""
+    CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+        SELECT encode(
+            set_bit(
+                set_bit(
+                    overlay(
+                        uuid_send(gen_random_uuid())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                        FROM 1 FOR 6
+                    ),
+                    52, 1
+                ),
+                53, 1
+            ),
+            'hex'
+        )::uuid
+    $$ LANGUAGE sql VOLATILE
+    """)
+
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=sa.text('uuid_generate_v7()'))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=None)
+
+    op.execute('DROP FUNCTION IF EXISTS uuid_generate_v7()')
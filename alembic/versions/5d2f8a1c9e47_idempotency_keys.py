@@ -0,0 +1,37 @@
+"""Idempotency keys
+
+Revision ID: 5d2f8a1c9e47
+Revises: 3ea47e6f87e2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '5d2f8a1c9e47'
+down_revision: Union[str, None] = '3ea47e6f87e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('service_idempotency_keys',
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('headers', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('body', sa.LargeBinary(), nullable=True),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('path', 'key')
+    )
+    op.create_index(op.f('ix_service_idempotency_keys_created'), 'service_idempotency_keys', ['created'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_service_idempotency_keys_created'), table_name='service_idempotency_keys')
+    op.drop_table('service_idempotency_keys')
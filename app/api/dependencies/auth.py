@@ -1,23 +1,51 @@
 import logging
-from fastapi import HTTPException
+import math
+from typing import Annotated
 
+from fastapi import Depends, HTTPException, Request
+
+from app.config import settings
 from app.schemas.auth import Signup, LoginArgs
 from app.models.user import User
 from app.crud.user import get_user_by_username, get_user_by_email
 from app.errors import Abort
-from app.utils.auth import verify_password, is_protected_username, utc_now
+from app.utils.auth import verify_and_update_password, is_protected_username, utc_now
+from app.utils.rate_limit import TokenBucketLimiter
+from app.utils.tracing import traced
 
 from .user import CurrentUserDep
 from .core import DBSessionDep
 
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+login_ip_limiter = TokenBucketLimiter(
+    "login_ip",
+    settings.login_throttle.ip_per_minute / 60,
+    settings.login_throttle.ip_burst,
+    settings.login_throttle.max_keys,
+    settings.login_throttle.shards,
+)
+login_email_limiter = TokenBucketLimiter(
+    "login_email",
+    settings.login_throttle.email_per_minute / 60,
+    settings.login_throttle.email_burst,
+    settings.login_throttle.max_keys,
+    settings.login_throttle.shards,
+)
+availability_limiter = TokenBucketLimiter(
+    "availability_ip",
+    settings.availability.ip_per_minute / 60,
+    settings.availability.ip_burst,
+    settings.availability.max_keys,
+)
 
 
 async def validate_is_authenticated(current_user: CurrentUserDep) -> User:
     return current_user
 
 
+@traced()
 async def validate_signup(signup: Signup, db_session: DBSessionDep) -> Signup:
     """
     Validates the signup data' user.
@@ -33,38 +61,91 @@ async def validate_signup(signup: Signup, db_session: DBSessionDep) -> Signup:
         HTTPException: If the username is invalid, already exists,
             or if the email already exists.
     """
-    logging.debug(f"Validating signup data: {signup}")
+    logger.debug("Validating signup data for username: %s", signup.username)
     if is_protected_username(signup.username):
-        logging.debug(f"Invalid username detected: {signup.username}")
+        logger.debug("Invalid username detected: %s", signup.username)
         raise HTTPException(status_code=400, detail="Invalid username")
 
     if await get_user_by_username(db_session, signup.username):
-        logging.debug(f"Username already exists: {signup.username}")
+        logger.debug("Username already exists: %s", signup.username)
         raise HTTPException(status_code=400, detail="Username already exists")
 
     if await get_user_by_email(db_session, signup.email):
-        logging.debug(f"Email already    exists: {signup.email}")
+        logger.debug("Email already exists: %s", signup.email)
         raise HTTPException(status_code=400, detail="Email already exists")
 
     return signup
 
 
-async def validate_login(login: LoginArgs, db_session: DBSessionDep) -> User:
+async def throttle_login(login: LoginArgs, request: Request) -> LoginArgs:
+    """
+    Rate limit login attempts per client IP and per email.
+
+    Runs before any DB lookup or bcrypt work, so a client retrying in a
+    loop is turned away for the price of two dict lookups. Behind a load
+    balancer listed in ``settings.server.forwarded_allow_ips``, the client
+    IP is the one it forwards in ``X-Forwarded-For``.
+
+    :raise:
+        HTTPException: 429 with ``Retry-After`` when either bucket is empty.
+    """
+    if not settings.login_throttle.enabled:
+        return login
+
+    client = request.client.host if request.client else "unknown"
+    retry_after = login_ip_limiter.hit(client) or login_email_limiter.hit(login.email.lower())
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+    return login
+
+
+async def throttle_availability(request: Request) -> None:
+    """
+    Rate limit availability checks per client IP.
+
+    The endpoint needs no login, so without a limit it would tell anyone
+    which emails have an account, as fast as they can ask.
+
+    :raise:
+        HTTPException: 429 with ``Retry-After`` when the bucket is empty.
+    """
+    client = request.client.host if request.client else "unknown"
+    retry_after = availability_limiter.hit(client)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many availability checks",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
+@traced()
+async def validate_login(login: Annotated[LoginArgs, Depends(throttle_login)], db_session: DBSessionDep) -> User:
     if not (user := await get_user_by_email(db_session, login.email)):
         raise HTTPException(status_code=401, detail="user-not-found")
 
-    if not verify_password(login.password, user.hashed_password):
+    verified, new_hash = verify_and_update_password(login.password, user.hashed_password)
+    if not verified:
         raise Abort("auth", "invalid-password")
 
+    if new_hash is not None:
+        # Stored with an older scheme or cost, upgrade it while we have the plain password.
+        user.hashed_password = new_hash
+        await db_session.commit()
+
     return user
 
 
+@traced()
 def validate_password_reset(
         current_user: CurrentUserDep
 ) -> User:
     if current_user.password_reset_expire:
-
-        print(utc_now(), current_user.password_reset_expire)
         if utc_now() > current_user.password_reset_expire:
             raise Abort("auth", "reset-valid")
 
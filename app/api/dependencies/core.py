@@ -1,7 +1,50 @@
 from typing import Annotated
-from fastapi import Depends
+from fastapi import Depends, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.constants import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, MSGPACK_MEDIA_TYPES
 from app.database import get_db_session
 
 DBSessionDep = Annotated[AsyncSession, Depends(get_db_session)]
+
+
+def get_response_media_type(accept: Annotated[str | None, Header()] = None) -> str:
+    """
+    Pick the response media type from the Accept header.
+
+    MessagePack is only used when the client asks for it and does not
+    prefer JSON, so missing, wildcard and unknown Accept headers keep
+    getting JSON. At equal quality the explicit msgpack type wins over a
+    wildcard but not over application/json.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+
+    json_quality = wildcard_quality = msgpack_quality = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type == JSON_MEDIA_TYPE:
+            json_quality = max(json_quality, quality)
+        elif media_type in ("application/*", "*/*"):
+            wildcard_quality = max(wildcard_quality, quality)
+
+    if msgpack_quality > json_quality and msgpack_quality >= wildcard_quality:
+        return MSGPACK_MEDIA_TYPE
+
+    return JSON_MEDIA_TYPE
+
+
+ResponseMediaTypeDep = Annotated[str, Depends(get_response_media_type)]
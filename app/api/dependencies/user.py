@@ -9,8 +9,11 @@ from app.crud.user import get_user_by_email, get_admin_user_by_email
 from app.schemas.auth import TokenData
 from app.services.auth import get_access_token, get_email_from_token_payload
 from app.errors import credentials_exception
+from app.utils.timing import phase
+from app.utils.tracing import traced
 
 
+@traced()
 async def get_current_user(token: Annotated[str, Depends(get_access_token)], db_session: DBSessionDep) -> models.User:
     try:
         email = get_email_from_token_payload(token)
@@ -18,7 +21,8 @@ async def get_current_user(token: Annotated[str, Depends(get_access_token)], db_
     except PyJWTError as e:
         raise credentials_exception
 
-    user = await get_user_by_email(db_session, token_data.email)
+    with phase("user"):
+        user = await get_user_by_email(db_session, token_data.email)
     if user is None:
         raise credentials_exception
 
@@ -28,6 +32,7 @@ async def get_current_user(token: Annotated[str, Depends(get_access_token)], db_
 CurrentUserDep = Annotated[models.User, Depends(get_current_user)]
 
 
+@traced()
 async def get_admin_user(token: Annotated[str, Depends(get_access_token)], db_session: DBSessionDep) -> models.User:
     try:
         email = get_email_from_token_payload(token)
@@ -35,7 +40,8 @@ async def get_admin_user(token: Annotated[str, Depends(get_access_token)], db_se
     except PyJWTError as e:
         raise credentials_exception
 
-    user = await get_admin_user_by_email(db_session, token_data.email)
+    with phase("user"):
+        user = await get_admin_user_by_email(db_session, token_data.email)
     if user is None:
         raise credentials_exception
 
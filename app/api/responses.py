@@ -0,0 +1,183 @@
+import functools
+from datetime import datetime, timezone
+from typing import Any, Iterable, Sequence
+from uuid import UUID
+
+import msgpack
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from app.config import settings
+from app.constants import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from app.models.team import Team
+from app.models.user import User
+from app.schemas.team import UserResponse
+from app.utils.timing import timed
+
+# OpenAPI entry for endpoints that negotiate MessagePack through the Accept header.
+MSGPACK_RESPONSES = {200: {"content": {MSGPACK_MEDIA_TYPE: {}}}}
+# Headers of the responses whose format depends on the Accept header, so that caches keep one per format.
+NEGOTIATED_HEADERS = {"Vary": "Accept"}
+
+MSGPACK_EPOCH = datetime(1970, 1, 1)
+
+
+def msgpack_default(value: Any) -> Any:
+    """
+    Encode the types msgpack does not know about.
+
+    UUIDs become 16 raw bytes instead of a 36 character string, and
+    datetimes, which are naive UTC in our models, use the 4 to 12 byte
+    msgpack timestamp extension. Both are called once per value, so they
+    avoid the slower ``ExtType`` and ``Timestamp.from_datetime`` helpers.
+    """
+    if isinstance(value, UUID):
+        return value.bytes
+
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        delta = value - MSGPACK_EPOCH
+        return msgpack.Timestamp(delta.days * 86400 + delta.seconds, delta.microseconds * 1000)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not msgpack serializable")
+
+
+def orjson_default(value: Any) -> Any:
+    """
+    Encode the UUID subclasses orjson does not know about.
+
+    orjson only handles exact ``uuid.UUID`` instances, while asyncpg returns
+    its own subclass for every uuid column, ORM attributes included.
+    """
+    if isinstance(value, UUID):
+        return str(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def msgpack_loads(data: bytes) -> Any:
+    """
+    Decode a msgpack response body, with timestamps as UTC datetimes.
+
+    UUID fields stay 16 byte strings, ``UUID(bytes=...)`` turns them back.
+    """
+    return msgpack.unpackb(data, timestamp=3)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    @timed("serialize")
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=msgpack_default)
+
+
+class RowsResponse(ORJSONResponse):
+    """
+    ORJSONResponse for payloads built from raw database values.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ModelResponse(Response):
+    """
+    Render an already validated Pydantic model straight to JSON bytes.
+
+    Returning a ``Response`` makes FastAPI skip the ``response_model``
+    validation, so the model is validated once, when it is built, and then
+    serialized by pydantic-core without a ``jsonable_encoder`` round trip.
+    """
+    media_type = JSON_MEDIA_TYPE
+
+    @timed("serialize")
+    def render(self, content: BaseModel | list[BaseModel]) -> bytes:
+        return to_json(content)
+
+
+@timed("serialize")
+def model_response(model: BaseModel, media_type: str = JSON_MEDIA_TYPE) -> Response:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return MsgPackResponse(model.model_dump(), headers=NEGOTIATED_HEADERS)
+
+    return ModelResponse(model, headers=NEGOTIATED_HEADERS)
+
+
+def team_member_payload(user: User) -> dict[str, Any]:
+    return {"id": user.id, "username": user.username, "surname": None}
+
+
+def team_payload(team: Team) -> dict[str, Any]:
+    return {
+        "id": team.id,
+        "name": team.name,
+        "created": team.created,
+        "users": [team_member_payload(user) for user in team.users],
+    }
+
+
+@timed("serialize")
+def team_response(team: Team, media_type: str = JSON_MEDIA_TYPE) -> Response:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return MsgPackResponse(team_payload(team), headers=NEGOTIATED_HEADERS)
+
+    return RowsResponse(team_payload(team), headers=NEGOTIATED_HEADERS)
+
+
+@functools.cache
+def list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+@functools.cache
+def response_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+@timed("serialize")
+def rows_payload(model: type[BaseModel], rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+    """
+    Turn rows selected in the field order of ``model`` into response dicts.
+    """
+    fields = response_fields(model)
+    return [dict(zip(fields, row)) for row in rows]
+
+
+@timed("serialize")
+def team_rows_payload(rows: Iterable[tuple]) -> list[dict[str, Any]]:
+    return [
+        {"id": id, "name": name, "created": created, "users": rows_payload(UserResponse, users)}
+        for id, name, created, users in rows
+    ]
+
+
+@timed("serialize")
+def list_response(
+        model: type[BaseModel],
+        content: list[dict[str, Any]],
+        media_type: str = JSON_MEDIA_TYPE,
+) -> Response:
+    """
+    Serialize a whole list of response dicts in one pass.
+
+    The rows come from our own database, so with ``settings.trusted_output``
+    they are not validated against ``model`` again and go straight to orjson
+    or msgpack. Otherwise the list is validated and dumped by a cached
+    ``TypeAdapter``.
+    """
+    if not settings.trusted_output:
+        adapter = list_adapter(model)
+        content = adapter.validate_python(content)
+
+        if media_type != MSGPACK_MEDIA_TYPE:
+            return Response(adapter.dump_json(content), media_type=JSON_MEDIA_TYPE, headers=NEGOTIATED_HEADERS)
+
+        content = adapter.dump_python(content)
+
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return MsgPackResponse(content, headers=NEGOTIATED_HEADERS)
+
+    return RowsResponse(content, headers=NEGOTIATED_HEADERS)
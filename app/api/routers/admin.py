@@ -0,0 +1,202 @@
+import asyncio
+import time
+import tracemalloc
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+
+from app.api.dependencies.user import CurrentAdminDep
+from app.schemas.admin import ProfileInfo, ProfileFormat, ProfilingWindowArgs, ProfilingWindowStatus, \
+    MemoryTracingArgs, MemoryStatus, MemorySnapshotInfo, MemoryModuleStats, MemoryModuleDiff
+from app.services import memory, profiling
+from app.utils import workers
+
+
+async def single_worker(current_admin: CurrentAdminDep) -> None:
+    """
+    Profiles, the profiling window and memory snapshots live in one worker
+    process, which the next request may not reach when there are several.
+    """
+    if workers.sibling_workers():
+        raise HTTPException(
+            status_code=409,
+            detail="Profiling and memory tracing need a single worker, start the server with --workers 1",
+        )
+
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(single_worker)],
+    responses={404: {"description": "Not found"}}
+)
+
+
+def window_status() -> ProfilingWindowStatus:
+    window = profiling.window
+    if window is None or window.until <= time.monotonic():
+        return ProfilingWindowStatus(active=False)
+
+    return ProfilingWindowStatus(
+        active=True,
+        percent=window.percent,
+        seconds_left=round(window.until - time.monotonic(), 1),
+        directory=str(window.directory),
+    )
+
+
+def memory_status() -> MemoryStatus:
+    traced, peak = tracemalloc.get_traced_memory()
+    return MemoryStatus(
+        tracing=tracemalloc.is_tracing(),
+        traced=traced,
+        peak=peak,
+        snapshots=[
+            MemorySnapshotInfo.model_validate(snapshot, from_attributes=True)
+            for snapshot in memory.snapshots.values()
+        ],
+    )
+
+
+def get_memory_snapshot(snapshot_id: int) -> memory.MemorySnapshot:
+    if (snapshot := memory.snapshots.get(snapshot_id)) is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+
+    return snapshot
+
+
+@router.get(
+    "/profiles",
+    response_model=list[ProfileInfo]
+)
+async def list_profiles(current_admin: CurrentAdminDep):
+    return [ProfileInfo.model_validate(profile, from_attributes=True) for profile in reversed(profiling.profiles)]
+
+
+@router.get(
+    "/profiles/{profile_id}"
+)
+async def get_profile(profile_id: int, current_admin: CurrentAdminDep, format: ProfileFormat = "text"):
+    """
+    Return a stored request profile.
+
+    ``text`` is the pstats report sorted by cumulative time, ``pstats`` the
+    binary stats file and ``collapsed`` the stacks for flamegraph.pl or
+    speedscope.
+    """
+    if (profile := profiling.get_profile(profile_id)) is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "pstats":
+        return Response(
+            profiling.as_pstats(profile),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.pstats"'},
+        )
+
+    if format == "collapsed":
+        return PlainTextResponse(profiling.as_collapsed(profile))
+
+    return PlainTextResponse(profiling.as_text(profile))
+
+
+@router.get(
+    "/profiling",
+    response_model=ProfilingWindowStatus
+)
+async def get_profiling_window(current_admin: CurrentAdminDep):
+    return window_status()
+
+
+@router.post(
+    "/profiling",
+    response_model=ProfilingWindowStatus
+)
+async def start_profiling_window(args: ProfilingWindowArgs, current_admin: CurrentAdminDep):
+    profiling.start_window(args.percent, args.seconds)
+    return window_status()
+
+
+@router.delete(
+    "/profiling",
+    response_model=ProfilingWindowStatus
+)
+async def stop_profiling_window(current_admin: CurrentAdminDep):
+    profiling.stop_window()
+    return window_status()
+
+
+@router.get(
+    "/memory",
+    response_model=MemoryStatus
+)
+async def get_memory_status(current_admin: CurrentAdminDep):
+    return memory_status()
+
+
+@router.post(
+    "/memory/start",
+    response_model=MemoryStatus
+)
+async def start_memory_tracing(args: MemoryTracingArgs, current_admin: CurrentAdminDep):
+    memory.start(args.frames)
+    return memory_status()
+
+
+@router.post(
+    "/memory/stop",
+    response_model=MemoryStatus
+)
+async def stop_memory_tracing(current_admin: CurrentAdminDep):
+    memory.stop()
+    return memory_status()
+
+
+@router.post(
+    "/memory/snapshots",
+    response_model=MemorySnapshotInfo
+)
+async def take_memory_snapshot(current_admin: CurrentAdminDep):
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=400, detail="Memory tracing is not started")
+
+    snapshot = await asyncio.to_thread(memory.take_snapshot)
+    return MemorySnapshotInfo.model_validate(snapshot, from_attributes=True)
+
+
+@router.get(
+    "/memory/snapshots/{snapshot_id}/top",
+    response_model=list[MemoryModuleStats]
+)
+async def get_memory_top(
+        snapshot_id: int,
+        current_admin: CurrentAdminDep,
+        depth: int = 2,
+        prefix: str = "",
+        limit: int = 20,
+):
+    """
+    Allocated memory in a snapshot grouped by module, e.g. ``app.crud``,
+    ``app.schemas`` or ``sqlalchemy.orm`` with the default ``depth`` of 2.
+    """
+    snapshot = get_memory_snapshot(snapshot_id)
+    return await asyncio.to_thread(memory.top, snapshot, depth, prefix, limit)
+
+
+@router.get(
+    "/memory/diff",
+    response_model=list[MemoryModuleDiff]
+)
+async def get_memory_diff(
+        old: int,
+        new: int,
+        current_admin: CurrentAdminDep,
+        depth: int = 2,
+        prefix: str = "",
+        limit: int = 20,
+):
+    """
+    Memory growth per module between two snapshots, the largest change first.
+    """
+    old_snapshot, new_snapshot = get_memory_snapshot(old), get_memory_snapshot(new)
+    return await asyncio.to_thread(memory.diff, old_snapshot, new_snapshot, depth, prefix, limit)
@@ -6,15 +6,16 @@ from fastapi import APIRouter, Depends, Request, HTTPException
 
 from app.schemas.auth import TokenData
 from app.api.dependencies.core import DBSessionDep
-from app.api.dependencies.auth import validate_signup, validate_login, validate_is_authenticated
-from app.schemas.auth import Signup, Token, TokenInfo
-from app.crud.user import create_user, get_user_by_email
+from app.api.dependencies.auth import validate_signup, validate_login, validate_is_authenticated, throttle_availability
+from app.schemas.auth import Availability, Signup, Token, TokenInfo
+from app.crud.user import create_user, get_user_by_email, is_email_available, is_username_available
 from app.crud.auth import create_auth_token
 from app.models.user import User
 from app.constants import REFRESH_TOKEN_TYPE
 from app.services.auth import create_access_token, create_refresh_token, get_token_payload, validate_token_type
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
+logger = logging.getLogger(__name__)
 
 
 @router.post(
@@ -26,7 +27,7 @@ async def signup(
         db_session: DBSessionDep,
         signup: Signup = Depends(validate_signup),
 ):
-    logging.debug(f"Signup request received with username: {signup.username}, email: {signup.email}")
+    logger.debug("Signup request received with username: %s, email: %s", signup.username, signup.email)
     user = await create_user(db_session, signup)
 
     await create_auth_token(db_session, user)
@@ -41,6 +42,30 @@ async def signup(
     return TokenInfo(access_token=access_token, refresh_token=refresh_token)
 
 
+@router.get(
+    "/availability",
+    summary="Username and email availability",
+    response_model=Availability,
+    dependencies=[Depends(throttle_availability)],
+)
+async def availability(
+        db_session: DBSessionDep,
+        username: str | None = None,
+        email: str | None = None,
+):
+    """
+    Check whether a username and an email can still be used to sign up.
+
+    Meant for the signup form to call as the user types; most free values
+    are answered from memory. The signup itself still checks. Rate
+    limited per client IP, like the logins.
+    """
+    return Availability(
+        username=None if username is None else await is_username_available(db_session, username),
+        email=None if email is None else await is_email_available(db_session, email),
+    )
+
+
 @router.post(
     "/login",
     summary="Login"
@@ -94,8 +119,6 @@ async def auth_refresh_token(
     dependencies=[Depends(validate_is_authenticated)],
 )
 async def logout(request: Request):
-    access_token = request.session.get("access_token")
-    print(f"{access_token}")
     del request.session["access_token"]
     del request.session["refresh_token"]
     return "Logout successful"
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+
+from app.schemas.health import Liveness, Readiness
+from app.services.health import readiness
+
+router = APIRouter(tags=["health"])
+
+
+@router.get(
+    "/healthz",
+    response_model=Liveness
+)
+async def healthz():
+    """
+    Liveness: the process and its event loop answer, without any I/O.
+    """
+    return Liveness()
+
+
+@router.get(
+    "/readyz",
+    response_model=Readiness,
+    responses={503: {"model": Readiness}}
+)
+async def readyz():
+    """
+    Readiness: warmed up, Postgres reachable (cached check), pool not saturated and not draining.
+    """
+    result = await readiness()
+    if result.status != "ready":
+        return ORJSONResponse(result.model_dump(mode="json"), status_code=503)
+
+    return result
@@ -0,0 +1,23 @@
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.config import settings
+from app.metrics import CONTENT_TYPE, render_metrics
+from app.utils import workers
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    The metrics of this worker or, with several workers, of all of them.
+    """
+    if workers.sibling_workers():
+        body = await asyncio.to_thread(render_metrics, settings.metrics.directory)
+    else:
+        body = render_metrics()
+
+    return Response(body, media_type=CONTENT_TYPE)
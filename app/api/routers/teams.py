@@ -5,11 +5,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.dependencies.user import CurrentUserDep
 
-from app.api.dependencies.core import DBSessionDep
-from app.schemas.team import TeamCreate, TeamResponse, TeamUpdate, AddUserToTheTeam, UserResponse, \
+from app.api.dependencies.core import DBSessionDep, ResponseMediaTypeDep
+from app.api.responses import ModelResponse, team_response, team_rows_payload, list_response, MSGPACK_RESPONSES
+from app.schemas.team import TeamCreate, TeamResponse, TeamUpdate, AddUserToTheTeam, \
     AddUserToTeamByUsername, RemoveTeam, RemoveUserFromTheTeam, GetTeam, RemoveCurrentUserFromTheTeam
 from app.crud.team import create_team, update_team, add_user_to_the_team, remove_user_from_the_team, \
-    add_user_to_team_by_username, delete_team, get_team, get_all_teams, remove_current_user_from_the_team
+    add_user_to_team_by_username, delete_team, get_team, get_all_team_rows, remove_current_user_from_the_team
 
 logger = logging.getLogger(__name__)
 
@@ -30,8 +31,7 @@ async def create_team_endpoint(
         db_session: DBSessionDep
 ):
     new_team = await create_team(db_session, team)
-    print("GOOOOD")
-    return new_team
+    return ModelResponse(new_team)
 
 
 @router.put(
@@ -46,7 +46,7 @@ async def update_team_endpoint(
     logger.info(f"Received update request for team: {team_update_data.dict()}")
     updated_team = await update_team(db_session, team_update_data)
     logger.info(f"Successfully updated team: {updated_team}")
-    return updated_team
+    return ModelResponse(updated_team)
 
 
 @router.patch(
@@ -59,12 +59,7 @@ async def add_user_in_the_team(
         db_session: DBSessionDep
 ):
     team = await add_user_to_the_team(db_session, current_user, info_for_update)
-    return TeamResponse(
-        id=str(team.id),
-        name=team.name,
-        created=team.created,
-        users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
-    )
+    return team_response(team)
 
 
 @router.post(
@@ -77,12 +72,7 @@ async def add_user_to_team_by_username_endpoint(
         db_session: DBSessionDep
 ):
     team = await add_user_to_team_by_username(db_session, info)
-    return TeamResponse(
-        id=str(team.id),
-        name=team.name,
-        created=team.created,
-        users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
-    )
+    return team_response(team)
 
 
 @router.patch(
@@ -95,12 +85,7 @@ async def remove_user_from_the_team_endpoint(
         db_session: DBSessionDep
 ):
     team = await remove_user_from_the_team(db_session, current_user, info_for_update)
-    return TeamResponse(
-        id=str(team.id),
-        name=team.name,
-        created=team.created,
-        users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
-    )
+    return team_response(team)
 
 
 @router.patch(
@@ -113,12 +98,7 @@ async def remove_user_from_the_team_endpoint(
         db_session: DBSessionDep
 ):
     team = await remove_current_user_from_the_team(db_session, info_for_update)
-    return TeamResponse(
-        id=str(team.id),
-        name=team.name,
-        created=team.created,
-        users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
-    )
+    return team_response(team)
 
 
 @router.delete(
@@ -135,37 +115,31 @@ async def delete_team_endpoint(
 
 @router.get(
     "/team/{team_name}",
-    response_model=TeamResponse
+    response_model=TeamResponse,
+    responses=MSGPACK_RESPONSES,
 )
 async def get_team_endpoint(
         current_user: CurrentUserDep,
         team_name: str,
-        db_session: DBSessionDep
+        db_session: DBSessionDep,
+        media_type: ResponseMediaTypeDep,
 ):
     team = await get_team(db_session, team_name)
     logger.info(f"Team details: ID={team.id}, Name={team.name}, Created={team.created}")
     for user in team.users:
         logger.info(f"User in team: ID={user.id}, Username={user.username}")
-    return TeamResponse(
-        id=str(team.id),
-        name=team.name,
-        created=team.created,
-        users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
-    )
+    return team_response(team, media_type)
 
 
 @router.get(
     "/teams",
-    response_model=List[TeamResponse]
+    response_model=List[TeamResponse],
+    responses=MSGPACK_RESPONSES,
 )
 async def get_all_teams_endpoint(
         current_user: CurrentUserDep,
-        db_session: DBSessionDep
+        db_session: DBSessionDep,
+        media_type: ResponseMediaTypeDep,
 ):
-    teams = await get_all_teams(db_session)
-    return [TeamResponse(
-        id=str(team.id),
-        name=team.name,
-        created=team.created,
-        users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
-    ) for team in teams]
+    teams = await get_all_team_rows(db_session)
+    return list_response(TeamResponse, team_rows_payload(teams), media_type)
@@ -3,9 +3,10 @@ from typing import Annotated, List
 
 from app.api.dependencies.auth import validate_is_authenticated, validate_password_reset
 from app.api.dependencies.user import CurrentUserDep, CurrentAdminDep
-from app.api.dependencies.core import DBSessionDep
+from app.api.dependencies.core import DBSessionDep, ResponseMediaTypeDep
+from app.api.responses import list_response, rows_payload, model_response, MSGPACK_RESPONSES
 from app.crud.user import update_user_profile, create_password_token, create_new_password, delete_user, \
-    delete_user_by_username, get_all_users
+    delete_user_by_username, get_all_user_rows
 from app.schemas.team import UserResponse
 from app.schemas.user import User, AuthorizedUser, UpdateProfile, ResetPasswordArgs, UserDeleteResponse, DeleteUser
 
@@ -18,26 +19,25 @@ router = APIRouter(
 
 @router.get(
     "/",
-    response_model=List[UserResponse]
+    response_model=List[UserResponse],
+    responses=MSGPACK_RESPONSES,
 )
 async def get_all_users_endpoint(
         current_user: CurrentUserDep,
-        db_session: DBSessionDep
+        db_session: DBSessionDep,
+        media_type: ResponseMediaTypeDep,
 ):
-    users = await get_all_users(db_session)
-    return [UserResponse(
-        id=str(user.id),
-        username=user.username,
-        surname=user.surname
-    ) for user in users]
+    users = await get_all_user_rows(db_session)
+    return list_response(UserResponse, rows_payload(UserResponse, users), media_type)
 
 
 @router.get(
     "/me",
-    response_model=AuthorizedUser
+    response_model=AuthorizedUser,
+    responses=MSGPACK_RESPONSES,
 )
-async def user_details(current_user: CurrentUserDep):
-    return current_user
+async def user_details(current_user: CurrentUserDep, media_type: ResponseMediaTypeDep):
+    return model_response(AuthorizedUser.model_validate(current_user, from_attributes=True), media_type)
 
 
 @router.patch(
@@ -99,10 +99,11 @@ async def delete_user_me(
 
 @router.get(
     "/admin",
-    response_model=AuthorizedUser
+    response_model=AuthorizedUser,
+    responses=MSGPACK_RESPONSES,
 )
-async def user_details(current_admin: CurrentAdminDep):
-    return current_admin
+async def user_details(current_admin: CurrentAdminDep, media_type: ResponseMediaTypeDep):
+    return model_response(AuthorizedUser.model_validate(current_admin, from_attributes=True), media_type)
 
 
 @router.delete(
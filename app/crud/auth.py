@@ -1,12 +1,26 @@
+import logging
+import re
+from sqlalchemy import select, insert, delete, text
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import timedelta
+from datetime import date, datetime, timedelta
 
+from app.config import settings
 from app.models import User as DBModelUser
-from app.models import AuthToken
+from app.models import AuthToken, auth_token_lookup
 from app.services.auth import new_token
 from app.utils.auth import utc_now
+from app.utils.timing import timed
 
+logger = logging.getLogger(__name__)
 
+PARTITION_EPOCH = date(1970, 1, 1)
+PARTITION_NAME_RE = re.compile(rf"^{AuthToken.__tablename__}_p(\d{{8}})$")
+DEFAULT_PARTITION = f"{AuthToken.__tablename__}_default"
+# Advisory lock held by the partition maintenance transactions, so that the workers take turns.
+PARTITION_LOCK_KEY = 0x5A17_0001
+
+
+@timed("crud")
 async def create_auth_token(db_session: AsyncSession, user: DBModelUser) -> AuthToken:
     now = utc_now()
 
@@ -20,9 +34,131 @@ async def create_auth_token(db_session: AsyncSession, user: DBModelUser) -> Auth
     )
 
     db_session.add(token)
+    await db_session.flush()
+
+    await db_session.execute(
+        insert(auth_token_lookup).values(secret=token.secret, token_id=token.id, created=token.created)
+    )
     await db_session.commit()
 
     return token
 
 
+@timed("crud")
+async def get_auth_token_by_secret(db_session: AsyncSession, secret: str) -> AuthToken | None:
+    """
+    Fetch an auth token by its secret.
+
+    The global lookup table resolves the secret to the token's ``created``
+    value, which lets Postgres prune the search down to a single partition.
+    """
+    created = select(auth_token_lookup.c.created).where(auth_token_lookup.c.secret == secret).scalar_subquery()
+
+    stmt = select(AuthToken).where(AuthToken.secret == secret, AuthToken.created == created)
+    result = await db_session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+def partition_start(day: date, interval_days: int = settings.auth_token_partitions.interval_days) -> date:
+    return day - timedelta(days=(day - PARTITION_EPOCH).days % interval_days)
+
+
+def partition_name(start: date) -> str:
+    return f"{AuthToken.__tablename__}_p{start:%Y%m%d}"
+
+
+async def lock_partitions(db_session: AsyncSession) -> None:
+    """
+    Wait for the other workers' partition maintenance, until the end of the transaction.
+    """
+    await db_session.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+
+
+async def create_auth_token_partitions(
+        db_session: AsyncSession,
+        now: datetime | None = None,
+        premake: int = settings.auth_token_partitions.premake,
+        interval_days: int = settings.auth_token_partitions.interval_days,
+) -> list[str]:
+    """
+    Create the current partition and ``premake`` partitions ahead of it.
+
+    Tokens of a new partition's range that landed in the default partition
+    in the meantime, which would make creating it fail, are moved into it.
+
+    :returns: The names of the partitions that are now guaranteed to exist.
+    """
+    await lock_partitions(db_session)
+    start = partition_start((now or utc_now()).date(), interval_days)
+    names = []
 
+    for _ in range(premake + 1):
+        end = start + timedelta(days=interval_days)
+        name = partition_name(start)
+        if await db_session.scalar(text("SELECT to_regclass(:name) IS NULL"), {"name": name}):
+            await create_auth_token_partition(db_session, name, start, end)
+        names.append(name)
+        start = end
+
+    await db_session.commit()
+    return names
+
+
+async def create_auth_token_partition(db_session: AsyncSession, name: str, start: date, end: date) -> None:
+    parent = AuthToken.__tablename__
+    await db_session.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = await db_session.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created >= :start AND created < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": start, "end": end})
+    await db_session.execute(text(
+        f"ALTER TABLE {parent} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+    if moved.rowcount:
+        logger.warning(f"Moved {moved.rowcount} auth tokens from {DEFAULT_PARTITION} into the new partition {name}")
+
+
+async def drop_expired_auth_token_partitions(
+        db_session: AsyncSession,
+        now: datetime | None = None,
+        retention_days: int = settings.auth_token_partitions.retention_days,
+        interval_days: int = settings.auth_token_partitions.interval_days,
+) -> list[str]:
+    """
+    Drop every partition whose whole range is older than the retention window.
+
+    Dropping a partition is a metadata operation, so expired tokens go away
+    without row by row deletes and the vacuum work that follows them.
+
+    :returns: The names of the dropped partitions.
+    """
+    await lock_partitions(db_session)
+    cutoff = (now or utc_now()).date() - timedelta(days=retention_days)
+
+    result = await db_session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass)"
+    ), {"parent": AuthToken.__tablename__})
+
+    dropped, dropped_until = [], None
+    for name in sorted(result.scalars().all()):
+        if not (match := PARTITION_NAME_RE.match(name)):
+            continue
+
+        end = datetime.strptime(match.group(1), "%Y%m%d").date() + timedelta(days=interval_days)
+        if end <= cutoff:
+            await db_session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+            dropped_until = max(dropped_until or end, end)
+
+    if dropped_until:
+        await db_session.execute(
+            delete(auth_token_lookup).where(
+                auth_token_lookup.c.created < datetime.combine(dropped_until, datetime.min.time())
+            )
+        )
+
+    await db_session.commit()
+    return dropped
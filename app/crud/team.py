@@ -1,4 +1,6 @@
 import logging
+from collections import defaultdict
+from sqlalchemy import null
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import  selectinload
 from sqlalchemy.future import select
@@ -8,13 +10,17 @@ from typing import List
 from uuid import UUID
 from app.models.user import User
 from app.models.team import Team
+from app.models.association import user_team_association
 from app.models import User as DBModelUser
 from app.schemas.team import TeamCreate, TeamResponse, TeamUpdate, AddUserToTheTeam, RemoveUserFromTheTeam, \
     AddUserToTeamByUsername, RemoveTeam, GetTeam, RemoveCurrentUserFromTheTeam
 from app.utils.auth import utc_now
+from app.utils.single_flight import coalesced
+from app.utils.timing import timed
 from app.crud.user import get_user_by_username
 
 
+@timed("crud")
 async def create_team(db_session: AsyncSession, team_data: TeamCreate) -> TeamResponse:
     stmt_existing_team = select(Team).where(Team.name == team_data.name)
     existing_team = await db_session.execute(stmt_existing_team)
@@ -47,6 +53,7 @@ async def create_team(db_session: AsyncSession, team_data: TeamCreate) -> TeamRe
     return team_response
 
 
+@timed("crud")
 async def update_team(db_session: AsyncSession, team_data: TeamUpdate) -> TeamResponse:
     stmt = select(Team).where(Team.name == team_data.name).options(
         selectinload(Team.users)
@@ -87,6 +94,7 @@ async def update_team(db_session: AsyncSession, team_data: TeamUpdate) -> TeamRe
     return team_response
 
 
+@timed("crud")
 async def add_user_to_the_team(db_session: AsyncSession, user: DBModelUser, info_for_update: AddUserToTheTeam) -> Team:
     stmt = select(Team).where(Team.name == info_for_update.name).options(
         selectinload(Team.users)
@@ -107,6 +115,7 @@ async def add_user_to_the_team(db_session: AsyncSession, user: DBModelUser, info
     return team
 
 
+@timed("crud")
 async def add_user_to_team_by_username(db_session: AsyncSession, info: AddUserToTeamByUsername) -> Team:
     stmt = select(Team).where(Team.name == info.name).options(selectinload(Team.users))
     result = await db_session.execute(stmt)
@@ -131,6 +140,7 @@ async def add_user_to_team_by_username(db_session: AsyncSession, info: AddUserTo
     return team
 
 
+@timed("crud")
 async def remove_user_from_the_team(db_session: AsyncSession, user: DBModelUser, info_for_update: RemoveUserFromTheTeam) -> Team:
     stmt = select(Team).where(Team.name == info_for_update.name).options(
         selectinload(Team.users)
@@ -151,6 +161,7 @@ async def remove_user_from_the_team(db_session: AsyncSession, user: DBModelUser,
     return team
 
 
+@timed("crud")
 async def remove_current_user_from_the_team(db_session: AsyncSession, info_for_update: RemoveCurrentUserFromTheTeam) -> Team:
     stmt = select(Team).where(Team.name == info_for_update.name).options(
         selectinload(Team.users)
@@ -173,6 +184,7 @@ async def remove_current_user_from_the_team(db_session: AsyncSession, info_for_u
     return team
 
 
+@timed("crud")
 async def delete_team(db_session: AsyncSession, team_name: RemoveTeam) -> None:
     stmt = select(Team).where(Team.name == team_name.name)
     result = await db_session.execute(stmt)
@@ -185,6 +197,8 @@ async def delete_team(db_session: AsyncSession, team_name: RemoveTeam) -> None:
     await db_session.commit()
 
 
+@timed("crud")
+@coalesced("get_team")
 async def get_team(db_session: AsyncSession, team_name: str) -> Team:
     stmt = select(Team).where(Team.name == team_name).options(selectinload(Team.users))
     result = await db_session.execute(stmt)
@@ -196,9 +210,30 @@ async def get_team(db_session: AsyncSession, team_name: str) -> Team:
     return team
 
 
+@timed("crud")
 async def get_all_teams(db_session: AsyncSession) -> List[Team]:
     stmt = select(Team).options(selectinload(Team.users))
     result = await db_session.execute(stmt)
     teams = result.scalars().all()
 
     return teams
+
+
+@timed("crud")
+async def get_all_team_rows(db_session: AsyncSession) -> list[tuple]:
+    """
+    Select the columns of the team list response without building ORM instances.
+
+    :returns: ``(id, name, created, users)`` tuples, where ``users`` are
+        ``(id, username, surname)`` rows of the team members.
+    """
+    teams = (await db_session.execute(select(Team.id, Team.name, Team.created))).all()
+
+    stmt = select(user_team_association.c.team_id, User.id, User.username, null()).join(
+        User, User.id == user_team_association.c.user_id
+    )
+    users_by_team = defaultdict(list)
+    for team_id, *user in (await db_session.execute(stmt)).all():
+        users_by_team[team_id].append(user)
+
+    return [(*team, users_by_team[team.id]) for team in teams]
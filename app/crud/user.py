@@ -1,8 +1,8 @@
 import logging
-from typing import List
+from typing import List, Sequence
 
 from fastapi import HTTPException
-from sqlalchemy import select, func
+from sqlalchemy import select, func, exists, Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from datetime import timedelta
@@ -10,13 +10,17 @@ from datetime import timedelta
 from app.models import User as DBModelUser
 from app.schemas.auth import Signup
 from app.schemas.user import UpdateProfile, ResetPasswordArgs, DeleteUser
+from app.metrics import availability_checks
 from app.utils.auth import hash_password, utc_now, is_protected_username, verify_password
+from app.utils.timing import timed
 from app.services.auth import new_token
+from app.services.availability import availability_index
 
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
 
 
+@timed("crud")
 async def get_all_users(db_session: AsyncSession) -> List[DBModelUser]:
 
     stmt = select(DBModelUser)
@@ -26,6 +30,19 @@ async def get_all_users(db_session: AsyncSession) -> List[DBModelUser]:
     return users
 
 
+@timed("crud")
+async def get_all_user_rows(db_session: AsyncSession) -> Sequence[Row]:
+    """
+    Select only the columns of the user list response.
+
+    Plain rows skip building ORM instances and their identity map entries.
+    """
+    stmt = select(DBModelUser.id, DBModelUser.username, DBModelUser.surname)
+    result = await db_session.execute(stmt)
+    return result.all()
+
+
+@timed("crud")
 async def get_user(db_session: AsyncSession, user_id: int):
     user = (await db_session.execute(select(DBModelUser).where(DBModelUser.id == user_id))).first()
 
@@ -34,6 +51,7 @@ async def get_user(db_session: AsyncSession, user_id: int):
     return user
 
 
+@timed("crud")
 async def get_user_by_username(db_session: AsyncSession, username: str) -> DBModelUser | None:
     stmt = select(DBModelUser).options(
         selectinload(DBModelUser.teams)).filter(
@@ -43,6 +61,7 @@ async def get_user_by_username(db_session: AsyncSession, username: str) -> DBMod
     return result.scalar_one_or_none()
 
 
+@timed("crud")
 async def get_user_by_email(db_session: AsyncSession, email: str):
     stmt = select(DBModelUser).options(
         selectinload(DBModelUser.teams)).filter(
@@ -52,6 +71,33 @@ async def get_user_by_email(db_session: AsyncSession, email: str):
     return result.scalar_one_or_none()
 
 
+async def is_available(db_session: AsyncSession, field: str, value: str) -> bool:
+    """
+    Check that no user has ``value`` as username or email, case-insensitively.
+
+    Values the availability filter has not seen are free without a query.
+    """
+    if not availability_index.might_be_taken(field, value):
+        availability_checks.inc(field, "filtered")
+        return True
+
+    column = DBModelUser.username if field == "username" else DBModelUser.email
+    taken = await db_session.scalar(select(exists().where(func.lower(column) == value.lower())))
+    availability_checks.inc(field, "taken" if taken else "false_positive")
+    return not taken
+
+
+@timed("crud")
+async def is_username_available(db_session: AsyncSession, username: str) -> bool:
+    return not is_protected_username(username) and await is_available(db_session, "username", username)
+
+
+@timed("crud")
+async def is_email_available(db_session: AsyncSession, email: str) -> bool:
+    return await is_available(db_session, "email", email)
+
+
+@timed("crud")
 async def get_admin_user_by_email(db_session: AsyncSession, email: str):
     stmt = select(DBModelUser).options(
         selectinload(DBModelUser.teams)).filter(
@@ -62,6 +108,7 @@ async def get_admin_user_by_email(db_session: AsyncSession, email: str):
     return result.scalar_one_or_none()
 
 
+@timed("crud")
 async def create_user(db_session: AsyncSession, signup: Signup) -> DBModelUser:
     password_hash = hash_password(signup.password)
     activation_token = new_token()
@@ -77,34 +124,44 @@ async def create_user(db_session: AsyncSession, signup: Signup) -> DBModelUser:
 
     db_session.add(user)
     await db_session.commit()
+    availability_index.add(username=user.username, email=user.email)
 
     return user
 
 
+@timed("crud")
 async def update_user_profile(db_session: AsyncSession, current_user: DBModelUser, profile_update: UpdateProfile):
+    old_username, old_email = current_user.username, current_user.email
+
     if profile_update.username:
         if is_protected_username(profile_update.username):
-            logging.debug(f"Invalid username detected: {profile_update.username}")
+            logger.debug("Invalid username detected: %s", profile_update.username)
             raise HTTPException(status_code=400, detail="Invalid username")
 
         if await get_user_by_username(db_session, profile_update.username):
-            logging.debug(f"Username already exists: {profile_update.username}")
+            logger.debug("Username already exists: %s", profile_update.username)
             raise HTTPException(status_code=400, detail="Username already exists")
 
         current_user.username = profile_update.username
 
     if profile_update.email:
         if await get_user_by_email(db_session, profile_update.email):
-            logging.debug(f"Email already    exists: {profile_update.email}")
+            logger.debug("Email already exists: %s", profile_update.email)
             raise HTTPException(status_code=400, detail="Email already exists")
 
         current_user.email = profile_update.email
 
     await db_session.commit()
+    availability_index.add(username=profile_update.username, email=profile_update.email)
+    availability_index.discard(
+        username=old_username if profile_update.username else None,
+        email=old_email if profile_update.email else None,
+    )
 
     return current_user
 
 
+@timed("crud")
 async def create_password_token(db_session: AsyncSession, user: DBModelUser):
     user.password_reset_expire = utc_now() + timedelta(hours=1)
     user.password_reset_token = new_token()
@@ -115,8 +172,9 @@ async def create_password_token(db_session: AsyncSession, user: DBModelUser):
     return user
 
 
+@timed("crud")
 async def create_new_password(db_session: AsyncSession, user: DBModelUser, reset_password_args: ResetPasswordArgs):
-    if verify_password(hash_password(reset_password_args.old_password), user.hashed_password):
+    if verify_password(reset_password_args.old_password, user.hashed_password):
         user.hashed_password = hash_password(reset_password_args.password)
         user.password_reset_expire = None
         user.password_reset_token = None
@@ -128,15 +186,18 @@ async def create_new_password(db_session: AsyncSession, user: DBModelUser, reset
 
 
 
+@timed("crud")
 async def delete_user(db_session: AsyncSession, user: DBModelUser) -> bool:
     if user:
         await db_session.delete(user)
         await db_session.commit()
+        availability_index.discard(username=user.username, email=user.email)
         return True
     else:
         return False
 
 
+@timed("crud")
 async def delete_user_by_username(db_session: AsyncSession, username: DeleteUser) -> bool:
     stmt = select(DBModelUser).filter(func.lower(DBModelUser.username) == username.username.lower())
     result = await db_session.execute(stmt)
@@ -147,4 +208,5 @@ async def delete_user_by_username(db_session: AsyncSession, username: DeleteUser
 
     await db_session.delete(user)
     await db_session.commit()
+    availability_index.discard(username=user.username, email=user.email)
     return True
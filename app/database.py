@@ -1,6 +1,11 @@
-from typing import AsyncIterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
 import contextlib
+import logging
+import time
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
@@ -9,14 +14,61 @@ from sqlalchemy.ext.asyncio import (
     AsyncEngine,
 )
 
+from app.config import Server, settings
+from app.utils.tracing import SPAN_KIND_CLIENT, start_span
+
+logger = logging.getLogger("app.db")
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    duration_ms: float = 0.0
+
+
+# Set per request by QueryStatsMiddleware, statements outside a request are not counted.
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """
+    Replace statement parameter values with their type names.
+
+    Keeps the shape of the parameters (mapping, sequence or a list of them
+    for executemany) so a slow query log shows what was bound, not the
+    values, which may be emails, password hashes or tokens.
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return [redact_parameters(params) for params in parameters]
+
+        return [type(value).__name__ for value in parameters]
+
+    return type(parameters).__name__
+
 
 class DatabaseSessionManager:
     def __init__(self):
         self._sessionmaker: async_sessionmaker | None = None
         self._engine: AsyncEngine | None = None
 
-    def init(self, host: str, echo: bool = False):
-        self._engine = create_async_engine(host, echo=echo)
+    def init(
+            self,
+            host: str,
+            echo: bool = False,
+            slow_query_ms: float = settings.query_log.slow_query_ms,
+            pool_size: int = 5,
+            max_overflow: int = 10,
+    ):
+        self._engine = create_async_engine(host, echo=echo, pool_size=pool_size, max_overflow=max_overflow)
+        self._slow_query_ms = slow_query_ms
+
+        event.listen(self._engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self._engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(self._engine.sync_engine, "handle_error", self._handle_error)
 
         self._sessionmaker = async_sessionmaker(
             autocommit=False,
@@ -24,6 +76,53 @@ class DatabaseSessionManager:
             bind=self._engine,
         )
 
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+        context._query_span = start_span(
+            statement.split(None, 1)[0].upper() if statement else "SQL",
+            SPAN_KIND_CLIENT,
+            **{"db.system": "postgresql", "db.statement": statement},
+        )
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - context._query_started) * 1000
+        if context._query_span is not None:
+            context._query_span.end()
+
+        if (stats := query_stats.get()) is not None:
+            stats.queries += 1
+            stats.duration_ms += duration_ms
+
+        if duration_ms >= self._slow_query_ms:
+            logger.warning(
+                "Slow query %.1fms: %s",
+                duration_ms, statement,
+                extra={"parameters": redact_parameters(parameters)},
+            )
+
+    def pool_status(self) -> dict[str, int] | None:
+        """
+        Connection counts and limits of the engine pool, None before init or without a QueuePool.
+        """
+        if self._engine is None or not hasattr(self._engine.pool, "checkedout"):
+            return None
+
+        pool = self._engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        }
+
+    @staticmethod
+    def _handle_error(exception_context):
+        query_span = getattr(exception_context.execution_context, "_query_span", None)
+        if query_span is not None:
+            query_span.end(exception_context.original_exception)
+
     async def close(self):
         if self._engine is None:
             raise Exception("DatabaseSessionManager is not initialized")
@@ -61,6 +160,18 @@ class DatabaseSessionManager:
             await session.close()
 
 
+def worker_pool_size(config: Server = settings.server) -> tuple[int, int]:
+    """
+    Split the global DB connection budget between the server workers.
+
+    :returns: ``pool_size`` and ``max_overflow`` of one worker's engine, so
+        that ``workers * (pool_size + max_overflow)`` stays within the budget.
+    """
+    share = max(config.db_connection_budget // max(config.workers, 1), 1)
+    max_overflow = int(share * config.db_overflow_share)
+    return max(share - max_overflow, 1), max_overflow
+
+
 sessionmanager = DatabaseSessionManager()
 
 
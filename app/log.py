@@ -0,0 +1,159 @@
+import atexit
+import copy
+import logging
+import queue
+import sys
+import threading
+import traceback
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+from typing import IO
+
+import orjson
+
+from app.config import LogConfig, settings
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "taskName"}
+
+_writer: "LogWriter | None" = None
+
+
+class JSONLinesFormatter(logging.Formatter):
+    """
+    Format a record as one JSON object per line.
+
+    Values passed through ``extra`` (e.g. the ``access`` record of
+    AccessLogMiddleware) are added as top level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+
+        return orjson.dumps(entry, default=str).decode()
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    Put records on the log queue without formatting them.
+
+    Only the message arguments and the traceback are resolved in the
+    calling thread, because they may change or go away once the call
+    returns. The JSON formatting and the write happen in the LogWriter.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+
+        return record
+
+
+class LogWriter:
+    """
+    Background thread that drains the log queue and writes JSON lines.
+
+    It blocks until a record arrives, then takes whatever else is already
+    queued, up to ``batch_size`` records, and writes them with one
+    ``write`` and ``flush``.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, stream: IO[str], batch_size: int):
+        self.queue = log_queue
+        self.stream = stream
+        self.batch_size = batch_size
+        self.formatter = JSONLinesFormatter()
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+
+            self.write(batch)
+
+    def write(self, records: list[logging.LogRecord]) -> None:
+        if not records:
+            return
+
+        try:
+            self.stream.write("".join(self.formatter.format(record) + "\n" for record in records))
+            self.stream.flush()
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+
+
+def setup_logging(config: LogConfig = settings.logging) -> None:
+    """
+    Route all records through a queue to the background LogWriter.
+
+    Replaces the root handlers, so loggers only pay for an enqueue on the
+    calling thread. Calling it again is a no-op while the writer runs.
+
+    :param config: Log level and batch size.
+    """
+    global _writer
+    if _writer is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(LogQueueHandler(log_queue))
+    root.setLevel(config.level)
+
+    _writer = LogWriter(log_queue, sys.stdout, config.batch_size)
+    _writer.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Write the queued records and stop the LogWriter.
+    """
+    global _writer
+    if _writer is None:
+        return
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, LogQueueHandler):
+            root.removeHandler(handler)
+
+    _writer.stop()
+    _writer = None
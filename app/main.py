@@ -1,75 +1,109 @@
-import logging
-import sys
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request, status
-from starlette.middleware.sessions import SessionMiddleware
-from starlette.responses import JSONResponse
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from app.api.routers.users import router as user_router
 from app.api.routers.auth import router as auth_router
 from app.api.routers.teams import router as team_router
-from app.config import settings, config
-from app.database import sessionmanager
-
-logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if settings.log_level == "DEBUG" else logging.INFO)
-
-sessionmanager.init(settings.database_config.DB_CONFIG[0])
-root_logger = logging.getLogger("root_logger")
-
-# @asynccontextmanager
-# async def lifespan(app: FastAPI):
-#     yield
-#     if sessionmanager._engine is not None:
-#         await sessionmanager.close()
-#
-#
-# def get_application() -> FastAPI:
-#     app = FastAPI(lifespan=lifespan, title=settings.project_name, docs_url="/api/docs")
-#     app.add_middleware(SessionMiddleware, secret_key="some-random-string")
-#
-#     @app.get("/")
-#     async def root():
-#         return {"message": "Hello World"}
-#
-#     app.include_router(user_router)
-#     app.include_router(auth_router)
-#
-#     return app
-#
-#
-# app = get_application()
-
+from app.api.routers.metrics import router as metrics_router
+from app.api.routers.admin import router as admin_router
+from app.api.routers.health import router as health_router
+from app.config import settings
+from app.database import sessionmanager, worker_pool_size
+from app.log import setup_logging, shutdown_logging
+from app.metrics import run_metrics_flush
+from app.utils.tracing import setup_tracing, shutdown_tracing
+from app.middleware import AccessLogMiddleware, AdmissionControlMiddleware, IdempotencyMiddleware, \
+    ProfilingMiddleware, QueryStatsMiddleware, ServerTimingMiddleware, TimedSessionMiddleware, TracingMiddleware
+from app.services.auth import load_jwt_keys
+from app.services.availability import run_availability_refresh
+from app.services.event_loop import BlockingDetector, monitor_event_loop_lag
+from app.services.health import install_drain_handler
+from app.services.idempotency import run_idempotency_cleanup
+from app.services.memory import run_memory_dumps
+from app.services.partitions import run_auth_token_partition_maintenance
+from app.services.warmup import run_warmup
+from app.utils.workers import sibling_workers
+
+
+def get_application(database_url: str | None = None, init_db: bool = True) -> FastAPI:
+    """
+    Build the application, served by ``python -m app.server`` (see there) or
+    ``uvicorn --factory app.main:get_application`` in development.
+
+    Building it is cheap and has no side effects: the database engine, the
+    JWT keys and the background tasks are created once per process by the
+    lifespan, so importing ``app.main`` (tests, alembic, tooling) does not
+    connect anywhere or read any files. The lifespan also warms the worker
+    up (see ``app.services.warmup``) before it accepts requests.
+
+    :param database_url: Database URL, ``DB_CONFIG`` by default.
+    :param init_db: Run the lifespan; the tests set up their own database.
+    """
+    lifespan = None
 
-def get_application(settings_db: str, init_db: bool = True) -> FastAPI:
     if init_db:
-        sessionmanager.init(settings_db)
-
         @asynccontextmanager
         async def lifespan(app: FastAPI):
+            setup_logging()
+            pool_size, max_overflow = worker_pool_size()
+            sessionmanager.init(
+                database_url or settings.database_config.DB_CONFIG,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+            )
+            load_jwt_keys()
+            setup_tracing()
+            # uvicorn only starts accepting connections once the startup is complete.
+            await run_warmup(pool_size)
+            install_drain_handler()
+            partition_maintenance = asyncio.create_task(run_auth_token_partition_maintenance())
+            event_loop_monitor = asyncio.create_task(monitor_event_loop_lag())
+            memory_dumps = asyncio.create_task(run_memory_dumps())
+            availability_refresh = asyncio.create_task(run_availability_refresh())
+            idempotency_cleanup = asyncio.create_task(run_idempotency_cleanup())
+            metrics_flush = asyncio.create_task(run_metrics_flush()) if sibling_workers() else None
+            blocking_detector = None
+            if settings.monitoring.blocking_detector:
+                blocking_detector = BlockingDetector(asyncio.get_running_loop())
+                blocking_detector.start()
             yield
+            if blocking_detector is not None:
+                blocking_detector.stop()
+            if metrics_flush is not None:
+                metrics_flush.cancel()
+                await asyncio.gather(metrics_flush, return_exceptions=True)
+            idempotency_cleanup.cancel()
+            availability_refresh.cancel()
+            memory_dumps.cancel()
+            event_loop_monitor.cancel()
+            partition_maintenance.cancel()
             if sessionmanager._engine is not None:
                 await sessionmanager.close()
-
-    app = FastAPI(lifespan=lifespan, title=settings.project_name, docs_url="/api/docs")
-    app.add_middleware(SessionMiddleware, secret_key="some-random-string")
-
-    @app.middleware("http")
-    async def exception_handling(request: Request, call_next):
-        root_logger.info(
-            f"Url: {request.url}\n"
-            f"Header: {request.headers}\n"
-            f"Method: {request.method}\n"
-            f"Query params: {request.query_params}\n"
-            f"Path params: {request.path_params}\n"
-        )
-        try:
-            return await call_next(request)
-        except Exception as exc:
-            root_logger.error(str(exc), exc_info=True)
-            return JSONResponse(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                content={"detail": str(exc)},
-            )
+            shutdown_tracing()
+            shutdown_logging()
+
+    app = FastAPI(
+        lifespan=lifespan,
+        title=settings.project_name,
+        docs_url="/api/docs",
+        default_response_class=ORJSONResponse,
+    )
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(TimedSessionMiddleware, secret_key="some-random-string")
+    # Outside the session middleware, so a replay does not re-sign the session; cookies are never replayed.
+    app.add_middleware(IdempotencyMiddleware)
+
+    if settings.server_timing:
+        app.add_middleware(ServerTimingMiddleware)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(AdmissionControlMiddleware)
+    app.add_middleware(AccessLogMiddleware)
+    # Outermost, so the access log and the rate limits see the client behind the load balancer.
+    app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=settings.server.forwarded_allow_ips)
 
     @app.get("/")
     async def root():
@@ -78,32 +112,12 @@ def get_application(settings_db: str, init_db: bool = True) -> FastAPI:
     app.include_router(user_router)
     app.include_router(auth_router)
     app.include_router(team_router)
+    app.include_router(metrics_router)
+    app.include_router(admin_router)
+    app.include_router(health_router)
 
     return app
 
 
-app = get_application(settings.database_config.DB_CONFIG[0])
-
-
 def init_app(init_db=True):
-    lifespan = None
-
-    if init_db:
-        sessionmanager.init(config.DB_CONFIG)
-
-        @asynccontextmanager
-        async def lifespan(app: FastAPI):
-            yield
-            if sessionmanager._engine is not None:
-                await sessionmanager.close()
-
-    server = FastAPI(title="FastAPI server", lifespan=lifespan)
-
-    @server.get("/")
-    async def root():
-        return {"message": "Hello World"}
-
-    server.include_router(user_router)
-    server.include_router(auth_router)
-
-    return app
+    return get_application(init_db=init_db)
@@ -0,0 +1,407 @@
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+
+import orjson
+
+from app.config import Metrics, settings
+from app.database import sessionmanager
+from app.utils.workers import worker_alive, worker_id
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY: list["Metric"] = []
+
+Series = dict[tuple[str, ...], list[float]]
+
+logger = logging.getLogger(__name__)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    return "{" + ",".join(f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+class Metric:
+    """
+    Base of the metrics, registered in REGISTRY for the /metrics endpoint.
+
+    Counters and histograms are updated in per-thread shards, so recording
+    never takes a lock; the lock is only used to register a new shard and
+    the shards are merged when the metrics are rendered.
+
+    :param name: Metric name.
+    :param documentation: Help text.
+    :param labelnames: Names of the label values passed when recording.
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[dict[tuple[str, ...], list[float]]] = []
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> dict[tuple[str, ...], list[float]]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> dict[tuple[str, ...], list[float]]:
+        with self._lock:
+            shards = list(self._shards)
+
+        merged: dict[tuple[str, ...], list[float]] = {}
+        for shard in shards:
+            for labels, series in list(shard.items()):
+                total = merged.setdefault(labels, [0] * len(series))
+                for index, value in enumerate(series):
+                    total[index] += value
+
+        return merged
+
+    def series(self) -> Series:
+        """
+        The current values, as lists of numbers per label values.
+        """
+        return self._merged()
+
+    def value(self, *labels: str) -> float:
+        """
+        The value of a counter or gauge for the label values, 0 if it was never recorded.
+        """
+        return self.series().get(labels, [0])[0]
+
+    def samples(self, series: Series | None = None) -> Iterator[tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self, series: Series | None = None) -> str:
+        """
+        :param series: Values to render instead of this process' ones, e.g. those of all workers.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{name}{labels} {value}" for name, labels, value in self.samples(series))
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0]
+
+        series[0] += amount
+
+    def samples(self, series: Series | None = None) -> Iterator[tuple[str, str, float]]:
+        for labels, values in (self.series() if series is None else series).items():
+            yield self.name, format_labels(self.labelnames, labels), values[0]
+
+
+class Histogram(Metric):
+    """
+    Cumulative histogram of observations, one series per label values.
+
+    :param buckets: Upper bounds of the buckets, in ascending order.
+    """
+    type = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self._shard()
+        # Bucket counts, then the +Inf count, then the sum.
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def collect(self, series: Series | None = None) -> Iterator[tuple[tuple[str, ...], list[int], float]]:
+        """
+        Merge the shards.
+
+        :returns: Label values, cumulative bucket counts (the last one is
+            +Inf, i.e. the total count) and the sum, per series.
+        """
+        for labels, values in (self.series() if series is None else series).items():
+            counts, cumulative = [], 0
+            for count in values[:-1]:
+                cumulative += count
+                counts.append(cumulative)
+            yield labels, counts, values[-1]
+
+    def samples(self, series: Series | None = None) -> Iterator[tuple[str, str, float]]:
+        labelnames = self.labelnames + ("le",)
+        for labels, counts, total in self.collect(series):
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                yield self.name + "_bucket", format_labels(labelnames, labels + (str(bound),)), count
+            yield self.name + "_count", format_labels(self.labelnames, labels), counts[-1]
+            yield self.name + "_sum", format_labels(self.labelnames, labels), total
+
+
+class Gauge(Metric):
+    """
+    Current value, either set directly or read from ``callback`` at render time.
+
+    :param callback: Returns the value per label values, e.g. ``{(): 3}``.
+    """
+    type = "gauge"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            callback: Callable[[], dict[tuple[str, ...], float]] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def series(self) -> Series:
+        values = self.callback() if self.callback is not None else dict(self._values)
+        return {labels: [value] for labels, value in values.items()}
+
+    def samples(self, series: Series | None = None) -> Iterator[tuple[str, str, float]]:
+        # The series read from several workers end with the worker id.
+        labelnames = self.labelnames + ("worker",)
+        for labels, values in (self.series() if series is None else series).items():
+            yield self.name, format_labels(labelnames[:len(labels)], labels), values[0]
+
+
+def render_metrics(directory: Path | None = None) -> str:
+    """
+    Render every registered metric in the Prometheus text exposition format.
+
+    :param directory: Where the workers write their metrics, when there are
+        several; the metrics of all of them are rendered, see
+        :func:`read_worker_metrics`.
+    """
+    if directory is None:
+        return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+    write_worker_metrics(directory)
+    series = read_worker_metrics(directory)
+    return "\n".join(metric.render(series.get(metric.name, {})) for metric in REGISTRY) + "\n"
+
+
+def write_worker_metrics(directory: Path, worker: str | None = None) -> None:
+    """
+    Write this worker's metrics to ``<directory>/<worker>.json``.
+    """
+    worker = worker or worker_id()
+    data = {metric.name: [[labels, values] for labels, values in metric.series().items()] for metric in REGISTRY}
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{worker}.json"
+    # Replaced at once, so that readers never see a partly written file.
+    temporary = path.with_suffix(".tmp")
+    temporary.write_bytes(orjson.dumps(data))
+    os.replace(temporary, path)
+
+
+def read_worker_metrics(directory: Path) -> dict[str, Series]:
+    """
+    Add up the metrics every worker wrote, by metric name.
+
+    Counters and histograms of the workers that exited still count, so the
+    totals do not go back when a worker is restarted. Gauges are only kept
+    for the live workers, with their worker id as a ``worker`` label.
+    """
+    gauges = {metric.name for metric in REGISTRY if metric.type == "gauge"}
+    merged: dict[str, Series] = {}
+    for path in sorted(directory.glob("*.json")):
+        worker = path.stem
+        alive = worker_alive(worker)
+        for name, entries in orjson.loads(path.read_bytes()).items():
+            if name in gauges and not alive:
+                continue
+
+            series = merged.setdefault(name, {})
+            for labels, values in entries:
+                labels = tuple(labels) + ((worker,) if name in gauges else ())
+                total = series.setdefault(labels, [0] * len(values))
+                for index, value in enumerate(values):
+                    total[index] += value
+
+    return merged
+
+
+async def run_metrics_flush(config: Metrics = settings.metrics) -> None:
+    """
+    Write this worker's metrics every ``config.flush_interval_seconds``, and
+    once more when cancelled at shutdown, for the other workers' /metrics.
+    """
+    try:
+        while True:
+            await asyncio.sleep(config.flush_interval_seconds)
+            try:
+                await asyncio.to_thread(write_worker_metrics, config.directory)
+            except Exception as exc:
+                logger.error(f"Writing the worker metrics failed: {exc}", exc_info=True)
+    finally:
+        try:
+            write_worker_metrics(config.directory)
+        except Exception as exc:
+            logger.error(f"Writing the worker metrics failed: {exc}", exc_info=True)
+
+
+def pool_gauge(name: str, documentation: str, field: str) -> Gauge:
+    def callback() -> dict[tuple[str, ...], float]:
+        status = sessionmanager.pool_status()
+        return {(): status[field]} if status else {}
+
+    return Gauge(name, documentation, callback=callback)
+
+
+request_count = Counter(
+    "app_requests_total",
+    "HTTP requests by route template, method and status.",
+    ("route", "method", "status"),
+)
+request_duration = Histogram(
+    "app_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    ("route", "method", "status"),
+)
+phase_duration = Histogram(
+    "app_phase_duration_seconds",
+    "Time spent per request phase (see app.utils.timing).",
+    ("route", "phase"),
+)
+password_hash_duration = Histogram(
+    "app_password_hash_seconds",
+    "bcrypt hash and verify time.",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0),
+)
+password_rehash = Counter(
+    "app_password_rehash_total",
+    "Stored password hashes upgraded to the current scheme and costs on login.",
+)
+jwt_verify_duration = Histogram(
+    "app_jwt_verify_seconds",
+    "JWT signature verification and decoding time.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+event_loop_lag = Gauge(
+    "app_event_loop_lag_seconds",
+    "How late the last event loop lag probe woke up.",
+)
+event_loop_lag_duration = Histogram(
+    "app_event_loop_lag_duration_seconds",
+    "Event loop lag probe delays.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+event_loop_blocked = Counter(
+    "app_event_loop_blocked_total",
+    "Times the blocking detector found the event loop held past its threshold.",
+)
+event_loop_blocked_duration = Histogram(
+    "app_event_loop_blocked_seconds",
+    "Duration of the event loop stalls found by the blocking detector.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+admission_in_flight = Gauge(
+    "app_admission_in_flight",
+    "Requests holding an admission slot, by route class.",
+    ("route_class",),
+)
+admission_queued = Gauge(
+    "app_admission_queued",
+    "Requests waiting for an admission slot, by route class.",
+    ("route_class",),
+)
+admission_wait_duration = Histogram(
+    "app_admission_wait_seconds",
+    "Time queued requests waited for an admission slot.",
+    ("route_class",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+admission_rejected = Counter(
+    "app_admission_rejected_total",
+    "Requests shed with 503 by admission control, by route class and reason (queue_full, timeout).",
+    ("route_class", "reason"),
+)
+availability_checks = Counter(
+    "app_availability_checks_total",
+    "Username and email availability checks, by how they were answered.",
+    ("field", "result"),
+)
+availability_filter_items = Gauge(
+    "app_availability_filter_items",
+    "Usernames and emails in the availability Bloom filter.",
+)
+single_flight_calls = Counter(
+    "app_single_flight_calls_total",
+    "Calls of coalesced reads: leader runs the load, coalesced waits for it, cancelled leaders were cancelled mid-load.",
+    ("name", "result"),
+)
+idempotent_requests = Counter(
+    "app_idempotent_requests_total",
+    "Requests with an Idempotency-Key, by outcome.",
+    ("result",),
+)
+rate_limited = Counter(
+    "app_rate_limited_total",
+    "Requests rejected by a rate limiter.",
+    ("limiter",),
+)
+rate_limit_keys = Gauge(
+    "app_rate_limit_keys",
+    "Keys tracked by a rate limiter.",
+    ("limiter",),
+)
+rate_limit_evictions = Counter(
+    "app_rate_limit_evictions_total",
+    "Least recently used keys evicted to keep a rate limiter within max_keys.",
+    ("limiter",),
+)
+db_pool_size = pool_gauge("app_db_pool_size", "Configured DB pool size.", "size")
+db_pool_checked_out = pool_gauge("app_db_pool_checked_out", "DB connections in use.", "checked_out")
+db_pool_checked_in = pool_gauge("app_db_pool_checked_in", "Idle DB connections in the pool.", "checked_in")
+db_pool_overflow = pool_gauge("app_db_pool_overflow", "DB connections opened beyond the pool size.", "overflow")
@@ -0,0 +1,539 @@
+import asyncio
+import cProfile
+import hashlib
+import logging
+import random
+import time
+
+from fastapi import HTTPException
+from itsdangerous import TimestampSigner
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.dependencies.user import get_admin_user
+from app.config import AccessLog, Admission, Idempotency, Tracing, settings
+from app.database import QueryStats, query_stats, sessionmanager, worker_pool_size
+from app.metrics import idempotent_requests, phase_duration, request_count, request_duration
+from app.services import profiling
+from app.services.idempotency import (
+    IdempotencyConflict, IdempotencyMismatch, IdempotencyStore, StoredResponse, fingerprint_request, idempotency_store
+)
+from app.utils.admission import ConcurrencyLimiter
+from app.utils.timing import Timings, phase, request_timings
+from app.utils import workers
+from app.utils.tracing import current_span, start_trace
+
+logger = logging.getLogger("app.access")
+
+
+class AccessLogMiddleware:
+    """
+    Pure ASGI access logging with sampling, and the request metrics.
+
+    Every request is timed and counted in ``request_count`` and
+    ``request_duration`` by route template, method and status, but only a
+    ``sample_rate`` share of them is logged; errors and requests slower
+    than ``slow_request_ms`` are always logged. Only allow-listed headers end up in the record, so cookies and
+    credentials never reach the logs. Unhandled exceptions are answered
+    with a 400 JSON response, as before.
+    """
+
+    def __init__(self, app: ASGIApp, config: AccessLog = settings.access_log):
+        self.app = app
+        self.config = config
+        self.headers = frozenset(header.strip().lower().encode("latin-1") for header in config.headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        response_started = False
+        error = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            error = exc
+            if response_started:
+                raise
+
+            status_code = 400
+            response = JSONResponse(status_code=status_code, content={"detail": str(exc)})
+            await response(scope, receive, send)
+        finally:
+            duration = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            status = str(status_code)
+            request_count.inc(route, scope["method"], status)
+            request_duration.observe(duration, route, scope["method"], status)
+
+            self.log(scope, status_code, duration * 1000, error)
+
+    def log(self, scope: Scope, status_code: int, duration_ms: float, error: Exception | None) -> None:
+        failed = error is not None or status_code >= self.config.error_status
+        slow = duration_ms >= self.config.slow_request_ms
+
+        if not (failed or slow or random.random() < self.config.sample_rate):
+            return
+
+        level = logging.ERROR if failed else logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+
+        route = scope.get("route")
+        client = scope.get("client")
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "client": client[0] if client else None,
+            "headers": {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope["headers"]
+                if name in self.headers
+            },
+            "sampled": not (failed or slow),
+        }
+
+        logger.log(
+            level,
+            "%s %s %s %.1fms",
+            record["method"], record["path"], status_code, duration_ms,
+            exc_info=error,
+            extra={"access": record},
+        )
+
+
+class AdmissionControlMiddleware:
+    """
+    Limit the concurrent requests per route class and shed the excess.
+
+    Requests to ``config.hash_paths`` (bcrypt) and all other requests (DB
+    bound) get their own ConcurrencyLimiter. Without it an overloaded
+    Postgres makes requests pile up in the pool checkout until clients
+    time out; here at most ``queue`` of them wait, for at most
+    ``queue_timeout_seconds``, and the rest are answered 503 with a
+    ``Retry-After`` header right away. ``config.exempt_paths`` are never
+    limited.
+    """
+
+    def __init__(self, app: ASGIApp, config: Admission = settings.admission):
+        self.app = app
+        self.config = config
+        timeout = config.queue_timeout_seconds
+        self.hash_limiter = ConcurrencyLimiter("hash", config.hash_limit, config.hash_queue, timeout)
+        # By default the DB bound class admits as many requests as the worker has pool connections.
+        self.db_limiter = ConcurrencyLimiter("db", config.db_limit or sum(worker_pool_size()), config.db_queue, timeout)
+        self.retry_after = str(config.retry_after_seconds)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.config.enabled or scope["path"] in self.config.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.hash_limiter if scope["path"] in self.config.hash_paths else self.db_limiter
+        if not await limiter.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is overloaded, retry later"},
+                headers={"Retry-After": self.retry_after},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+# Cookie of TimedSessionMiddleware, starlette's default.
+SESSION_COOKIE = "session"
+# Response headers carrying credentials, never stored for a replay.
+CREDENTIAL_HEADERS = frozenset({b"set-cookie", b"authorization", b"proxy-authorization", b"www-authenticate"})
+
+
+class IdempotencyMiddleware:
+    """
+    Replay the response of a POST to ``config.paths`` retried with the same ``Idempotency-Key``.
+
+    The request is fingerprinted by its body and its caller's credentials,
+    the ``Authorization`` header and the session data, and the key
+    claimed in the IdempotencyStore; a retry gets the first response back,
+    with an ``Idempotent-Replayed`` header, instead of running the
+    endpoint again. A retry arriving while the first request still runs
+    waits for it, or gets 409 if another worker runs it; the same key from
+    another caller or with another body gets 422. Responses with a 5xx
+    status are not stored, so those requests can be retried.
+
+    Credential headers, ``Set-Cookie`` included, are neither stored nor
+    replayed: a replayed signup does not log the client in.
+    """
+
+    def __init__(self, app: ASGIApp, config: Idempotency = settings.idempotency, store: IdempotencyStore | None = None):
+        self.app = app
+        self.config = config
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        key = None
+        if (
+            scope["type"] == "http"
+            and self.config.enabled
+            and scope["method"] == "POST"
+            and scope["path"] in self.config.paths
+        ):
+            key = Headers(scope=scope).get("idempotency-key")
+
+        if not key:
+            await self.app(scope, receive, send)
+            return
+
+        if len(key) > 255:
+            await JSONResponse(status_code=400, content={"detail": "Idempotency-Key is too long"})(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        request_headers = Headers(scope=scope)
+        credentials = "\0".join((request_headers.get("authorization", ""), session_data(request_headers)))
+        fingerprint, secret = fingerprint_request(hashlib.sha256(credentials.encode()).hexdigest(), body)
+        path = scope["path"]
+
+        try:
+            stored = await self.store.begin(path, key, fingerprint, secret)
+        except IdempotencyConflict:
+            idempotent_requests.inc("conflict")
+            response = JSONResponse(
+                status_code=409,
+                content={"detail": "A request with this Idempotency-Key is in progress"},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        except IdempotencyMismatch:
+            idempotent_requests.inc("mismatch")
+            response = JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency-Key was already used with a different request"},
+            )
+            await response(scope, receive, send)
+            return
+
+        if stored is not None:
+            idempotent_requests.inc("replayed")
+            response = Response(stored.body, status_code=stored.status_code)
+            response.raw_headers = [
+                (name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers
+            ] + [(b"idempotent-replayed", b"true")]
+            await response(scope, receive, send)
+            return
+
+        idempotent_requests.inc("executed")
+        start: Message = {}
+        chunks: list[bytes] = []
+        finished = False
+        replayed_body = False
+
+        async def receive_body() -> Message:
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def send_captured(message: Message) -> None:
+            nonlocal finished
+            # Recorded before sending: a response the client did not get must still be replayed.
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                finished = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_captured)
+        finally:
+            if finished and start["status"] < 500:
+                headers = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in start.get("headers", [])
+                    if name.lower() not in CREDENTIAL_HEADERS
+                ]
+                stored = StoredResponse(fingerprint, start["status"], headers, b"".join(chunks))
+                saving = self.store.complete(path, key, stored, secret)
+            else:
+                saving = self.store.abandon(path, key)
+
+        await saving
+
+
+def session_data(headers: Headers) -> str:
+    """
+    The session cookie without its timestamp and signature.
+
+    The cookie is signed again, with a new timestamp, on every response, so
+    only the session data identifies the caller across retries.
+    """
+    for header in headers.getlist("cookie"):
+        for pair in header.split(";"):
+            name, _, value = pair.strip().partition("=")
+            if name == SESSION_COOKIE:
+                return value.rsplit(".", 2)[0]
+    return ""
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+class QueryStatsMiddleware:
+    """
+    Count the statements and DB time of each request.
+
+    Binds a fresh QueryStats to the ``query_stats`` context variable, which
+    the engine events of DatabaseSessionManager update. With ``headers``
+    (``settings.debug``) the totals are sent back as ``X-DB-Queries`` and
+    ``X-DB-Time`` (milliseconds) response headers.
+    """
+
+    def __init__(self, app: ASGIApp, headers: bool = settings.debug):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.headers:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.queries)
+                headers["X-DB-Time"] = f"{stats.duration_ms:.1f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            query_stats.reset(token)
+
+
+class ServerTimingMiddleware:
+    """
+    Report the request phases in a ``Server-Timing`` response header.
+
+    Binds a fresh Timings to ``request_timings`` so the ``phase`` blocks
+    and ``timed`` functions of the request record into it, sends them with
+    the total as ``Server-Timing: jwt;dur=0.8, user;dur=2.1, ..., total;dur=6.0``
+    and observes every phase in the ``phase_duration`` histogram under the
+    route template. Without this middleware the phases are no-ops.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = Timings()
+        token = request_timings.set(timings)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                durations = dict(timings.durations, total=(time.perf_counter() - started) * 1000)
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    ", ".join(f"{name};dur={duration:.1f}" for name, duration in durations.items()),
+                )
+
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                for name, duration in durations.items():
+                    phase_duration.observe(duration / 1000, route, name)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_timings.reset(token)
+
+
+class TimedSigner:
+    """
+    TimestampSigner proxy that times the session cookie as the ``session`` phase.
+    """
+
+    def __init__(self, signer: TimestampSigner):
+        self.signer = signer
+
+    def sign(self, value: bytes) -> bytes:
+        with phase("session"):
+            return self.signer.sign(value)
+
+    def unsign(self, value: bytes, max_age: int | None = None) -> bytes:
+        with phase("session"):
+            return self.signer.unsign(value, max_age=max_age)
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware whose cookie signing and verification show up in Server-Timing.
+    """
+
+    def __init__(self, app: ASGIApp, **kwargs):
+        super().__init__(app, **kwargs)
+        self.signer = TimedSigner(self.signer)
+
+
+class ProfilingMiddleware:
+    """
+    Run requests under cProfile and keep the result for the admin endpoints.
+
+    A request is profiled when it carries the ``settings.profiling.header``
+    header and its session belongs to an admin (the same check as
+    ``CurrentAdminDep``), or when it is sampled by the global profiling
+    window, which also writes ``.pstats`` and ``.collapsed`` files. The
+    profile id is returned in the ``X-Profile-Id`` response header.
+
+    Only one request is profiled at a time; cProfile hooks the whole
+    thread, so the other requests the event loop interleaves with it show
+    up in its profile as well. Must run inside the session middleware.
+
+    With several workers the header is ignored, like the admin endpoints:
+    the profile would stay in a worker the next request may not reach.
+    """
+
+    def __init__(self, app: ASGIApp, header: str = settings.profiling.header):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+        self.active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.active:
+            await self.app(scope, receive, send)
+            return
+
+        window = profiling.window
+        sampled = window is not None and window.sample()
+        if not sampled and not (self.requested(scope) and not workers.sibling_workers() and await self.is_admin(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        if self.active:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = profiling.next_id()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = str(profile_id)
+            await send(message)
+
+        self.active = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self.active = False
+
+            profile = profiling.save_profile(
+                profiler, profile_id, scope["method"], scope["path"], (time.perf_counter() - started) * 1000,
+            )
+            if sampled:
+                await asyncio.to_thread(profiling.write_profile, profile, window.directory)
+
+    def requested(self, scope: Scope) -> bool:
+        return any(name == self.header for name, _ in scope["headers"])
+
+    @staticmethod
+    async def is_admin(scope: Scope) -> bool:
+        token = scope.get("session", {}).get("access_token")
+        if not token:
+            return False
+
+        try:
+            async with sessionmanager.session() as db_session:
+                await get_admin_user(token, db_session)
+        except HTTPException:
+            return False
+
+        return True
+
+
+class TracingMiddleware:
+    """
+    Start the root span of each sampled request.
+
+    The span is named ``<method> <route template>`` once the request is
+    routed, and the ``span``/``traced`` blocks of the request nest under
+    it. An incoming W3C ``traceparent`` header continues the caller's trace.
+    """
+
+    def __init__(self, app: ASGIApp, config: Tracing = settings.tracing):
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"traceparent"), None)
+        root = start_trace(
+            f"{scope['method']} {scope['path']}",
+            self.config.sample_rate,
+            traceparent,
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.response.status_code", message["status"])
+            await send(message)
+
+        token = current_span.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            current_span.reset(token)
+            if (route := getattr(scope.get("route"), "path", None)) is not None:
+                root.name = f"{scope['method']} {route}"
+                root.set_attribute("http.route", route)
+            root.end(error)
@@ -1,4 +1,5 @@
 from .association import user_team_association
 from .user import User
 from .team import Team
-from .auth import AuthToken
+from .auth import AuthToken, auth_token_lookup
+from .idempotency import idempotency_keys
@@ -1,16 +1,40 @@
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, Table, Column, DateTime, DDL, event
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column, relationship, Mapped
 from datetime import datetime
 from .base import Base
 
 
 class AuthToken(Base):
+    """
+    Auth tokens are range partitioned by ``created``, so the partition key is
+    part of the primary key and ``secret`` can only be indexed per partition.
+    Uniqueness of ``secret`` is kept by ``auth_token_lookup``.
+    """
     __tablename__ = "service_auth_tokens"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created)"}
 
-    secret: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    secret: Mapped[str] = mapped_column(String(64), index=True)
     expiration: Mapped[datetime]
-    created: Mapped[datetime]
+    created: Mapped[datetime] = mapped_column(primary_key=True)
 
     user_id = mapped_column(ForeignKey("service_users.id"))
 
     user: Mapped["User"] = relationship(back_populates="auth_tokens")
+
+
+auth_token_lookup = Table(
+    "service_auth_token_lookup",
+    Base.metadata,
+    Column("secret", String(64), primary_key=True),
+    Column("token_id", UUID(as_uuid=True), nullable=False),
+    Column("created", DateTime, nullable=False, index=True),
+)
+
+
+# Rows outside of the pre-created ranges land here instead of failing the insert.
+event.listen(
+    AuthToken.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS service_auth_tokens_default PARTITION OF service_auth_tokens DEFAULT"),
+)
@@ -1,13 +1,40 @@
+from sqlalchemy import DDL, event, text
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase
-from uuid import UUID, uuid4
+from uuid import UUID
+
+from app.utils.ids import uuid7
+
+# Database side counterpart of app.utils.ids.uuid7, used by rows inserted
+# outside of the ORM.
+UUID_GENERATE_V7 = DDL("""
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(
+                    uuid_send(gen_random_uuid())
+                    PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                    FROM 1 FOR 6
+                ),
+                52, 1
+            ),
+            53, 1
+        ),
+        'hex'
+    )::uuid
+$$ LANGUAGE sql VOLATILE
+""")
 
 
 class Base(AsyncAttrs, DeclarativeBase):
-    id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid4)
+    id: Mapped[UUID] = mapped_column(primary_key=True, default=uuid7, server_default=text("uuid_generate_v7()"))
 
     @hybrid_property
     def reference(self):
         return str(self.id)
+
+
+event.listen(Base.metadata, "before_create", UUID_GENERATE_V7)
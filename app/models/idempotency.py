@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, Table
+from sqlalchemy.dialects.postgresql import JSONB
+
+from .base import Base
+
+# Responses of the requests sent with an Idempotency-Key. A row without a
+# status code is still being executed, by the worker that inserted it.
+idempotency_keys = Table(
+    "service_idempotency_keys",
+    Base.metadata,
+    Column("path", String(255), primary_key=True),
+    Column("key", String(255), primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("status_code", Integer, nullable=True),
+    Column("headers", JSONB, nullable=True),
+    Column("body", LargeBinary, nullable=True),
+    Column("created", DateTime, nullable=False, index=True),
+)
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class ProfileInfo(BaseModel):
+    id: int
+    method: str
+    path: str
+    duration_ms: float
+    created: datetime
+
+
+ProfileFormat = Literal["text", "pstats", "collapsed"]
+
+
+class ProfilingWindowArgs(BaseModel):
+    percent: float = Field(gt=0, le=100, examples=[5])
+    seconds: float = Field(gt=0, le=3600, examples=[60])
+
+
+class ProfilingWindowStatus(BaseModel):
+    active: bool
+    percent: float | None = None
+    seconds_left: float | None = None
+    directory: str | None = None
+
+
+class MemoryTracingArgs(BaseModel):
+    frames: int = Field(1, ge=1, le=64, examples=[1])
+
+
+class MemorySnapshotInfo(BaseModel):
+    id: int
+    created: datetime
+    traced: int
+
+
+class MemoryStatus(BaseModel):
+    tracing: bool
+    traced: int
+    peak: int
+    snapshots: list[MemorySnapshotInfo]
+
+
+class MemoryModuleStats(BaseModel):
+    module: str
+    size: int
+    count: int
+
+
+class MemoryModuleDiff(MemoryModuleStats):
+    size_diff: int
+    count_diff: int
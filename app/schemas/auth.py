@@ -31,3 +31,8 @@ class Signup(UsernameArgs, PasswordArgs, EmailArgs):
 class LoginArgs(PasswordArgs, EmailArgs):
     pass
 
+
+
+class Availability(BaseModel):
+    username: bool | None = Field(default=None, examples=[True])
+    email: bool | None = Field(default=None, examples=[False])
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class Liveness(BaseModel):
+    status: Literal["ok"] = "ok"
+
+
+class DatabaseCheck(BaseModel):
+    reachable: bool
+    checked: datetime
+    latency_ms: float | None = None
+    error: str | None = None
+
+
+class PoolCheck(BaseModel):
+    size: int
+    checked_out: int
+    overflow: int
+    capacity: int
+    saturation: float
+    saturated: bool
+
+
+class WarmupCheck(BaseModel):
+    state: str
+    duration_ms: float | None = None
+
+
+class Readiness(BaseModel):
+    status: Literal["ready", "not_ready", "draining"]
+    draining: bool
+    warmup: WarmupCheck
+    database: DatabaseCheck | None = None
+    pool: PoolCheck | None = None
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field, UUID4
+from uuid import UUID
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from . import NameArgs, UsernameArgs
 from datetime import datetime
@@ -18,13 +19,13 @@ class TeamCreate(BaseModel):
 
 
 class UserResponse(BaseModel):
-    id: UUID4
+    id: UUID
     username: str
     surname: Optional[str] = None
 
 
 class TeamResponse(BaseModel):
-    id: UUID4
+    id: UUID
     name: str
     created: datetime
     users: List[UserResponse]
@@ -0,0 +1,63 @@
+"""
+Production entry point:
+
+    python -m app.server [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+Runs the application factory in ``--workers`` uvicorn worker processes under
+uvicorn's process manager, which restarts workers that die. uvloop and
+httptools are used when installed. Each worker's DB pool gets an equal
+share of ``DB_CONNECTION_BUDGET`` (see ``app.database.worker_pool_size``).
+
+On SIGTERM or SIGINT every worker drains: it stops accepting connections,
+closes idle keep-alive connections, waits up to ``GRACEFUL_TIMEOUT_SECONDS``
+for the in-flight requests and then runs the lifespan shutdown, which
+disposes the engine.
+
+With several workers, each one writes its metrics to ``METRICS_DIRECTORY``,
+emptied here on start, and /metrics adds up those of all workers; traces
+go to one file per worker. Request profiling and memory tracing keep their
+state in the worker that serves the admin request, so they are only
+available with ``--workers 1``.
+"""
+import argparse
+import os
+import shutil
+
+import uvicorn
+
+from app.config import settings
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=settings.server.workers)
+    parser.add_argument("--host", default=settings.server.host)
+    parser.add_argument("--port", type=int, default=settings.server.port)
+    args = parser.parse_args(argv)
+
+    # Workers are spawned and read their settings from the environment, a
+    # single worker runs in this process and uses the settings as they are.
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    settings.server.workers = args.workers
+    if args.workers > 1:
+        # Left by the workers of the last run, whose counters would add up with the new ones.
+        shutil.rmtree(settings.metrics.directory, ignore_errors=True)
+
+    uvicorn.run(
+        "app.main:get_application",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="auto",
+        http="auto",
+        timeout_graceful_shutdown=settings.server.graceful_timeout_seconds,
+        # AccessLogMiddleware logs the requests.
+        access_log=False,
+        # The application applies FORWARDED_ALLOW_IPS itself, under any server.
+        proxy_headers=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 import os
 import uuid
+from functools import cache
 
 import jwt
 import secrets
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey, RSAPublicKey
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
 from fastapi import Depends, HTTPException, Request
 from datetime import datetime, timezone, timedelta
 from starlette import status
@@ -14,11 +17,38 @@ from app.schemas.user import User
 from app.constants import TOKEN_TYPE_FIELD, ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE
 from app.models.user import User as DB_User
 from app.utils.auth import utc_now
+from app.metrics import jwt_verify_duration
+from app.utils.timing import phase
+from app.utils.tracing import traced
 
 ACCESS_TOKEN_SECRET_KEY = settings.auth_jwt.access_token_secret_key
 ACCESS_TOKEN_ALGORITHM = settings.auth_jwt.access_token_algorithm
 
 
+@cache
+def jwt_private_key() -> RSAPrivateKey:
+    """
+    The parsed JWT signing key, loaded on first use or by ``load_jwt_keys``.
+
+    Parsing the PEM validates the RSA key and costs far more than signing,
+    so it is done once per process instead of on every ``jwt.encode``.
+    """
+    return load_pem_private_key(settings.auth_jwt.private_key_path.read_bytes(), password=None)
+
+
+@cache
+def jwt_public_key() -> RSAPublicKey:
+    return load_pem_public_key(settings.auth_jwt.public_key_path.read_bytes())
+
+
+def load_jwt_keys() -> None:
+    """
+    Load both JWT keys up front, called from the application lifespan.
+    """
+    jwt_private_key()
+    jwt_public_key()
+
+
 def new_token():
     """
         Generate new random token
@@ -28,6 +58,7 @@ def new_token():
     return secrets.token_urlsafe(32)
 
 
+@traced()
 def get_access_token(request: Request):
     token = request.session.get('access_token')
 
@@ -37,6 +68,7 @@ def get_access_token(request: Request):
     return token
 
 
+@traced()
 def get_email_from_token_payload(token: str | bytes) -> str:
     payload = decode_jwt(token)
     if payload.get("type") != ACCESS_TOKEN_TYPE:
@@ -49,25 +81,25 @@ def get_email_from_token_payload(token: str | bytes) -> str:
     return email
 
 
+@traced()
 def decode_jwt(
         token: str | bytes,
-        public_key: str = settings.auth_jwt.public_key_path.read_text(),
+        public_key: str | RSAPublicKey | None = None,
         algorithm: str = ACCESS_TOKEN_ALGORITHM,
 ) -> dict:
-    print("here")
-    print(f"{token}")
-    decoded = jwt.decode(
-        token,
-        public_key,
-        algorithms=[algorithm],
-    )
-    print("here2")
+    with phase("jwt"), jwt_verify_duration.time():
+        decoded = jwt.decode(
+            token,
+            public_key or jwt_public_key(),
+            algorithms=[algorithm],
+        )
     return decoded
 
 
+@traced()
 def encode_jwt(
         payload: dict,
-        private_key: str = settings.auth_jwt.private_key_path.read_text(),
+        private_key: str | RSAPrivateKey | None = None,
         algorithm: str = ACCESS_TOKEN_ALGORITHM,
         expire_minutes: int = settings.auth_jwt.access_token_expire_minutes,
         expire_timedelta: timedelta | None = None
@@ -87,12 +119,13 @@ def encode_jwt(
     )
     encoded = jwt.encode(
         to_encode,
-        private_key,
+        private_key or jwt_private_key(),
         algorithm=algorithm
     )
     return encoded
 
 
+@traced()
 def get_token_payload(
         token: str,
 ) -> dict:
@@ -148,6 +181,7 @@ def create_jwt(
     )
 
 
+@traced()
 def create_access_token(user: User) -> str:
     jwt_payload = {
         "sub": user.email,
@@ -159,6 +193,7 @@ def create_access_token(user: User) -> str:
     )
 
 
+@traced()
 def create_refresh_token(user: User) -> str:
     jwt_payload = {
         "sub": user.email,
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import func, select
+
+from app.config import Availability, settings
+from app.database import sessionmanager
+from app.metrics import availability_filter_items
+from app.models import User
+from app.utils.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityIndex:
+    """
+    Per-worker Bloom filter of the lowercased usernames and emails in use.
+
+    A value the filter has never seen is certainly free, at least as of the
+    last rebuild, so the availability check answers it without a query;
+    possible hits are confirmed in the database. Until the first build the
+    filter is absent and every check queries.
+
+    This worker's signups and profile updates are added right away; the
+    other workers' ones and deletes, which a Bloom filter cannot remove,
+    are picked up by the periodic rebuild. The answer is advisory:
+    ``validate_signup`` and the unique constraints still decide.
+    """
+
+    def __init__(self, config: Availability = settings.availability):
+        self.config = config
+        self.filter: BloomFilter | None = None
+        # Values added while a rebuild scans the table, replayed into the new filter.
+        self._pending: list[str] | None = None
+        # Deleted or renamed values still in the filter; past 1% of it, it is rebuilt early.
+        self.stale = 0
+        self.outdated = asyncio.Event()
+
+    @staticmethod
+    def key(field: str, value: str) -> str:
+        return f"{field}:{value.lower()}"
+
+    def add(self, username: str | None = None, email: str | None = None) -> None:
+        keys = [self.key(field, value) for field, value in (("username", username), ("email", email)) if value]
+        for key in keys:
+            if self.filter is not None:
+                self.filter.add(key)
+                availability_filter_items.set(self.filter.count)
+            if self._pending is not None:
+                self._pending.append(key)
+
+    def discard(self, username: str | None = None, email: str | None = None) -> None:
+        # A Bloom filter cannot remove values: they stay possible hits, confirmed by a query.
+        self.stale += bool(username) + bool(email)
+        if self.filter is not None and self.stale >= max(self.filter.count // 100, 1):
+            self.outdated.set()
+
+    def might_be_taken(self, field: str, value: str) -> bool:
+        if self.filter is None:
+            return True
+
+        return self.key(field, value) in self.filter
+
+    async def build(self) -> None:
+        """
+        Rebuild the filter from a streaming scan of the users table.
+        """
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            async with sessionmanager.connect() as connection:
+                users = await connection.scalar(select(func.count()).select_from(User))
+                # Two values per user, with room for the users to double until the next rebuild.
+                bloom = BloomFilter(2 * max(self.config.capacity, users * 2), self.config.error_rate)
+
+                result = await connection.stream(
+                    select(User.username, User.email).execution_options(yield_per=self.config.batch_size)
+                )
+                async for rows in result.partitions():
+                    for username, email in rows:
+                        bloom.add(self.key("username", username))
+                        bloom.add(self.key("email", email))
+
+            for key in self._pending:
+                bloom.add(key)
+        finally:
+            self._pending = None
+
+        self.filter = bloom
+        self.stale = 0
+        availability_filter_items.set(bloom.count)
+        logger.info(f"Availability filter built with {bloom.count} values in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+availability_index = AvailabilityIndex()
+
+
+async def run_availability_refresh(config: Availability = settings.availability) -> None:
+    """
+    Build the availability filter, then rebuild it every ``config.refresh_seconds``,
+    or sooner once deletes made it outdated, until cancelled.
+    """
+    if not config.enabled:
+        return
+
+    while True:
+        availability_index.outdated.clear()
+        try:
+            await availability_index.build()
+        except Exception as exc:
+            logger.error(f"Availability filter build failed: {exc}", exc_info=True)
+
+        try:
+            await asyncio.wait_for(availability_index.outdated.wait(), config.refresh_seconds)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from app.config import settings
+from app.metrics import event_loop_blocked, event_loop_blocked_duration, event_loop_lag, event_loop_lag_duration
+
+logger = logging.getLogger(__name__)
+
+
+async def monitor_event_loop_lag(
+        interval_seconds: float = settings.monitoring.event_loop_lag_interval_seconds,
+        warn_ms: float = settings.monitoring.event_loop_lag_warn_ms,
+) -> None:
+    """
+    Measure how late the event loop runs a timer until cancelled.
+
+    Sleeps for ``interval_seconds`` and records how much later than that
+    it woke up, which is the time other callbacks held the loop. Lags
+    above ``warn_ms`` are logged.
+    """
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval_seconds)
+        lag = max(time.perf_counter() - started - interval_seconds, 0.0)
+
+        event_loop_lag.set(lag)
+        event_loop_lag_duration.observe(lag)
+        if lag * 1000 >= warn_ms:
+            logger.warning("Event loop lag %.1fms", lag * 1000)
+
+
+class BlockingDetector:
+    """
+    Watchdog thread that reports what holds the event loop.
+
+    Every ``interval_seconds`` it schedules a no-op callback on the loop
+    and waits ``threshold_ms`` for it to run. If it does not, the loop
+    thread is busy with something that does not yield (bcrypt, RSA, file
+    I/O, a CPU bound loop); its current stack is logged and counted in
+    ``event_loop_blocked``, and once the loop is free again the whole stall
+    is observed in ``event_loop_blocked_duration``.
+
+    Meant for debugging: it wakes the loop every interval.
+    """
+
+    def __init__(
+            self,
+            loop: asyncio.AbstractEventLoop,
+            threshold_ms: float = settings.monitoring.blocking_threshold_ms,
+            interval_seconds: float = settings.monitoring.blocking_interval_seconds,
+    ):
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_seconds
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="event-loop-blocking-detector", daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            ran = threading.Event()
+            started = time.perf_counter()
+            try:
+                self.loop.call_soon_threadsafe(ran.set)
+            except RuntimeError:
+                return
+
+            if ran.wait(self.threshold):
+                continue
+
+            self.report(started)
+            while not ran.wait(self.interval):
+                if self.stopped.is_set():
+                    return
+
+            event_loop_blocked_duration.observe(time.perf_counter() - started)
+
+    def report(self, started: float) -> None:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+
+        event_loop_blocked.inc()
+        logger.warning(
+            "Event loop blocked for more than %.0fms, loop thread stack:\n%s",
+            (time.perf_counter() - started) * 1000, stack,
+            extra={"stack": stack},
+        )
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import signal
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.config import Health, settings
+from app.database import sessionmanager
+from app.schemas.health import DatabaseCheck, PoolCheck, Readiness, WarmupCheck
+from app.services import warmup
+from app.utils.auth import utc_now
+
+logger = logging.getLogger(__name__)
+
+# Set on SIGTERM: readiness fails while the worker keeps serving for the drain delay.
+draining = False
+
+
+class DatabaseProbe:
+    """
+    Cached, rate-limited database reachability check.
+
+    A result, reachable or not, is reused for ``ttl_seconds``, and
+    concurrent checks share a single ``SELECT 1``, so however often the
+    orchestrator probes, each worker queries Postgres at most once per TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, timeout_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.result: DatabaseCheck | None = None
+        self._checked_at = 0.0
+        self._running: asyncio.Task | None = None
+
+    async def check(self) -> DatabaseCheck:
+        if self.result is not None and time.monotonic() - self._checked_at < self.ttl_seconds:
+            return self.result
+
+        if self._running is None or self._running.done():
+            self._running = asyncio.create_task(self._run())
+
+        # A cancelled probe request must not cancel the check the others wait for.
+        return await asyncio.shield(self._running)
+
+    async def _run(self) -> DatabaseCheck:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._select_one(), self.timeout_seconds)
+        except Exception as exc:
+            self.result = DatabaseCheck(reachable=False, checked=utc_now(), error=f"{type(exc).__name__}: {exc}")
+            logger.warning(f"Readiness DB check failed: {self.result.error}")
+        else:
+            self.result = DatabaseCheck(
+                reachable=True,
+                checked=utc_now(),
+                latency_ms=round((time.perf_counter() - started) * 1000, 2),
+            )
+
+        self._checked_at = time.monotonic()
+        return self.result
+
+    @staticmethod
+    async def _select_one() -> None:
+        async with sessionmanager.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+
+database_probe = DatabaseProbe(settings.health.db_check_ttl_seconds, settings.health.db_check_timeout_seconds)
+
+
+def pool_check(threshold: float = settings.health.pool_saturation_threshold) -> PoolCheck | None:
+    status = sessionmanager.pool_status()
+    if status is None:
+        return None
+
+    capacity = status["size"] + status["max_overflow"]
+    saturation = status["checked_out"] / capacity if capacity else 0.0
+    return PoolCheck(
+        size=status["size"],
+        checked_out=status["checked_out"],
+        overflow=status["overflow"],
+        capacity=capacity,
+        saturation=round(saturation, 3),
+        saturated=saturation >= threshold,
+    )
+
+
+async def readiness() -> Readiness:
+    """
+    Ready once warmed up, with Postgres reachable and connections left in the pool.
+
+    Draining workers are not ready and skip the other checks.
+    """
+    warmup_check = WarmupCheck(state=warmup.status.state, duration_ms=warmup.status.duration_ms)
+    if draining:
+        return Readiness(status="draining", draining=True, warmup=warmup_check)
+
+    database = await database_probe.check()
+    pool = pool_check()
+    ready = (
+        warmup.status.state in ("done", "failed")
+        and database.reachable
+        and not (pool is not None and pool.saturated)
+    )
+    return Readiness(
+        status="ready" if ready else "not_ready",
+        draining=False,
+        warmup=warmup_check,
+        database=database,
+        pool=pool,
+    )
+
+
+def install_drain_handler(config: Health = settings.health) -> None:
+    """
+    Delay the server's SIGTERM handling by ``config.drain_delay_seconds``.
+
+    The worker starts draining right away, so ``/readyz`` fails and the
+    load balancer stops sending traffic, while it keeps serving what still
+    arrives; then uvicorn's own handler runs its graceful shutdown. A
+    second SIGTERM shuts down immediately. Called from the lifespan, after
+    uvicorn installed its handler.
+    """
+    # Signal handlers can only be set from the main thread.
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    previous = signal.getsignal(signal.SIGTERM)
+    if config.drain_delay_seconds <= 0 or not callable(previous):
+        return
+
+    loop = asyncio.get_running_loop()
+
+    def handle_sigterm(signum, frame) -> None:
+        global draining
+        if draining:
+            previous(signum, frame)
+            return
+
+        draining = True
+        logger.info(f"SIGTERM received, draining for {config.drain_delay_seconds}s")
+        loop.call_soon_threadsafe(loop.call_later, config.drain_delay_seconds, previous, signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Coroutine
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import Idempotency, settings
+from app.database import sessionmanager
+from app.models import idempotency_keys
+from app.utils.auth import utc_now
+
+logger = logging.getLogger(__name__)
+
+# The event loop only keeps weak references to tasks: the writes of complete and abandon are held
+# here until done, since their callers may be cancelled or raise before awaiting them.
+background_tasks: set[asyncio.Task] = set()
+
+
+def in_background(coroutine: Coroutine[Any, Any, None]) -> asyncio.Task:
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+class IdempotencyConflict(Exception):
+    """
+    The key is being executed by another worker.
+    """
+
+
+class IdempotencyMismatch(Exception):
+    """
+    The key was already used with a different request.
+    """
+
+
+def fingerprint_request(principal: str, body: bytes) -> tuple[str, bytes]:
+    """
+    Fingerprint a request by its caller and body.
+
+    :param principal: Whatever identifies the caller, e.g. its credentials.
+    :returns: The fingerprint stored with the key, and the key encrypting
+        the stored response body. The latter is not stored, so the table
+        alone does not reveal the responses, e.g. the tokens of a signup.
+    """
+    request = principal.encode() + b"\0" + body
+    return hashlib.sha256(b"fingerprint\0" + request).hexdigest(), hashlib.sha256(b"response\0" + request).digest()
+
+
+def encrypt_body(secret: bytes, body: bytes) -> bytes:
+    nonce = os.urandom(12)
+    return nonce + AESGCM(secret).encrypt(nonce, body, None)
+
+
+def decrypt_body(secret: bytes, stored: bytes) -> bytes:
+    return AESGCM(secret).decrypt(stored[:12], stored[12:], None)
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    headers: list[tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyStore:
+    """
+    Responses of the requests sent with an ``Idempotency-Key``.
+
+    The first request with a key claims it with a row in
+    ``service_idempotency_keys`` and, once executed, stores its response
+    there and in a per-worker LRU of ``config.cache_size`` entries. Later
+    requests with the key get the stored response. Duplicates arriving
+    while the first one runs wait for it on the same worker, or are told
+    to retry by :class:`IdempotencyConflict` on another one. Keys are
+    scoped by path, and a key reused by another caller or with another
+    body raises :class:`IdempotencyMismatch`. Response bodies are stored
+    encrypted with the secret of :func:`fingerprint_request`.
+    """
+
+    def __init__(self, config: Idempotency = settings.idempotency):
+        self.config = config
+        # (path, key) -> the response and its expiry on the monotonic clock, least recently used first.
+        self.cache: OrderedDict[tuple[str, str], tuple[StoredResponse, float]] = OrderedDict()
+        # Keys executed by this worker, resolved with the response, or None if it was not stored.
+        self.in_flight: dict[tuple[str, str], asyncio.Future] = {}
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    async def begin(self, path: str, key: str, fingerprint: str, secret: bytes) -> StoredResponse | None:
+        """
+        Claim the key, or get the response stored for it.
+
+        :returns: The stored response to replay, or None if the caller
+            claimed the key and must execute the request, then call
+            :meth:`complete` or :meth:`abandon`.
+        :raises IdempotencyConflict: If another worker executes the key.
+        :raises IdempotencyMismatch: If the key was used by another caller or with another body.
+        """
+        entry = (path, key)
+        while True:
+            stored = self._cached(entry)
+            if stored is not None:
+                return self._checked(stored, fingerprint)
+
+            running = self.in_flight.get(entry)
+            if running is None:
+                break
+
+            # Coalesced onto the execution in progress; if it is not stored, try to claim the key again.
+            stored = await asyncio.shield(running)
+            if stored is not None:
+                return self._checked(stored, fingerprint)
+
+        # Registered before the first await, so duplicates arriving meanwhile wait for this one.
+        self.in_flight[entry] = asyncio.get_running_loop().create_future()
+        try:
+            claimed, stored, age = await self._claim(path, key, fingerprint, secret)
+        except BaseException:
+            self._resolve(entry, None)
+            raise
+
+        if claimed:
+            return None
+
+        self._resolve(entry, stored)
+        if stored is None:
+            raise IdempotencyConflict(key)
+
+        self._remember(entry, stored, age)
+        return self._checked(stored, fingerprint)
+
+    def complete(self, path: str, key: str, stored: StoredResponse, secret: bytes) -> asyncio.Task:
+        """
+        Store the response of a claimed key.
+
+        It is replayed on this worker right away; the row is updated in a
+        task, like in :meth:`abandon`.
+        """
+        entry = (path, key)
+        self._remember(entry, stored)
+        self._resolve(entry, stored)
+        return in_background(self._store(path, key, stored, secret))
+
+    async def _store(self, path: str, key: str, stored: StoredResponse, secret: bytes) -> None:
+        try:
+            async with sessionmanager.connect() as connection:
+                await connection.execute(
+                    idempotency_keys.update()
+                    .where(idempotency_keys.c.path == path, idempotency_keys.c.key == key)
+                    .values(status_code=stored.status_code, headers=stored.headers, body=encrypt_body(secret, stored.body))
+                )
+        except Exception as exc:
+            logger.error(f"Storing the response of idempotency key {key!r} failed: {exc}", exc_info=True)
+
+    def abandon(self, path: str, key: str) -> asyncio.Task:
+        """
+        Release a claimed key without a response, so that a retry executes it again.
+
+        The row is deleted in a task, so this is safe to call from a
+        cancelled request; waiting duplicates are released once it is gone
+        and one of them claims the key.
+        """
+        return in_background(self._release(path, key))
+
+    async def purge(self) -> int:
+        """
+        Delete the keys older than the TTL.
+        """
+        async with sessionmanager.connect() as connection:
+            result = await connection.execute(
+                delete(idempotency_keys).where(
+                    idempotency_keys.c.created < utc_now() - timedelta(seconds=self.config.ttl_seconds)
+                )
+            )
+        return result.rowcount
+
+    async def _claim(
+            self, path: str, key: str, fingerprint: str, secret: bytes
+    ) -> tuple[bool, StoredResponse | None, float]:
+        now = utc_now()
+        table = idempotency_keys
+        # Expired keys and keys left in progress by a crashed worker are claimed like new ones.
+        claim = insert(table).values(path=path, key=key, fingerprint=fingerprint, created=now)
+        claim = claim.on_conflict_do_update(
+            index_elements=[table.c.path, table.c.key],
+            set_={"fingerprint": fingerprint, "status_code": None, "headers": None, "body": None, "created": now},
+            where=(table.c.created < now - timedelta(seconds=self.config.ttl_seconds))
+            | (table.c.status_code.is_(None) & (table.c.created < now - timedelta(seconds=self.config.lock_timeout_seconds))),
+        ).returning(table.c.key)
+
+        async with sessionmanager.connect() as connection:
+            if (await connection.execute(claim)).first() is not None:
+                return True, None, 0.0
+
+            row = (
+                await connection.execute(
+                    select(table.c.fingerprint, table.c.status_code, table.c.headers, table.c.body, table.c.created)
+                    .where(table.c.path == path, table.c.key == key)
+                )
+            ).first()
+
+        if row is None or row.status_code is None:
+            return False, None, 0.0
+
+        if row.fingerprint != fingerprint:
+            raise IdempotencyMismatch()
+
+        try:
+            body = decrypt_body(secret, row.body)
+        except InvalidTag:
+            raise IdempotencyMismatch()
+
+        stored = StoredResponse(row.fingerprint, row.status_code, [tuple(header) for header in row.headers], body)
+        return False, stored, (now - row.created).total_seconds()
+
+    async def _release(self, path: str, key: str) -> None:
+        try:
+            async with sessionmanager.connect() as connection:
+                await connection.execute(
+                    delete(idempotency_keys).where(
+                        idempotency_keys.c.path == path,
+                        idempotency_keys.c.key == key,
+                        idempotency_keys.c.status_code.is_(None),
+                    )
+                )
+        except Exception as exc:
+            logger.error(f"Releasing idempotency key {key!r} failed: {exc}", exc_info=True)
+        finally:
+            self._resolve((path, key), None)
+
+    def _cached(self, entry: tuple[str, str]) -> StoredResponse | None:
+        cached = self.cache.get(entry)
+        if cached is None:
+            return None
+
+        stored, expires = cached
+        if expires <= time.monotonic():
+            del self.cache[entry]
+            return None
+
+        self.cache.move_to_end(entry)
+        return stored
+
+    def _remember(self, entry: tuple[str, str], stored: StoredResponse, age: float = 0.0) -> None:
+        self.cache[entry] = (stored, time.monotonic() + self.config.ttl_seconds - age)
+        self.cache.move_to_end(entry)
+        if len(self.cache) > self.config.cache_size:
+            self.cache.popitem(last=False)
+
+    def _resolve(self, entry: tuple[str, str], stored: StoredResponse | None) -> None:
+        running = self.in_flight.pop(entry, None)
+        if running is not None and not running.done():
+            running.set_result(stored)
+
+    @staticmethod
+    def _checked(stored: StoredResponse, fingerprint: str) -> StoredResponse:
+        if stored.fingerprint != fingerprint:
+            raise IdempotencyMismatch()
+        return stored
+
+
+idempotency_store = IdempotencyStore()
+
+
+async def run_idempotency_cleanup(config: Idempotency = settings.idempotency) -> None:
+    """
+    Purge the expired idempotency keys every ``config.cleanup_interval_seconds`` until cancelled.
+    """
+    while True:
+        try:
+            purged = await idempotency_store.purge()
+            if purged:
+                logger.info(f"Purged {purged} expired idempotency keys")
+        except Exception as exc:
+            logger.error(f"Idempotency key cleanup failed: {exc}", exc_info=True)
+
+        await asyncio.sleep(config.cleanup_interval_seconds)
@@ -0,0 +1,181 @@
+import asyncio
+import itertools
+import logging
+import sys
+import tracemalloc
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cache
+from pathlib import Path
+
+import orjson
+
+from app.config import settings
+from app.utils.auth import utc_now
+
+logger = logging.getLogger(__name__)
+
+_ids = itertools.count(1)
+
+# Allocations made by tracemalloc itself and the import system are noise.
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class MemorySnapshot:
+    id: int
+    created: datetime
+    traced: int
+    snapshot: tracemalloc.Snapshot
+
+
+snapshots: OrderedDict[int, MemorySnapshot] = OrderedDict()
+
+
+@cache
+def module_name(filename: str) -> str:
+    """
+    Turn a source file name into its dotted module name, e.g. ``app.crud.team``.
+
+    Uses the longest ``sys.path`` entry the file is under; files outside of
+    it keep their path.
+    """
+    path = Path(filename)
+    roots = sorted((Path(entry).resolve() for entry in sys.path if entry), key=lambda root: len(root.parts))
+    for root in reversed(roots):
+        if path.is_relative_to(root):
+            parts = list(path.relative_to(root).with_suffix("").parts)
+            if parts and parts[-1] == "__init__":
+                parts.pop()
+            if parts:
+                return ".".join(parts)
+
+    return filename
+
+
+def group_name(filename: str, depth: int) -> str:
+    return ".".join(module_name(filename).split(".")[:depth])
+
+
+def start(frames: int = settings.memory.frames) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop() -> None:
+    """
+    Stop tracing; the snapshots taken so far stay available.
+    """
+    tracemalloc.stop()
+
+
+def take_snapshot(keep: bool = True) -> MemorySnapshot:
+    snapshot = MemorySnapshot(
+        id=next(_ids),
+        created=utc_now(),
+        traced=tracemalloc.get_traced_memory()[0],
+        snapshot=tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS),
+    )
+    if not keep:
+        return snapshot
+
+    snapshots[snapshot.id] = snapshot
+    while len(snapshots) > settings.memory.keep_snapshots:
+        snapshots.popitem(last=False)
+
+    return snapshot
+
+
+def top(snapshot: MemorySnapshot, depth: int = 2, prefix: str = "", limit: int = 20) -> list[dict]:
+    """
+    Allocated sizes and block counts of a snapshot grouped by module.
+
+    :param depth: Module name components to group by, 2 gives e.g.
+        ``app.crud``, ``app.schemas`` and ``sqlalchemy.orm``.
+    :param prefix: Only include modules starting with it, e.g. ``app``.
+    :param limit: Number of groups, the largest first.
+    """
+    groups: dict[str, list[int]] = {}
+    for stat in snapshot.snapshot.statistics("filename"):
+        name = group_name(stat.traceback[0].filename, depth)
+        if name.startswith(prefix):
+            group = groups.setdefault(name, [0, 0])
+            group[0] += stat.size
+            group[1] += stat.count
+
+    rows = [{"module": name, "size": size, "count": count} for name, (size, count) in groups.items()]
+    return sorted(rows, key=lambda row: row["size"], reverse=True)[:limit]
+
+
+def diff(old: MemorySnapshot, new: MemorySnapshot, depth: int = 2, prefix: str = "", limit: int = 20) -> list[dict]:
+    """
+    Growth per module between two snapshots, the largest growth first.
+    """
+    groups: dict[str, list[int]] = {}
+    for stat in new.snapshot.compare_to(old.snapshot, "filename"):
+        name = group_name(stat.traceback[0].filename, depth)
+        if name.startswith(prefix):
+            group = groups.setdefault(name, [0, 0, 0, 0])
+            group[0] += stat.size
+            group[1] += stat.size_diff
+            group[2] += stat.count
+            group[3] += stat.count_diff
+
+    rows = [
+        {"module": name, "size": size, "size_diff": size_diff, "count": count, "count_diff": count_diff}
+        for name, (size, size_diff, count, count_diff) in groups.items()
+    ]
+    return sorted(rows, key=lambda row: abs(row["size_diff"]), reverse=True)[:limit]
+
+
+def dump(previous: MemorySnapshot | None, directory: Path) -> MemorySnapshot:
+    """
+    Take a snapshot and append its top modules and the diff to ``previous`` to ``memory.jsonl``.
+    """
+    snapshot = take_snapshot(keep=False)
+    current, peak = tracemalloc.get_traced_memory()
+    entry = {
+        "snapshot": snapshot.id,
+        "time": snapshot.created,
+        "traced": current,
+        "peak": peak,
+        "top": top(snapshot),
+        "diff": diff(previous, snapshot) if previous is not None else [],
+    }
+
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / "memory.jsonl", "ab") as file:
+        file.write(orjson.dumps(entry) + b"\n")
+
+    return snapshot
+
+
+async def run_memory_dumps(
+        interval_seconds: float = settings.memory.dump_interval_seconds,
+        directory: Path = settings.memory.dump_directory,
+) -> None:
+    """
+    While tracemalloc is tracing, dump the memory statistics every ``interval_seconds`` until cancelled.
+
+    A zero interval disables the dumps.
+    """
+    if interval_seconds <= 0:
+        return
+
+    previous = None
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if not tracemalloc.is_tracing():
+            previous = None
+            continue
+
+        try:
+            previous = await asyncio.to_thread(dump, previous, directory)
+        except Exception as exc:
+            logger.error(f"Memory dump failed: {exc}", exc_info=True)
@@ -0,0 +1,31 @@
+import asyncio
+import logging
+
+from app.config import settings
+from app.crud.auth import create_auth_token_partitions, drop_expired_auth_token_partitions
+from app.database import sessionmanager
+
+logger = logging.getLogger(__name__)
+
+
+async def maintain_auth_token_partitions() -> None:
+    async with sessionmanager.session() as db_session:
+        created = await create_auth_token_partitions(db_session)
+        dropped = await drop_expired_auth_token_partitions(db_session)
+
+    logger.info(f"Auth token partitions ensured: {created[0]}..{created[-1]}, dropped: {dropped}")
+
+
+async def run_auth_token_partition_maintenance(
+        interval_seconds: int = settings.auth_token_partitions.maintenance_interval_seconds,
+) -> None:
+    """
+    Keep the auth token partitions ahead of time until cancelled.
+    """
+    while True:
+        try:
+            await maintain_auth_token_partitions()
+        except Exception as exc:
+            logger.error(f"Auth token partition maintenance failed: {exc}", exc_info=True)
+
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,167 @@
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+from app.config import settings
+from app.utils.auth import utc_now
+
+_ids = itertools.count(1)
+
+
+@dataclass
+class RequestProfile:
+    id: int
+    method: str
+    path: str
+    duration_ms: float
+    created: datetime
+    stats: dict = field(repr=False)
+
+
+@dataclass
+class ProfilingWindow:
+    """
+    Global "profile ``percent`` of requests until ``until``" toggle.
+    """
+    percent: float
+    until: float
+    directory: Path
+
+    def sample(self) -> bool:
+        return time.monotonic() < self.until and random.random() * 100 < self.percent
+
+
+profiles: deque[RequestProfile] = deque(maxlen=settings.profiling.keep)
+
+window: ProfilingWindow | None = None
+
+
+def start_window(percent: float, seconds: float, directory: Path = settings.profiling.directory) -> ProfilingWindow:
+    global window
+    window = ProfilingWindow(percent=percent, until=time.monotonic() + seconds, directory=directory)
+    return window
+
+
+def stop_window() -> None:
+    global window
+    window = None
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+def save_profile(
+        profiler: cProfile.Profile,
+        profile_id: int,
+        method: str,
+        path: str,
+        duration_ms: float,
+) -> RequestProfile:
+    profiler.create_stats()
+    profile = RequestProfile(
+        id=profile_id,
+        method=method,
+        path=path,
+        duration_ms=duration_ms,
+        created=utc_now(),
+        stats=profiler.stats,
+    )
+    profiles.append(profile)
+    return profile
+
+
+def get_profile(profile_id: int) -> RequestProfile | None:
+    return next((profile for profile in profiles if profile.id == profile_id), None)
+
+
+def as_text(profile: RequestProfile, limit: int = 50) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(stream=stream)
+    stats.stats = profile.stats
+    stats.get_top_level_stats()
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def as_pstats(profile: RequestProfile) -> bytes:
+    """
+    The profile in the pstats file format, for snakeviz, gprof2dot or ``pstats.Stats(path)``.
+    """
+    return marshal.dumps(profile.stats)
+
+
+def function_label(func: tuple[str, int, str]) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name.strip("<>")
+
+    path = Path(filename)
+    return f"{path.parent.name}/{path.name}:{name}:{line}"
+
+
+def as_collapsed(profile: RequestProfile, max_depth: int = 64, min_seconds: float = 1e-6) -> str:
+    """
+    The profile as collapsed stacks (``a;b;c microseconds``) for flamegraph.pl or speedscope.
+
+    cProfile only records caller/callee pairs, not whole stacks, so every
+    call edge gets a share of the callee's time in proportion to the
+    cumulative time spent through that edge. Recursive calls and branches
+    worth less than ``min_seconds`` are cut off.
+    """
+    stats = profile.stats
+    callees: dict[tuple, dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, {})[func] = cumulative
+
+    lines: dict[str, float] = {}
+
+    def walk(func: tuple, stack: tuple[str, ...], share: float, seen: frozenset) -> None:
+        _, _, own, cumulative, _ = stats[func]
+        if cumulative <= 0 or share < min_seconds:
+            return
+
+        stack = stack + (function_label(func),)
+        scale = min(share / cumulative, 1.0)
+        key = ";".join(stack)
+        lines[key] = lines.get(key, 0.0) + own * scale
+
+        if len(stack) >= max_depth:
+            return
+
+        for callee, edge in callees.get(func, {}).items():
+            if callee not in seen and callee in stats:
+                walk(callee, stack, edge * scale, seen | {callee})
+
+    for func, (_, _, _, cumulative, callers) in stats.items():
+        if not callers:
+            walk(func, (), cumulative, frozenset({func}))
+
+    return "".join(
+        f"{stack} {round(seconds * 1_000_000)}\n"
+        for stack, seconds in lines.items()
+        if seconds >= min_seconds
+    )
+
+
+def write_profile(profile: RequestProfile, directory: Path) -> Path:
+    """
+    Write ``<time>-<id>-<method><path>.pstats`` and ``.collapsed`` files for a sampled request.
+
+    Runs in a worker thread, the collapsing walks the whole call graph.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    name = f"{profile.created:%Y%m%dT%H%M%S}-{profile.id}-{profile.method}{profile.path.replace('/', '_')}"
+
+    (directory / f"{name}.pstats").write_bytes(as_pstats(profile))
+    (directory / f"{name}.collapsed").write_text(as_collapsed(profile))
+    return directory / name
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Warmup, settings
+from app.crud.auth import get_auth_token_by_secret
+from app.crud.team import get_team
+from app.crud.user import get_admin_user_by_email, get_user, get_user_by_email, get_user_by_username
+from app.database import sessionmanager
+from app.services.auth import decode_jwt, encode_jwt
+from app.utils.auth import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+# The lookups run by nearly every request, with arguments that match no row.
+HOT_LOOKUPS: tuple[Callable[[AsyncSession], Awaitable], ...] = (
+    lambda session: get_user_by_email(session, ""),
+    lambda session: get_admin_user_by_email(session, ""),
+    lambda session: get_user_by_username(session, ""),
+    lambda session: get_user(session, uuid.UUID(int=0)),
+    # Not coalesced: the query has to run on every warmed connection.
+    lambda session: get_team.uncoalesced(session, ""),
+    lambda session: get_auth_token_by_secret(session, ""),
+)
+
+
+@dataclass
+class WarmupStatus:
+    # pending, running, done or failed; the lifespan finishes startup only after done or failed.
+    state: str = "pending"
+    connections: int = 0
+    duration_ms: float | None = None
+    error: str | None = None
+
+
+status = WarmupStatus()
+
+
+class BrokenBarrierError(Exception):
+    """
+    Another warm-up connection failed.
+    """
+
+
+class WarmupBarrier:
+    """
+    Hold the warm-up connections until all ``parties`` have one.
+
+    Works like ``asyncio.Barrier``, which needs Python 3.11, for a single
+    round; a party that fails calls :meth:`abort`, so the others give up
+    right away instead of waiting for the warm-up timeout.
+    """
+
+    def __init__(self, parties: int):
+        self.parties = parties
+        self.arrived = 0
+        self.broken = False
+        self._released = asyncio.Event()
+
+    async def wait(self) -> None:
+        self.arrived += 1
+        if self.arrived >= self.parties:
+            self._released.set()
+
+        await self._released.wait()
+        if self.broken:
+            raise BrokenBarrierError()
+
+    def abort(self) -> None:
+        self.broken = True
+        self._released.set()
+
+
+async def warm_connection(barrier: WarmupBarrier) -> None:
+    """
+    Check out a connection and run every hot lookup on it.
+
+    Compiles the statements into SQLAlchemy's cache and, with asyncpg,
+    prepares them in the connection's statement cache. The barrier keeps
+    the connection checked out until every warm-up session has one, so
+    they all land on different connections.
+    """
+    try:
+        async with sessionmanager.session() as session:
+            await session.connection()
+            await barrier.wait()
+            for lookup in HOT_LOOKUPS:
+                try:
+                    await lookup(session)
+                except HTTPException:
+                    pass
+    except BaseException:
+        # Do not keep the others waiting for a connection that will never come.
+        barrier.abort()
+        raise
+
+
+def warm_crypto() -> None:
+    """
+    Initialise passlib's bcrypt backend and run the JWT signing and verification paths.
+    """
+    verify_password("warm-up", hash_password("warm-up"))
+    decode_jwt(encode_jwt({"sub": "warm-up"}))
+
+
+async def warm_up(connections: int) -> None:
+    barrier = WarmupBarrier(connections)
+    await asyncio.gather(
+        asyncio.to_thread(warm_crypto),
+        *(warm_connection(barrier) for _ in range(connections)),
+    )
+
+
+async def run_warmup(pool_size: int, config: Warmup = settings.warmup) -> WarmupStatus:
+    """
+    Warm up the worker before it reports ready, called from the lifespan.
+
+    Opens ``config.connections`` pool connections, at most ``pool_size``.
+    A failed or timed out warm-up is logged and does not stop the startup:
+    the first requests are just slower.
+    """
+    if not config.enabled:
+        status.state = "done"
+        return status
+
+    status.state = "running"
+    status.connections = max(min(config.connections, pool_size), 1)
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(warm_up(status.connections), config.timeout_seconds)
+    except Exception as exc:
+        status.state = "failed"
+        status.error = f"{type(exc).__name__}: {exc}"
+        logger.warning(f"Warm-up failed: {status.error}", exc_info=True)
+    else:
+        status.state = "done"
+    status.duration_ms = (time.perf_counter() - started) * 1000
+
+    if status.state == "done":
+        logger.info(f"Warm-up done in {status.duration_ms:.0f}ms with {status.connections} connections")
+
+    return status
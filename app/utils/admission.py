@@ -0,0 +1,79 @@
+import asyncio
+from collections import deque
+
+from app.metrics import admission_in_flight, admission_queued, admission_rejected, admission_wait_duration
+
+
+class ConcurrencyLimiter:
+    """
+    A semaphore with a bounded wait queue and a wait timeout.
+
+    Unlike ``asyncio.Semaphore``, ``acquire`` gives up instead of waiting
+    forever: right away when ``queue_size`` callers are already waiting,
+    or after ``timeout_seconds`` in the queue. Released slots are handed
+    to the waiters in arrival order.
+
+    :param name: Route class, the label of the admission metrics.
+    :param limit: Callers holding a slot at a time.
+    :param queue_size: Callers waiting for a slot at a time.
+    :param timeout_seconds: Longest wait for a slot.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout_seconds = timeout_seconds
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, or return False if the queue is full or the wait timed out.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            admission_in_flight.set(self.active, self.name)
+            return True
+
+        if len(self._waiters) >= self.queue_size:
+            admission_rejected.inc(self.name, "queue_full")
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        admission_queued.set(len(self._waiters), self.name)
+        try:
+            with admission_wait_duration.time(self.name):
+                # A slot handed over right at the timeout still counts, wait_for returns it.
+                await asyncio.wait_for(waiter, self.timeout_seconds)
+        except asyncio.TimeoutError:
+            admission_rejected.inc(self.name, "timeout")
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                self._remove(waiter)
+            admission_queued.set(len(self._waiters), self.name)
+
+        return True
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter, so the active count stays.
+                waiter.set_result(None)
+                return
+
+        self.active -= 1
+        admission_in_flight.set(self.active, self.name)
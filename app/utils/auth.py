@@ -4,10 +4,46 @@ import secrets
 from datetime import datetime, timezone, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
+from passlib.hash import argon2
 
-from app.config import settings
+from app.config import PasswordHashing, settings
+from app.metrics import password_hash_duration, password_rehash
+from app.utils.usernames import reserved_usernames
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+SCHEMES = ("bcrypt", "argon2")
+
+
+def password_context(config: PasswordHashing = settings.password_hashing) -> CryptContext:
+    """
+    Hash with ``config.scheme`` at the configured costs and verify both schemes.
+
+    Hashes of the other scheme, or with lower costs, are reported by
+    ``needs_update``, so ``verify_and_update_password`` rehashes them on
+    the next login. Costs are only a minimum: lowering them never rewrites
+    the existing, stronger hashes.
+    """
+    if config.scheme not in SCHEMES:
+        raise ValueError(f"Unknown password hash scheme {config.scheme!r}, expected one of {SCHEMES}")
+    if config.scheme == "argon2" and not argon2.has_backend():
+        raise RuntimeError("PASSWORD_HASH_SCHEME=argon2 needs the argon2-cffi package")
+
+    schemes = [config.scheme] + [scheme for scheme in SCHEMES if scheme != config.scheme]
+    options = {
+        "bcrypt__default_rounds": config.bcrypt_rounds,
+        "bcrypt__min_rounds": config.bcrypt_rounds,
+    }
+    if config.scheme == "argon2":
+        options.update({
+            "argon2__default_rounds": config.argon2_time_cost,
+            "argon2__min_rounds": config.argon2_time_cost,
+            "argon2__memory_cost": config.argon2_memory_cost,
+            "argon2__parallelism": config.argon2_parallelism,
+        })
+
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+pwd_context = password_context()
 
 UTC = timezone.utc
 
@@ -22,7 +58,8 @@ def hash_password(password: str) -> str:
     :returns: The hashed password.
     :rtype: str
     """
-    return pwd_context.hash(password)
+    with password_hash_duration.time("hash"):
+        return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -38,7 +75,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     :returns: True if the plain password matches the hashed password, False otherwise.
     :rtype: bool
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    with password_hash_duration.time("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """
+    Verify the password and rehash it if the stored hash uses outdated parameters.
+
+    :returns: Whether the password matches, and the new hash to store or
+        None if the stored one is current.
+    """
+    with password_hash_duration.time("verify"):
+        verified, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+
+    if new_hash is not None:
+        password_rehash.inc()
+
+    return verified, new_hash
 
 
 def is_authenticated(user, password: str) -> bool:
@@ -74,14 +128,14 @@ def utc_now():
     return datetime.now(UTC).replace(tzinfo=None)
 
 
-def is_protected_username(username: str):
+def is_protected_username(username: str) -> bool:
     """
-    Check if a given username is in the list of protected usernames.
+    Check if a given username is reserved for the service.
 
-    This function verifies whether a provided username belongs to a set of
-    reserved or system usernames that should not be used by regular users.
-    It checks against a predefined list of usernames, which includes common
-    administrative, technical, and service-related names.
+    Besides the reserved names themselves, e.g. administrative, technical
+    and service-related ones, this covers their lookalikes and variants
+    such as ``Admin1``, ``4dm1n`` or ``support_team``; see
+    :class:`app.utils.usernames.ReservedNames`.
 
     :param username: The username for check
     :type username: str
@@ -89,61 +143,5 @@ def is_protected_username(username: str):
     :return: True if the username is protected, False otherwise.
     :rtype: bool
     """
-    usernames = [
-        ["admin", "blog", "dev", "ftp", "mail", "pop", "pop3", "imap", "smtp"],
-        ["stage", "stats", "status", "www", "beta", "about", "access"],
-        ["account", "accounts", "add", "address", "adm"],
-        ["administration", "adult", "advertising", "affiliate", "affiliates"],
-        ["ajax", "analytics", "android", "anon", "anonymous", "api"],
-        ["app", "apps", "archive", "atom", "auth", "authentication"],
-        ["avatar", "backup", "banner", "banners", "bin", "billing", "blog"],
-        ["blogs", "board", "bot", "bots", "business", "chat"],
-        ["cache", "cadastro", "calendar", "campaign", "careers"],
-        ["cgi", "client", "cliente", "code", "comercial", "compare", "config"],
-        ["connect", "contact", "contest", "create", "code", "compras"],
-        ["css", "dashboard", "data", "db", "design", "delete"],
-        ["demo", "design", "designer", "dev", "devel", "dir"],
-        ["directory", "doc", "docs", "domain", "download", "downloads"],
-        ["edit", "editor", "email", "ecommerce", "forum", "forums"],
-        ["faq", "favorite", "feed", "feedback", "flog", "follow"],
-        ["file", "files", "free", "ftp", "gadget", "gadgets"],
-        ["games", "guest", "group", "groups", "help", "home", "homepage"],
-        ["host", "hosting", "hostname", "html", "http", "httpd"],
-        ["https", "hpg", "info", "information", "image", "img", "images"],
-        ["imap", "index", "invite", "intranet", "indice", "ipad", "iphone"],
-        ["irc", "java", "javascript", "job", "jobs", "js"],
-        ["knowledgebase", "log", "login", "logs", "logout", "list", "lists"],
-        ["mail", "mail1", "mail2", "mail3", "mail4", "mail5"],
-        ["mailer", "mailing", "mx", "manager", "marketing"],
-        ["master", "me", "media", "message", "microblog", "microblogs"],
-        ["mine", "mp3", "msg", "msn", "mysql", "messenger"],
-        ["mob", "mobile", "movie", "movies", "music", "musicas"],
-        ["my", "name", "named", "net", "network", "new"],
-        ["news", "newsletter", "nick", "nickname", "notes", "noticias"],
-        ["ns", "ns1", "ns2", "ns3", "ns4", "ns5", "ns6", "ns7", "ns8"],
-        ["ns9", "ns10", "old", "online", "operator", "order", "orders"],
-        ["page", "pager", "pages", "panel", "password", "perl", "pic", "pics"],
-        ["photo", "photos", "photoalbum", "php", "plugin", "plugins", "pop"],
-        ["pop3", "post", "postmaster", "postfix", "posts"],
-        ["profile", "project", "projects", "promo", "pub", "public", "python"],
-        ["random", "register", "registration", "root", "ruby", "rss"],
-        ["sale", "sales", "sample", "samples", "script", "scripts", "secure"],
-        ["send", "service", "shop", "sql", "signup", "signin", "search"],
-        ["security", "settings", "setting", "setup", "site"],
-        ["sites", "sitemap", "smtp", "soporte", "ssh", "stage", "staging"],
-        ["start", "subscribe", "subdomain", "suporte", "support", "stat"],
-        ["static", "stats", "status", "store", "stores", "system"],
-        ["tablet", "tablets", "tech", "telnet", "test", "test1", "test2"],
-        ["test3", "teste", "tests", "theme", "themes", "tmp"],
-        ["todo", "task", "tasks", "tools", "tv", "talk", "update", "upload"],
-        ["url", "user", "username", "usuario", "usage", "vendas"],
-        ["video", "videos", "visitor", "win", "ww", "www"],
-        ["www1", "www2", "www3", "www4", "www5", "www6", "www7"],
-        ["wwww", "wws", "wwws", "web", "webmail", "website", "websites"],
-        ["webmaster", "workshop", "xxx", "xpg", "you"],
-    ]
-
-    usernames = list(set(item for sublist in usernames for item in sublist))
-
-    return username.lower() in usernames
+    return username in reserved_usernames
 
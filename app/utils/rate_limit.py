@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.metrics import rate_limit_evictions, rate_limit_keys, rate_limited
+
+
+class _Shard:
+    __slots__ = ("buckets", "lock")
+
+    def __init__(self):
+        # key -> [tokens, last refill time], least recently used first.
+        self.buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self.lock = threading.Lock()
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets, one per key, e.g. a client IP or an email.
+
+    Every key may spend ``burst`` requests at once, refilled at
+    ``rate_per_second``. The buckets are spread over ``shards`` LRU maps,
+    each with its own lock and at most ``max_keys / shards`` buckets; a new
+    key evicts the least recently used bucket of its shard, so memory stays
+    bounded and every check is O(1). An evicted bucket comes back full,
+    which only matters for keys idle longer than all the others.
+
+    :param name: Limiter name, the label of the rate limit metrics.
+    """
+
+    def __init__(self, name: str, rate_per_second: float, burst: float, max_keys: int, shards: int = 64):
+        self.name = name
+        self.rate = rate_per_second
+        self.burst = burst
+        self.shard_size = max(max_keys // shards, 1)
+        self.shards = [_Shard() for _ in range(shards)]
+        # Tracked keys, for the metrics only; not locked across shards.
+        self.size = 0
+
+    def hit(self, key: str) -> float:
+        """
+        Take a token from the bucket of ``key``.
+
+        :returns: 0 if the request is allowed, otherwise the seconds until
+            the bucket has a token again.
+        """
+        now = time.monotonic()
+        shard = self.shards[hash(key) % len(self.shards)]
+
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                if len(shard.buckets) >= self.shard_size:
+                    shard.buckets.popitem(last=False)
+                    rate_limit_evictions.inc(self.name)
+                else:
+                    self.size += 1
+                    rate_limit_keys.set(self.size, self.name)
+                bucket = shard.buckets[key] = [self.burst, now]
+            else:
+                shard.buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+
+            retry_after = (1 - bucket[0]) / self.rate
+
+        rate_limited.inc(self.name)
+        return retry_after
+
+    def clear(self) -> None:
+        for shard in self.shards:
+            with shard.lock:
+                shard.buckets.clear()
+        self.size = 0
+        rate_limit_keys.set(0, self.name)
@@ -0,0 +1,97 @@
+import asyncio
+import functools
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from app.metrics import single_flight_calls
+
+T = TypeVar("T")
+
+
+class LeaderCancelled(Exception):
+    """
+    The caller running a shared load was cancelled before it finished.
+    """
+
+
+class SingleFlight:
+    """
+    Run concurrent loads with the same key once and share the result.
+
+    The first caller of a key, the leader, runs the load itself; later
+    callers wait for it and get its result or exception. A waiter being
+    cancelled does not affect the others. If the leader is cancelled, the
+    waiters do not fail with it: one of them takes over and runs the load
+    again.
+
+    Only loads already in progress are joined, so a waiter can get data
+    read before a write it committed just before calling.
+
+    :param name: Load name, the label of the single flight metrics.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        while (running := self.calls.get(key)) is not None:
+            single_flight_calls.inc(self.name, "coalesced")
+            try:
+                # Shielded: a cancelled waiter must not cancel the shared result.
+                return await asyncio.shield(running)
+            except LeaderCancelled:
+                continue
+
+        shared = self.calls[key] = asyncio.get_running_loop().create_future()
+        single_flight_calls.inc(self.name, "leader")
+        try:
+            result = await load()
+        except asyncio.CancelledError:
+            single_flight_calls.inc(self.name, "cancelled")
+            self._fail(shared, LeaderCancelled())
+            raise
+        except BaseException as exc:
+            self._fail(shared, exc)
+            raise
+        else:
+            shared.set_result(result)
+            return result
+        finally:
+            if self.calls.get(key) is shared:
+                del self.calls[key]
+
+    @staticmethod
+    def _fail(shared: asyncio.Future, exc: BaseException) -> None:
+        shared.set_exception(exc)
+        # Mark it retrieved, there may be no waiter to do it.
+        shared.exception()
+
+
+def coalesced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorate a read-only crud coroutine function so that concurrent calls
+    with the same arguments share one query.
+
+    The query runs in the session of the first caller, so no call needs a
+    connection besides its own session's; the others get the instances of
+    that session, which they must only read. Use it for reads without side
+    effects only, and see :class:`SingleFlight` about reads following a
+    write. The function itself stays available as ``uncoalesced``.
+
+    :param name: Name of the function in the single flight metrics.
+    """
+    def decorator(func: Callable) -> Callable:
+        flight = SingleFlight(name)
+
+        @functools.wraps(func)
+        async def wrapper(db_session, *args, **kwargs):
+            return await flight.do(
+                (args, tuple(sorted(kwargs.items()))),
+                lambda: func(db_session, *args, **kwargs),
+            )
+
+        wrapper.flight = flight
+        wrapper.uncoalesced = func
+        return wrapper
+
+    return decorator
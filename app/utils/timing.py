@@ -0,0 +1,97 @@
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Callable
+
+from app.utils.tracing import traced
+
+
+class Timings:
+    """
+    Phase durations of one request, in milliseconds.
+
+    Phases do not nest: while one is running, phases entered inside it are
+    attributed to the outer one, so the totals never overlap.
+    """
+    __slots__ = ("durations", "active")
+
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+        self.active = False
+
+
+# Bound by ServerTimingMiddleware; when unset every phase is a no-op.
+request_timings: ContextVar[Timings | None] = ContextVar("request_timings", default=None)
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.timings.active = True
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        durations = self.timings.durations
+        durations[self.name] = durations.get(self.name, 0.0) + (time.perf_counter() - self.started) * 1000
+        self.timings.active = False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name: str) -> _Phase | _NoPhase:
+    """
+    Time a ``with`` block as the named phase of the current request.
+
+    Outside ServerTimingMiddleware, or inside another phase, this returns a
+    shared no-op context manager.
+
+    :param name: Phase name, used as the Server-Timing metric name.
+    """
+    timings = request_timings.get()
+    if timings is None or timings.active:
+        return _NO_PHASE
+
+    return _Phase(timings, name)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorate a function or coroutine function to run as the named phase,
+    and as a tracing span named after the function.
+
+    :param name: Phase name.
+    """
+    def decorator(func: Callable) -> Callable:
+        func = traced()(func)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with phase(name):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with phase(name):
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,256 @@
+import functools
+import inspect
+import logging
+import os
+import queue
+import random
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Any, Callable
+
+import orjson
+from fastapi import HTTPException
+
+from app.config import Tracing, settings
+from app.utils import workers
+
+# OpenTelemetry span kinds and status codes.
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+exporter = logging.getLogger("app.tracing.export")
+exporter.propagate = False
+
+_listener: QueueListener | None = None
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: list[dict] = []
+
+
+class Span:
+    """
+    A timed operation of a sampled trace, ended with ``end``.
+
+    Created by ``start_span``, ``span`` and ``traced``; the finished span is
+    kept on its Trace in the OpenTelemetry JSON shape until the root span
+    ends and the whole trace is exported.
+    """
+    __slots__ = ("trace", "span_id", "parent_span_id", "name", "kind", "start", "attributes", "root")
+
+    def __init__(
+            self,
+            trace: Trace,
+            name: str,
+            parent_span_id: str | None,
+            kind: int,
+            attributes: dict,
+            root: bool = False,
+    ):
+        self.trace = trace
+        self.root = root
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: BaseException | None = None) -> None:
+        status = {"code": STATUS_OK}
+        if error is not None and not isinstance(error, HTTPException):
+            status = {"code": STATUS_ERROR, "message": f"{type(error).__name__}: {error}"}
+
+        self.trace.spans.append({
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(time.time_ns()),
+            "attributes": [otel_attribute(key, value) for key, value in self.attributes.items()],
+            "status": status,
+        })
+
+        if self.root:
+            export(self.trace)
+
+
+# The innermost open span of the current request, None when it is not sampled.
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def otel_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def start_trace(
+        name: str,
+        sample_rate: float = settings.tracing.sample_rate,
+        traceparent: str | None = None,
+        **attributes: Any,
+) -> Span | None:
+    """
+    Start the root span of a trace, or return None if it is not sampled.
+
+    A W3C ``traceparent`` header continues the caller's trace and follows
+    its sampled flag; otherwise ``sample_rate`` of the traces are kept.
+    """
+    parent_span_id = None
+    if traceparent:
+        try:
+            _, trace_id, parent_span_id, flags = traceparent.split("-")
+            sampled = int(flags, 16) & 1
+            if len(trace_id) != 32 or len(parent_span_id) != 16:
+                raise ValueError(traceparent)
+        except ValueError:
+            parent_span_id = traceparent = None
+
+    if not traceparent:
+        trace_id = os.urandom(16).hex()
+        sampled = random.random() < sample_rate
+
+    if not sampled:
+        return None
+
+    return Span(Trace(trace_id), name, parent_span_id, SPAN_KIND_SERVER, attributes, root=True)
+
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Span | None:
+    """
+    Start a child of the current span without making it current, e.g. for SQL statements.
+    """
+    parent = current_span.get()
+    if parent is None:
+        return None
+
+    return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+
+class span:
+    """
+    Run a ``with`` block as a child span of the current one.
+
+    A no-op outside of a sampled trace.
+
+    :param name: Span name.
+    """
+    __slots__ = ("name", "attributes", "span", "token")
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self) -> Span | None:
+        self.span = start_span(self.name, **self.attributes)
+        if self.span is not None:
+            self.token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.span is not None:
+            current_span.reset(self.token)
+            self.span.end(exc)
+
+
+def traced(name: str | None = None) -> Callable[[Callable], Callable]:
+    """
+    Decorate a function or coroutine function to run as a span.
+
+    :param name: Span name, the function's module and qualified name by default.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if current_span.get() is None:
+                    return await func(*args, **kwargs)
+                with span(span_name):
+                    return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if current_span.get() is None:
+                    return func(*args, **kwargs)
+                with span(span_name):
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def export(trace: Trace) -> None:
+    """
+    Queue a finished trace as one OTLP/JSON ``resourceSpans`` line.
+    """
+    if _listener is None:
+        return
+
+    exporter.info(orjson.dumps({
+        "resourceSpans": [{
+            "resource": {"attributes": [otel_attribute("service.name", settings.project_name)]},
+            "scopeSpans": [{"scope": {"name": "app"}, "spans": trace.spans}],
+        }],
+    }).decode())
+
+
+def setup_tracing(config: Tracing = settings.tracing) -> None:
+    """
+    Write exported traces to a rotating JSON-lines file from a background thread.
+
+    With several workers, each one writes its own file: a rotation renames
+    the file under the other workers' open handles.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    path = Path(config.path)
+    if workers.sibling_workers():
+        path = path.with_name(f"{path.stem}-{workers.worker_id()}{path.suffix}")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handler = RotatingFileHandler(path, maxBytes=config.max_bytes, backupCount=config.backup_count)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    export_queue = queue.SimpleQueue()
+    exporter.addHandler(QueueHandler(export_queue))
+    exporter.setLevel(logging.INFO)
+    _listener = QueueListener(export_queue, handler)
+    _listener.start()
+
+
+def shutdown_tracing() -> None:
+    global _listener
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    for handler in exporter.handlers[:]:
+        exporter.removeHandler(handler)
+    _listener = None
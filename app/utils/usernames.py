@@ -0,0 +1,106 @@
+import re
+import unicodedata
+from pathlib import Path
+
+RESERVED_USERNAMES_FILE = Path(__file__).resolve().parent.parent / "data" / "reserved_usernames.txt"
+
+# Letters of other scripts that render like Latin ones, after casefolding.
+CONFUSABLES = str.maketrans({
+    # Cyrillic
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h", "о": "o", "р": "p",
+    "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ї": "i", "ј": "j", "ѕ": "s", "ԁ": "d",
+    "һ": "h", "ӏ": "l", "ԛ": "q", "ԝ": "w",
+    # Greek
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v", "ο": "o", "ρ": "p",
+    "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+})
+SEPARATORS = str.maketrans("", "", "_-. ")
+# Digits and symbols written for letters; "1" is tried as both "i" and "l".
+LEET = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b", "@": "a", "$": "s"})
+LEET_L = str.maketrans({"1": "l"})
+
+
+def normalize_username(username: str) -> str:
+    """
+    Reduce a username to the skeleton reserved names are compared on.
+
+    Applies compatibility normalization (fullwidth and styled letters),
+    drops accents, casefolds, maps lookalike Cyrillic and Greek letters to
+    Latin ones and removes separators.
+    """
+    if username.isascii():
+        return username.lower().translate(SEPARATORS)
+
+    decomposed = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", username))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return stripped.casefold().translate(CONFUSABLES).translate(SEPARATORS)
+
+
+def alternation(words: set[str]) -> str:
+    return "|".join(re.escape(word) for word in sorted(map(normalize_username, words)))
+
+
+class ReservedNames:
+    """
+    Matcher of the reserved usernames, compiled once.
+
+    A username is reserved if its normalized skeleton, with or without its
+    trailing digits and read with digits as letters, is one of ``names``,
+    or starts with one of ``prefixes`` or ends with one of ``suffixes``.
+    Exact names are a set lookup; the prefixes and suffixes are a single
+    precompiled regular expression, so a check does not depend on the
+    number of reserved names.
+    """
+
+    def __init__(self, names: set[str], prefixes: set[str] = frozenset(), suffixes: set[str] = frozenset()):
+        self.names = frozenset(normalize_username(name) for name in names)
+
+        alternatives = []
+        if prefixes:
+            alternatives.append(f"^(?:{alternation(prefixes)})")
+        if suffixes:
+            alternatives.append(f"(?:{alternation(suffixes)})$")
+        self.affixes = re.compile("|".join(alternatives)) if alternatives else None
+
+    @classmethod
+    def from_file(cls, path: Path = RESERVED_USERNAMES_FILE) -> "ReservedNames":
+        """
+        Load the names from a file with one name per line.
+
+        Names under a ``[prefix]`` or ``[suffix]`` line are prefixes or
+        suffixes; ``#`` starts a comment.
+        """
+        sections = {"names": set(), "prefix": set(), "suffix": set()}
+        section = sections["names"]
+        for line in path.read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                section = sections[line[1:-1]]
+            else:
+                section.add(line)
+
+        return cls(sections["names"], sections["prefix"], sections["suffix"])
+
+    def variants(self, username: str) -> set[str]:
+        skeleton = normalize_username(username)
+        candidates = {skeleton, skeleton.rstrip("0123456789")}
+        for candidate in list(candidates):
+            candidates.add(candidate.translate(LEET))
+            if "1" in candidate:
+                candidates.add(candidate.translate(LEET_L).translate(LEET))
+        candidates.discard("")
+        return candidates
+
+    def __contains__(self, username: str) -> bool:
+        for candidate in self.variants(username):
+            if candidate in self.names:
+                return True
+            if self.affixes is not None and self.affixes.search(candidate):
+                return True
+
+        return False
+
+
+reserved_usernames = ReservedNames.from_file()
@@ -0,0 +1,30 @@
+import multiprocessing
+import os
+
+
+def worker_id() -> str:
+    """
+    Identify this process among the workers, e.g. in the names of the files they write.
+    """
+    return str(os.getpid())
+
+
+def sibling_workers() -> bool:
+    """
+    Whether this process is one of several workers.
+
+    uvicorn's process manager spawns its workers with multiprocessing and
+    runs ``WEB_CONCURRENCY`` of them, which ``app.server`` exports. A
+    single worker, or plain ``uvicorn``, serves from the main process.
+    """
+    return multiprocessing.parent_process() is not None and int(os.getenv("WEB_CONCURRENCY", 1)) > 1
+
+
+def worker_alive(worker: str) -> bool:
+    try:
+        os.kill(int(worker), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
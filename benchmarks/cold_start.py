@@ -0,0 +1,71 @@
+"""
+Cold start of the application: import time and time to the first response.
+
+Each run imports app.main in a fresh interpreter to time the import, then
+starts uvicorn with the application factory and polls ``GET /`` until it
+answers, which covers the import, building the app and the lifespan
+startup. Reports the median and the worst run.
+
+Usage:
+    python -m benchmarks.cold_start [--runs 5] [--port 8765] [--app app.main:get_application] [--no-factory]
+
+The lifespan runs against DB_CONFIG from the environment.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+
+def import_time() -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT], capture_output=True, text=True, check=True).stdout
+    return float(output)
+
+
+def first_response_time(target: str, factory: bool, port: int, timeout: float = 30.0) -> float:
+    command = [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"]
+    if factory:
+        command.append("--factory")
+
+    started = time.perf_counter()
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {server.returncode}")
+            time.sleep(0.01)
+
+        raise TimeoutError(f"no response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app", default="app.main:get_application")
+    parser.add_argument("--no-factory", dest="factory", action="store_false")
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    starts = [first_response_time(args.app, args.factory, args.port) for _ in range(args.runs)]
+
+    print(f"{'':<16} {'median ms':>10} {'max ms':>10}")
+    for name, times in (("import app.main", imports), ("first response", starts)):
+        print(f"{name:<16} {statistics.median(times) * 1000:>10.0f} {max(times) * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
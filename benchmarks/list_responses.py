@@ -0,0 +1,129 @@
+"""
+CPU and allocation cost of rendering the team and user list endpoints.
+
+Compares, on the same data:
+
+- before: the router builds one response model per ORM row and FastAPI
+  validates the result again against ``response_model`` before encoding it;
+- validated: rows are validated once by the cached list ``TypeAdapter``
+  (``settings.trusted_output = False``);
+- trusted: rows are serialized in one orjson pass without validation, which
+  is what the routers do by default.
+
+Rows are built in memory, so no database is needed and ORM hydration, which
+the trusted path also avoids by selecting plain columns, is not included.
+
+Usage:
+    python -m benchmarks.list_responses [--teams 2000] [--members 5] [--repeat 20]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import app.models  # noqa: F401  configure all mappers
+from app.api.responses import list_response, rows_payload, team_rows_payload
+from app.config import settings
+from app.models.team import Team
+from app.models.user import User
+from app.schemas.team import TeamResponse, UserResponse
+from app.utils.auth import utc_now
+from app.utils.ids import uuid7
+
+
+def make_rows(teams: int, members: int) -> tuple[list[Team], list[User]]:
+    now = utc_now()
+    users = [
+        User(id=uuid7(), username=f"user_{i:06d}", surname=f"Surname_{i}", email=f"user{i}@example.com", created=now)
+        for i in range(teams * members)
+    ]
+    rows = []
+    for i in range(teams):
+        team = Team(id=uuid7(), name=f"team_{i:06d}", created=now)
+        team.users.extend(users[i * members:(i + 1) * members])
+        rows.append(team)
+
+    return rows, users
+
+
+def bench(label: str, render: Callable[[], bytes], repeat: int, items: int) -> None:
+    size = len(render())
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{label:<30} {elapsed * 1000:>9.2f} ms {elapsed / items * 1e6:>7.2f} us "
+        f"{peak / 1024:>9.0f} KiB {size / 1024:>8.0f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=2_000)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    teams, users = make_rows(args.teams, args.members)
+    team_rows = [
+        (team.id, team.name, team.created, [(user.id, user.username, None) for user in team.users])
+        for team in teams
+    ]
+    user_rows = [(user.id, user.username, user.surname) for user in users]
+    loop = asyncio.new_event_loop()
+
+    teams_field = create_response_field(name="Response_teams", type_=List[TeamResponse])
+    users_field = create_response_field(name="Response_users", type_=List[UserResponse])
+
+    def teams_before() -> bytes:
+        content = [TeamResponse(
+            id=str(team.id),
+            name=team.name,
+            created=team.created,
+            users=[UserResponse(id=str(user.id), username=user.username) for user in team.users]
+        ) for team in teams]
+        content = loop.run_until_complete(
+            serialize_response(field=teams_field, response_content=content, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    def teams_current() -> bytes:
+        return list_response(TeamResponse, team_rows_payload(team_rows)).body
+
+    def users_before() -> bytes:
+        content = [UserResponse(id=str(user.id), username=user.username, surname=user.surname) for user in users]
+        content = loop.run_until_complete(
+            serialize_response(field=users_field, response_content=content, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    def users_current() -> bytes:
+        return list_response(UserResponse, rows_payload(UserResponse, user_rows)).body
+
+    print(f"{'path':<30} {'per response':>12} {'per item':>10} {'peak alloc':>13} {'size':>12}")
+    for label, render, items in (
+            ("GET /teams/teams", (teams_before, teams_current), len(teams)),
+            ("GET /api/users/", (users_before, users_current), len(users)),
+    ):
+        bench(f"{label} before", render[0], args.repeat, items)
+        settings.trusted_output = False
+        bench(f"{label} validated", render[1], args.repeat, items)
+        settings.trusted_output = True
+        bench(f"{label} trusted", render[1], args.repeat, items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Request throughput with the old BaseHTTPMiddleware logger vs AccessLogMiddleware.
+
+Both variants wrap the same trivial FastAPI app, with SessionMiddleware as
+in app.main, and are driven in-process through httpx's ASGI transport, so
+the numbers isolate middleware and logging overhead. Log records go to a
+stream handler writing to /dev/null.
+
+Usage:
+    python -m benchmarks.middleware_throughput [--requests 5000] [--concurrency 50]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+from fastapi import FastAPI, Request, status
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.responses import JSONResponse
+
+from app.config import AccessLog
+from app.middleware import AccessLogMiddleware
+
+
+def base_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(SessionMiddleware, secret_key="benchmark")
+
+    @app.get("/teams/team/{team_name}")
+    async def team(team_name: str):
+        return {"name": team_name}
+
+    return app
+
+
+def before_app() -> FastAPI:
+    app = base_app()
+    root_logger = logging.getLogger("root_logger")
+
+    @app.middleware("http")
+    async def exception_handling(request: Request, call_next):
+        root_logger.info(
+            f"Url: {request.url}\n"
+            f"Header: {request.headers}\n"
+            f"Method: {request.method}\n"
+            f"Query params: {request.query_params}\n"
+            f"Path params: {request.path_params}\n"
+        )
+        try:
+            return await call_next(request)
+        except Exception as exc:
+            root_logger.error(str(exc), exc_info=True)
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": str(exc)},
+            )
+
+    return app
+
+
+def after_app(sample_rate: float) -> FastAPI:
+    app = base_app()
+    app.add_middleware(AccessLogMiddleware, config=AccessLog(sample_rate=sample_rate))
+    return app
+
+
+async def drive(app: FastAPI, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Cookie": "session=abc", "User-Agent": "benchmark"}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                await client.get("/teams/team/Crew_one?verbose=1")
+
+        await worker(100)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--log-level", default="DEBUG")
+    args = parser.parse_args()
+
+    logging.basicConfig(stream=open(os.devnull, "w"), level=args.log_level)
+
+    variants = {
+        "BaseHTTPMiddleware, log every request": before_app(),
+        "AccessLogMiddleware, sample 100%": after_app(1.0),
+        "AccessLogMiddleware, sample 1%": after_app(0.01),
+    }
+    for label, app in variants.items():
+        throughput = asyncio.run(drive(app, args.requests, args.concurrency))
+        print(f"{label:<40} {throughput:>8.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
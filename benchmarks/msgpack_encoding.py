@@ -0,0 +1,61 @@
+"""
+Payload size and encode/decode time of JSON vs MessagePack list responses.
+
+Renders the GET /teams/teams and GET /api/users/ payloads with the JSON and
+the ``Accept: application/msgpack`` response classes, then decodes them the
+way a Python client would (orjson.loads / app.api.responses.msgpack_loads).
+
+Usage:
+    python -m benchmarks.msgpack_encoding [--teams 2000] [--members 5] [--repeat 20]
+"""
+import argparse
+import time
+from typing import Any, Callable
+
+import orjson
+
+from app.api.responses import list_response, rows_payload, team_rows_payload, msgpack_loads
+from app.constants import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+from app.schemas.team import TeamResponse, UserResponse
+from benchmarks.list_responses import make_rows
+
+
+def timed(call: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    result = call()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=2_000)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    teams, users = make_rows(args.teams, args.members)
+    payloads = {
+        "GET /teams/teams": (TeamResponse, team_rows_payload(
+            (team.id, team.name, team.created, [(user.id, user.username, None) for user in team.users])
+            for team in teams
+        )),
+        "GET /api/users/": (UserResponse, rows_payload(
+            UserResponse, [(user.id, user.username, user.surname) for user in users]
+        )),
+    }
+    decoders = {JSON_MEDIA_TYPE: orjson.loads, MSGPACK_MEDIA_TYPE: msgpack_loads}
+
+    print(f"{'endpoint':<18} {'format':<20} {'size KiB':>9} {'encode ms':>10} {'decode ms':>10}")
+    for endpoint, (model, content) in payloads.items():
+        for media_type, decode in decoders.items():
+            body, encode_ms = timed(lambda: list_response(model, content, media_type).body, args.repeat)
+            _, decode_ms = timed(lambda: decode(body), args.repeat)
+
+            print(f"{endpoint:<18} {media_type:<20} {len(body) / 1024:>9.0f} {encode_ms:>10.2f} {decode_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
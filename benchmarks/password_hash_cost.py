@@ -0,0 +1,87 @@
+"""
+Calibrate the password hash costs on the deployment machine.
+
+Hashes a password with every bcrypt cost in ``--bcrypt-rounds`` and, when
+argon2-cffi is installed, every argon2 time cost in ``--argon2-time-costs``
+at each memory cost in ``--argon2-memory-mib``. Reports the median hash
+time and the logins one core can verify per second, and recommends the
+most expensive setting of each scheme that fits the latency budget.
+
+Usage:
+    python -m benchmarks.password_hash_cost [--target-ms 250] [--repeat 5]
+
+Put the recommended values in BCRYPT_ROUNDS, or PASSWORD_HASH_SCHEME=argon2
+with ARGON2_TIME_COST and ARGON2_MEMORY_COST_KIB. Existing hashes with
+lower costs are upgraded on the users' next login; lowering the costs
+leaves the existing hashes as they are.
+"""
+import argparse
+import statistics
+import time
+
+from passlib.hash import argon2, bcrypt
+
+from app.config import settings
+
+PASSWORD = "correct horse battery staple"
+
+
+def median_ms(handler, repeat: int) -> float:
+    handler.hash(PASSWORD)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        handler.hash(PASSWORD)
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def report(label: str, ms: float, target_ms: float) -> None:
+    fits = "yes" if ms <= target_ms else "no"
+    print(f"{label:<32} {ms:>9.1f} {1000 / ms:>10.1f} {fits:>5}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=settings.password_hashing.target_ms)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--bcrypt-rounds", type=int, nargs="+", default=[10, 11, 12, 13, 14])
+    parser.add_argument("--argon2-time-costs", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--argon2-memory-mib", type=int, nargs="+", default=[19, 46, 64])
+    args = parser.parse_args()
+
+    print(f"{'setting':<32} {'median ms':>9} {'logins/s':>10} {'fits':>5}")
+    recommended = {}
+
+    for rounds in args.bcrypt_rounds:
+        ms = median_ms(bcrypt.using(rounds=rounds), args.repeat)
+        report(f"bcrypt rounds={rounds}", ms, args.target_ms)
+        if ms <= args.target_ms:
+            recommended["bcrypt"] = f"BCRYPT_ROUNDS={rounds}"
+
+    if argon2.has_backend():
+        for memory_mib in args.argon2_memory_mib:
+            for time_cost in args.argon2_time_costs:
+                handler = argon2.using(
+                    rounds=time_cost,
+                    memory_cost=memory_mib * 1024,
+                    parallelism=settings.password_hashing.argon2_parallelism,
+                )
+                ms = median_ms(handler, args.repeat)
+                report(f"argon2 t={time_cost} m={memory_mib}MiB", ms, args.target_ms)
+                # The strongest setting within budget: memory first, then time.
+                if ms <= args.target_ms:
+                    recommended["argon2"] = (
+                        f"PASSWORD_HASH_SCHEME=argon2 ARGON2_TIME_COST={time_cost} "
+                        f"ARGON2_MEMORY_COST_KIB={memory_mib * 1024}"
+                    )
+    else:
+        print("argon2: argon2-cffi is not installed, skipped")
+
+    print(f"\nWithin {args.target_ms:.0f}ms per hash:")
+    for scheme in ("bcrypt", "argon2"):
+        print(f"  {scheme}: {recommended.get(scheme, 'nothing fits, raise --target-ms')}")
+
+
+if __name__ == "__main__":
+    main()
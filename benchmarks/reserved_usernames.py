@@ -0,0 +1,66 @@
+"""
+Reserved username check: the compiled matcher against the old list scan.
+
+The old check rebuilt the reserved list on every call and scanned it
+linearly; the matcher is built once at import and checks a username with
+a few set lookups and one precompiled regular expression. Times both over
+a mix of free, reserved and disguised usernames and reports the time per
+check.
+
+Usage:
+    python -m benchmarks.reserved_usernames [--checks 100000]
+"""
+import argparse
+import time
+
+from app.utils.usernames import RESERVED_USERNAMES_FILE, ReservedNames, reserved_usernames
+
+USERNAMES = ["anna_smith", "john_doe42", "testuser", "admin", "Support_Team", "4dm1n", "mail7", "ｒｏｏｔ", "zebra_crossing"]
+
+
+def legacy_names() -> list[list[str]]:
+    names = [line.strip() for line in RESERVED_USERNAMES_FILE.read_text().split("\n[prefix]")[0].splitlines()]
+    names = [name for name in names if name and not name.startswith("#")]
+    return [names[index:index + 8] for index in range(0, len(names), 8)]
+
+
+def legacy_is_protected(username: str, nested: list[list[str]]) -> bool:
+    # What is_protected_username did per call: flatten, dedupe and scan.
+    usernames = [list(sublist) for sublist in nested]
+    usernames = list(set(item for sublist in usernames for item in sublist))
+    return username.lower() in usernames
+
+
+def per_check_us(check, checks: int) -> float:
+    started = time.perf_counter()
+    for index in range(checks):
+        check(USERNAMES[index % len(USERNAMES)])
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=100_000)
+    args = parser.parse_args()
+
+    nested = legacy_names()
+
+    started = time.perf_counter()
+    ReservedNames.from_file()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    legacy = per_check_us(lambda username: legacy_is_protected(username, nested), args.checks)
+    compiled = per_check_us(reserved_usernames.__contains__, args.checks)
+
+    print(f"matcher build (once, at import): {build_ms:.2f}ms")
+    print(f"{'check':<10} {'us/check':>9}")
+    print(f"{'legacy':<10} {legacy:>9.2f}")
+    print(f"{'compiled':<10} {compiled:>9.2f}")
+    print(f"speedup: {legacy / compiled:.1f}x")
+    print()
+    for username in USERNAMES:
+        print(f"{username:<16} legacy={legacy_is_protected(username, nested)!s:<6} compiled={username in reserved_usernames}")
+
+
+if __name__ == "__main__":
+    main()
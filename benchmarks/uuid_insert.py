@@ -0,0 +1,80 @@
+"""
+Insert benchmark for uuid4 vs UUIDv7 primary keys.
+
+Inserts the same number of rows into two scratch tables shaped like
+service_auth_tokens, one keyed by uuid4 and one by app.utils.ids.uuid7, in
+batches that mimic many small transactions. Reports insert throughput and
+the primary key index size, which is where random keys pay for page splits.
+
+Usage:
+    python -m benchmarks.uuid_insert [--rows 1000000] [--batch 1000] [--dsn postgresql://...]
+
+The DSN defaults to DB_CONFIG from the environment.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import asyncpg
+
+from app.config import config
+from app.utils.ids import uuid7
+from app.utils.auth import utc_now
+
+GENERATORS = {
+    "uuid4": uuid.uuid4,
+    "uuid7": uuid7,
+}
+
+
+async def run(dsn: str, rows: int, batch: int) -> None:
+    connection = await asyncpg.connect(dsn)
+
+    try:
+        print(f"{'key':<6} {'rows/s':>10} {'seconds':>9} {'index MB':>9} {'table MB':>9}")
+
+        for name, generate in GENERATORS.items():
+            table = f"bench_ids_{name}"
+            await connection.execute(f"DROP TABLE IF EXISTS {table}")
+            await connection.execute(
+                f"CREATE UNLOGGED TABLE {table} (id uuid PRIMARY KEY, secret varchar(64), created timestamp)"
+            )
+
+            now = utc_now()
+            started = time.perf_counter()
+
+            for offset in range(0, rows, batch):
+                records = [(generate(), "x" * 43, now) for _ in range(min(batch, rows - offset))]
+                async with connection.transaction():
+                    await connection.executemany(
+                        f"INSERT INTO {table} (id, secret, created) VALUES ($1, $2, $3)", records
+                    )
+
+            elapsed = time.perf_counter() - started
+
+            index_size = await connection.fetchval(f"SELECT pg_relation_size('{table}_pkey')")
+            table_size = await connection.fetchval(f"SELECT pg_relation_size('{table}')")
+
+            print(
+                f"{name:<6} {rows / elapsed:>10.0f} {elapsed:>9.2f} "
+                f"{index_size / 2 ** 20:>9.1f} {table_size / 2 ** 20:>9.1f}"
+            )
+
+            await connection.execute(f"DROP TABLE {table}")
+    finally:
+        await connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    parser.add_argument("--dsn", default=config.DB_CONFIG)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.dsn.replace("+asyncpg", ""), args.rows, args.batch))
+
+
+if __name__ == "__main__":
+    main()
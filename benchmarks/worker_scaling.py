@@ -0,0 +1,108 @@
+"""
+Throughput of the production server (app.server) per number of workers.
+
+For every worker count, starts ``python -m app.server --workers N`` and
+waits for it to answer. Then ``--clients`` load generator processes, each
+with ``--concurrency`` keep-alive connections, hit ``--path`` for
+``--seconds``. Reports requests per second and the median and p99 latency.
+
+The load generators share the machine with the server, so the numbers
+only mean something with more cores than workers plus clients.
+
+Usage:
+    python -m benchmarks.worker_scaling [--workers 1 2 4 8] [--seconds 10] [--clients 2] [--concurrency 32] [--path /]
+
+The servers connect to DB_CONFIG from the environment.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+async def generate_load(url: str, seconds: float, concurrency: int) -> list[float]:
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code < 500:
+                    latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return latencies
+
+
+def client_process(url: str, seconds: float, concurrency: int) -> list[float]:
+    return asyncio.run(generate_load(url, seconds, concurrency))
+
+
+def wait_until_ready(url: str, server: subprocess.Popen, timeout: float = 60.0) -> None:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        time.sleep(0.1)
+
+    raise TimeoutError(f"server not ready within {timeout}s")
+
+
+def measure(url: str, seconds: float, clients: int, concurrency: int) -> tuple[float, float, float]:
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.starmap(client_process, [(url, seconds, concurrency)] * clients)
+
+    latencies = sorted(latency for result in results for latency in result)
+    return (
+        len(latencies) / seconds,
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app.server", "--workers", str(workers), "--port", str(args.port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            env=dict(os.environ, LOG_LEVEL="WARNING"),
+        )
+        try:
+            wait_until_ready(f"http://127.0.0.1:{args.port}/", server)
+            rate, p50, p99 = measure(url, args.seconds, args.clients, args.concurrency)
+            print(f"{workers:>7} {rate:>9.0f} {p50:>8.1f} {p99:>8.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import orjson
+
+from app.services import memory
+
+
+def test_memory_snapshots(admin_client):
+    assert admin_client.post("/api/admin/memory/snapshots").status_code == 400
+
+    response = admin_client.post("/api/admin/memory/start", json={"frames": 1})
+    assert response.json()["tracing"] is True
+
+    try:
+        old = admin_client.post("/api/admin/memory/snapshots").json()["id"]
+        admin_client.get("/api/users/")
+        new = admin_client.post("/api/admin/memory/snapshots").json()["id"]
+
+        status = admin_client.get("/api/admin/memory").json()
+        assert [snapshot["id"] for snapshot in status["snapshots"]][-2:] == [old, new]
+
+        top = admin_client.get(f"/api/admin/memory/snapshots/{new}/top", params={"prefix": "app"}).json()
+        assert top and all(row["module"].startswith("app") for row in top)
+
+        diff = admin_client.get("/api/admin/memory/diff", params={"old": old, "new": new, "depth": 1}).json()
+        assert {"module", "size_diff", "count_diff"} <= set(diff[0])
+
+        assert admin_client.get("/api/admin/memory/snapshots/0/top").status_code == 404
+    finally:
+        assert admin_client.post("/api/admin/memory/stop").json()["tracing"] is False
+
+
+def test_memory_module_name():
+    assert memory.module_name(memory.__file__) == "app.services.memory"
+    assert memory.group_name(memory.__file__, 2) == "app.services"
+
+
+def test_memory_dump(tmp_path):
+    memory.start()
+    try:
+        first = memory.dump(None, tmp_path)
+        memory.dump(first, tmp_path)
+    finally:
+        memory.stop()
+
+    lines = [orjson.loads(line) for line in (tmp_path / "memory.jsonl").read_bytes().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]["diff"] == [] and lines[1]["diff"]
+    assert first.id not in memory.snapshots
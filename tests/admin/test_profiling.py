@@ -0,0 +1,55 @@
+import pstats
+
+from app.services import profiling
+from app.utils import workers
+
+
+def test_profile_header_ignored_for_users(authorized_client):
+    response = authorized_client.get("/api/users/", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert authorized_client.get("/api/admin/profiles").status_code == 401
+
+
+def test_admin_request_profile(admin_client):
+    response = admin_client.get("/api/users/", headers={"X-Profile": "1"})
+    profile_id = response.headers["X-Profile-Id"]
+
+    profiles = admin_client.get("/api/admin/profiles").json()
+    assert profiles[0]["id"] == int(profile_id)
+    assert profiles[0]["path"] == "/api/users/"
+
+    text = admin_client.get(f"/api/admin/profiles/{profile_id}").text
+    assert "function calls" in text
+
+    collapsed = admin_client.get(f"/api/admin/profiles/{profile_id}", params={"format": "collapsed"}).text
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+
+    assert admin_client.get("/api/admin/profiles/0").status_code == 404
+
+
+def test_profiling_window_writes_files(admin_client, tmp_path, monkeypatch):
+    response = admin_client.post("/api/admin/profiling", json={"percent": 100, "seconds": 60})
+    assert response.json()["active"] is True
+    monkeypatch.setattr(profiling.window, "directory", tmp_path)
+
+    admin_client.get("/")
+    admin_client.delete("/api/admin/profiling")
+
+    [stats_file] = tmp_path.glob("*-GET_.pstats")
+    assert stats_file.with_suffix(".collapsed").exists()
+    assert pstats.Stats(str(stats_file)).total_calls > 0
+    assert admin_client.get("/api/admin/profiling").json() == {
+        "active": False, "percent": None, "seconds_left": None, "directory": None,
+    }
+
+
+def test_profiling_needs_a_single_worker(admin_client, monkeypatch):
+    monkeypatch.setattr(workers, "sibling_workers", lambda: True)
+
+    response = admin_client.get("/api/users/", headers={"X-Profile": "1"})
+
+    assert "X-Profile-Id" not in response.headers
+    assert admin_client.get("/api/admin/profiles").status_code == 409
+    assert admin_client.post("/api/admin/memory/start", json={}).status_code == 409
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from app.crud.auth import create_auth_token, get_auth_token_by_secret, create_auth_token_partitions, \
+    drop_expired_auth_token_partitions, partition_name, partition_start
+from app.database import sessionmanager
+from app.models.user import User as DB_User
+from app.utils.auth import utc_now
+
+
+async def list_partitions(test_session) -> set[str]:
+    result = await test_session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'service_auth_tokens'::regclass"
+    ))
+    return set(result.scalars().all())
+
+
+async def test_get_auth_token_by_secret(test_session):
+    user = DB_User(username="testuser", surname="Surname", email="testuser@example.com", created=utc_now())
+    test_session.add(user)
+    await test_session.commit()
+
+    await create_auth_token_partitions(test_session, premake=1)
+    token = await create_auth_token(test_session, user)
+
+    found = await get_auth_token_by_secret(test_session, token.secret)
+
+    assert found is not None
+    assert found.id == token.id
+    assert await get_auth_token_by_secret(test_session, "missing") is None
+
+
+async def test_partitions_are_created_ahead_and_dropped_after_retention(test_session):
+    now = utc_now()
+    old = now - timedelta(days=30)
+
+    created = await create_auth_token_partitions(test_session, now=now, premake=3, interval_days=1)
+    await create_auth_token_partitions(test_session, now=old, premake=0, interval_days=1)
+
+    assert len(created) == 4
+    assert set(created) <= await list_partitions(test_session)
+
+    dropped = await drop_expired_auth_token_partitions(test_session, now=now, retention_days=7, interval_days=1)
+
+    assert dropped == [partition_name(partition_start(old.date(), 1))]
+    partitions = await list_partitions(test_session)
+    assert "service_auth_tokens_default" in partitions
+    assert set(created) <= partitions
+
+
+async def test_new_partition_takes_over_default_partition_rows(test_session):
+    day = utc_now() + timedelta(days=100)
+    await test_session.execute(text(
+        "INSERT INTO service_auth_tokens (secret, expiration, created, id) "
+        "VALUES ('early', :created, :created, gen_random_uuid())"
+    ), {"created": day})
+    await test_session.commit()
+
+    [name] = await create_auth_token_partitions(test_session, now=day, premake=0, interval_days=1)
+
+    assert name in await list_partitions(test_session)
+    assert await test_session.scalar(text(f"SELECT secret FROM {name}")) == "early"
+    assert await test_session.scalar(text("SELECT count(*) FROM service_auth_tokens_default")) == 0
+
+
+async def test_concurrent_maintenance_takes_turns(test_session):
+    now = utc_now() + timedelta(days=200)
+
+    async def maintain():
+        async with sessionmanager.session() as db_session:
+            return await create_auth_token_partitions(db_session, now=now, premake=3, interval_days=1)
+
+    first, second = await asyncio.gather(maintain(), maintain())
+
+    assert first == second
+    assert set(first) <= await list_partitions(test_session)
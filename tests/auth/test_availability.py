@@ -0,0 +1,89 @@
+import pytest
+
+from app.api.dependencies import auth
+from app.crud import user as user_crud
+from app.metrics import availability_checks
+from app.services.availability import AvailabilityIndex
+from app.utils.bloom import BloomFilter
+from app.utils.rate_limit import TokenBucketLimiter
+
+
+@pytest.fixture(autouse=True)
+def limiter(monkeypatch):
+    limiter = TokenBucketLimiter("availability_ip", 1 / 60, 5, 1000)
+    monkeypatch.setattr(auth, "availability_limiter", limiter)
+    return limiter
+
+
+@pytest.fixture
+async def index(monkeypatch):
+    index = AvailabilityIndex()
+    monkeypatch.setattr(user_crud, "availability_index", index)
+    return index
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for number in range(1000):
+        bloom.add(f"user{number}")
+
+    assert all(f"user{number}" in bloom for number in range(1000))
+    assert sum(f"other{number}" in bloom for number in range(10_000)) < 300
+
+
+async def test_free_values_skip_the_database(authorized_client, index):
+    await index.build()
+    filtered = availability_checks.value("username", "filtered")
+
+    response = authorized_client.get("/auth/availability", params={"username": "someone_new"})
+
+    assert response.status_code == 200
+    assert response.json() == {"username": True, "email": None}
+    assert availability_checks.value("username", "filtered") == filtered + 1
+
+
+async def test_taken_values_are_confirmed(authorized_client, index):
+    await index.build()
+    taken = availability_checks.value("email", "taken")
+
+    response = authorized_client.get(
+        "/auth/availability", params={"username": "TeamOwner", "email": "TEAMOWNER@example.com"}
+    )
+
+    assert response.json() == {"username": False, "email": False}
+    assert availability_checks.value("email", "taken") == taken + 1
+
+
+async def test_unbuilt_filter_queries(authorized_client, index):
+    response = authorized_client.get("/auth/availability", params={"username": "teamowner", "email": "free@example.com"})
+
+    assert response.json() == {"username": False, "email": True}
+
+
+async def test_reserved_username_unavailable(client, index):
+    await index.build()
+
+    assert client.get("/auth/availability", params={"username": "admin_1"}).json()["username"] is False
+
+
+async def test_signup_and_delete_update_the_filter(authorized_client, index):
+    await index.build()
+    signup = {"email": "newbie@example.com", "password": "testpassword", "username": "newbie", "surname": "Surname"}
+
+    assert authorized_client.post("/auth/signup", json=signup).status_code == 200
+    assert index.might_be_taken("username", "NEWBIE")
+    assert authorized_client.get("/auth/availability", params={"username": "newbie"}).json()["username"] is False
+
+    assert authorized_client.delete("/api/users/delete/me").status_code == 200
+    assert index.outdated.is_set()
+    assert authorized_client.get("/auth/availability", params={"username": "newbie"}).json()["username"] is True
+
+
+async def test_checks_are_rate_limited_per_ip(client, index):
+    for number in range(5):
+        assert client.get("/auth/availability", params={"email": f"user{number}@example.com"}).status_code == 200
+
+    response = client.get("/auth/availability", params={"email": "user9@example.com"})
+
+    assert response.status_code == 429
+    assert 55 <= int(response.headers["Retry-After"]) <= 60
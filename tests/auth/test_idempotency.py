@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.models import Team, User, idempotency_keys
+from app.services.idempotency import (
+    IdempotencyConflict,
+    IdempotencyStore,
+    StoredResponse,
+    background_tasks,
+    idempotency_store,
+)
+
+SECRET = b"s" * 32
+SIGNUP = {"email": "retry@example.com", "password": "testpassword", "username": "retrying", "surname": "Surname"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    idempotency_store.clear()
+
+
+async def test_signup_retry_is_replayed(client, test_session):
+    headers = {"Idempotency-Key": "signup-1"}
+    first = client.post("/auth/signup", json=SIGNUP, headers=headers)
+    # A retry is sent when the response was lost, the session cookie with it.
+    client.cookies.clear()
+    retry = client.post("/auth/signup", json=SIGNUP, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "set-cookie" in first.headers
+    assert "set-cookie" not in retry.headers
+    assert await test_session.scalar(select(func.count()).select_from(User)) == 1
+
+
+async def test_stored_response_is_encrypted(client, test_session):
+    client.post("/auth/signup", json=SIGNUP, headers={"Idempotency-Key": "signup-4"})
+    await asyncio.sleep(0.1)
+
+    row = (await test_session.execute(select(idempotency_keys.c.headers, idempotency_keys.c.body))).one()
+
+    assert SIGNUP["email"].encode() not in row.body
+    assert "set-cookie" not in {name.lower() for name, _ in row.headers}
+
+
+async def test_replayed_from_the_table(client):
+    headers = {"Idempotency-Key": "signup-2"}
+    first = client.post("/auth/signup", json=SIGNUP, headers=headers)
+    client.cookies.clear()
+    idempotency_store.clear()
+
+    retry = client.post("/auth/signup", json=SIGNUP, headers=headers)
+
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+
+
+def test_key_reused_with_another_body(client):
+    client.post("/auth/signup", json=SIGNUP, headers={"Idempotency-Key": "signup-3"})
+    client.cookies.clear()
+
+    response = client.post("/auth/signup", json={**SIGNUP, "username": "another"}, headers={"Idempotency-Key": "signup-3"})
+
+    assert response.status_code == 422
+
+
+async def test_team_create_retry(authorized_client, test_session):
+    team = {"name": "Crew_one", "usernames": ["teamowner"]}
+    headers = {"Idempotency-Key": "team-1"}
+
+    first = authorized_client.post("/teams/create", json=team, headers=headers)
+    retry = authorized_client.post("/teams/create", json=team, headers=headers)
+    other = authorized_client.post("/teams/create", json=team, headers={"Idempotency-Key": "team-2"})
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert other.status_code == 400
+    assert await test_session.scalar(select(func.count()).select_from(Team)) == 1
+
+
+async def test_key_reused_by_another_client(app, authorized_client, test_session):
+    team = {"name": "Crew_one", "usernames": ["teamowner"]}
+    headers = {"Idempotency-Key": "team-3"}
+    other_client = TestClient(app)
+    other_client.post("/auth/signup", json=SIGNUP)
+
+    first = authorized_client.post("/teams/create", json=team, headers=headers)
+    idempotency_store.clear()
+    reused = other_client.post("/teams/create", json=team, headers=headers)
+
+    assert first.status_code == 200
+    assert reused.status_code == 422
+    assert "Idempotent-Replayed" not in reused.headers
+    assert await test_session.scalar(select(func.count()).select_from(Team)) == 1
+
+
+def stored(fingerprint: str = "f") -> StoredResponse:
+    return StoredResponse(fingerprint, 200, [("content-type", "application/json")], b"{}")
+
+
+async def test_concurrent_duplicates_are_coalesced():
+    store = IdempotencyStore()
+
+    assert await store.begin("/teams/create", "key", "f", SECRET) is None
+    duplicates = [asyncio.create_task(store.begin("/teams/create", "key", "f", SECRET)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert not any(duplicate.done() for duplicate in duplicates)
+
+    await store.complete("/teams/create", "key", stored(), SECRET)
+
+    assert [await duplicate for duplicate in duplicates] == [stored()] * 3
+
+
+async def test_abandoned_key_is_claimed_again():
+    store = IdempotencyStore()
+
+    assert await store.begin("/teams/create", "key", "f", SECRET) is None
+    duplicate = asyncio.create_task(store.begin("/teams/create", "key", "f", SECRET))
+    await asyncio.sleep(0.01)
+
+    await store.abandon("/teams/create", "key")
+
+    assert await duplicate is None
+
+
+async def test_writes_are_held_until_done():
+    store = IdempotencyStore()
+    assert await store.begin("/teams/create", "key", "f", SECRET) is None
+
+    # Not awaited, like by a request that raised or was cancelled.
+    saving = store.complete("/teams/create", "key", stored(), SECRET)
+    assert saving in background_tasks
+
+    await saving
+    assert saving not in background_tasks
+
+
+async def test_key_in_progress_on_another_worker():
+    assert await IdempotencyStore().begin("/teams/create", "key", "f", SECRET) is None
+
+    with pytest.raises(IdempotencyConflict):
+        await IdempotencyStore().begin("/teams/create", "key", "f", SECRET)
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import auth
+from app.config import settings
+from app.main import get_application
+from app.utils.rate_limit import TokenBucketLimiter
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    monkeypatch.setattr(auth, "login_ip_limiter", TokenBucketLimiter("login_ip", 1 / 60, 5, 1000))
+    monkeypatch.setattr(auth, "login_email_limiter", TokenBucketLimiter("login_email", 1 / 60, 2, 1000))
+
+
+async def test_login_throttled_per_email(client, register_user, limiters):
+    login_data = {"email": "testuser@example.com", "password": "wrongpassword"}
+
+    assert client.post("/auth/login", json=login_data).status_code != 429
+    assert client.post("/auth/login", json=login_data).status_code != 429
+
+    response = client.post("/auth/login", json={**login_data, "email": "TestUser@example.com"})
+
+    assert response.status_code == 429
+    assert 55 <= int(response.headers["Retry-After"]) <= 60
+    assert client.post("/auth/login", json={**login_data, "email": "other@example.com"}).status_code != 429
+
+
+async def test_login_throttled_per_ip(client, limiters):
+    for number in range(5):
+        client.post("/auth/login", json={"email": f"user{number}@example.com", "password": "testpassword"})
+
+    response = client.post("/auth/login", json={"email": "user9@example.com", "password": "testpassword"})
+
+    assert response.status_code == 429
+
+
+async def test_login_throttled_per_forwarded_ip(app, limiters, monkeypatch):
+    # The test client connects from "testclient", here a trusted load balancer.
+    monkeypatch.setattr(settings.server, "forwarded_allow_ips", "testclient")
+    proxied = get_application(init_db=False)
+    proxied.dependency_overrides = app.dependency_overrides
+    client = TestClient(proxied)
+
+    def login(client_ip: str, number: int) -> int:
+        return client.post(
+            "/auth/login",
+            json={"email": f"user{number}@example.com", "password": "testpassword"},
+            headers={"X-Forwarded-For": client_ip},
+        ).status_code
+
+    for number in range(5):
+        login("203.0.113.1", number)
+
+    assert login("203.0.113.1", 9) == 429
+    assert login("203.0.113.2", 9) != 429
+
+
+async def test_forwarded_ip_of_untrusted_peer_ignored(client, limiters):
+    for number in range(5):
+        client.post(
+            "/auth/login",
+            json={"email": f"user{number}@example.com", "password": "testpassword"},
+            headers={"X-Forwarded-For": f"203.0.113.{number}"},
+        )
+
+    response = client.post(
+        "/auth/login",
+        json={"email": "user9@example.com", "password": "testpassword"},
+        headers={"X-Forwarded-For": "203.0.113.9"},
+    )
+
+    assert response.status_code == 429
+
+
+def test_bucket_refills(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr("app.utils.rate_limit.time.monotonic", lambda: now)
+    limiter = TokenBucketLimiter("test", rate_per_second=1, burst=2, max_keys=100)
+
+    assert limiter.hit("key") == 0
+    assert limiter.hit("key") == 0
+    assert limiter.hit("key") == pytest.approx(1)
+
+    now += 0.5
+    assert limiter.hit("key") == pytest.approx(0.5)
+
+    now += 0.5
+    assert limiter.hit("key") == 0
+
+
+def test_bucket_eviction_bounds_memory():
+    limiter = TokenBucketLimiter("test", rate_per_second=1, burst=1, max_keys=8, shards=2)
+
+    for number in range(100):
+        limiter.hit(f"key{number}")
+
+    assert sum(len(shard.buckets) for shard in limiter.shards) <= 8
+    assert limiter.size <= 8
@@ -0,0 +1,68 @@
+import pytest
+from passlib.hash import argon2, bcrypt
+from sqlalchemy import select, update
+
+from app.config import PasswordHashing
+from app.metrics import password_rehash
+from app.models.user import User
+from app.utils.auth import password_context
+
+
+async def stored_hash(test_session) -> str:
+    test_session.expire_all()
+    return await test_session.scalar(select(User.hashed_password).where(User.username == "teamowner"))
+
+
+async def test_login_upgrades_outdated_hash(authorized_client, test_session):
+    await test_session.execute(
+        update(User).where(User.username == "teamowner").values(hashed_password=bcrypt.using(rounds=4).hash("testpassword"))
+    )
+    await test_session.commit()
+    before = password_rehash.value()
+
+    response = authorized_client.post("/auth/login", json={"email": "teamowner@example.com", "password": "testpassword"})
+
+    assert response.status_code == 200
+    assert (await stored_hash(test_session)).startswith("$2b$12$")
+    assert password_rehash.value() == before + 1
+
+    authorized_client.post("/auth/login", json={"email": "teamowner@example.com", "password": "testpassword"})
+    assert password_rehash.value() == before + 1
+
+
+async def test_wrong_password_keeps_outdated_hash(authorized_client, test_session):
+    old_hash = bcrypt.using(rounds=4).hash("testpassword")
+    await test_session.execute(update(User).where(User.username == "teamowner").values(hashed_password=old_hash))
+    await test_session.commit()
+
+    response = authorized_client.post("/auth/login", json={"email": "teamowner@example.com", "password": "wrongpassword"})
+
+    assert response.status_code != 200
+    assert await stored_hash(test_session) == old_hash
+
+
+def test_context_flags_lower_costs():
+    context = password_context(PasswordHashing(bcrypt_rounds=5))
+
+    assert context.needs_update(bcrypt.using(rounds=4).hash("password"))
+    assert not context.needs_update(context.hash("password"))
+    assert context.hash("password").startswith("$2b$05$")
+
+
+def test_context_keeps_higher_costs():
+    context = password_context(PasswordHashing(bcrypt_rounds=4))
+    stronger = bcrypt.using(rounds=5).hash("password")
+
+    assert not context.needs_update(stronger)
+    assert context.verify_and_update("password", stronger) == (True, None)
+
+
+def test_context_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        password_context(PasswordHashing(scheme="md5_crypt"))
+
+
+@pytest.mark.skipif(argon2.has_backend(), reason="argon2-cffi is installed")
+def test_argon2_needs_backend():
+    with pytest.raises(RuntimeError):
+        password_context(PasswordHashing(scheme="argon2"))
@@ -7,6 +7,9 @@ from pytest_postgresql.janitor import DatabaseJanitor
 from contextlib import ExitStack
 from fastapi.testclient import TestClient
 
+from sqlalchemy import update
+
+from app.models import User
 from app.models.base import Base
 
 
@@ -102,4 +105,26 @@ async def register_user(client):
     }
 
     response = client.post("/auth/signup", json=signup_data)
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+@pytest.fixture
+async def authorized_client(client):
+    signup_data = {
+        "email": "teamowner@example.com",
+        "password": "testpassword",
+        "username": "teamowner",
+        "surname": "Surname",
+    }
+
+    response = client.post("/auth/signup", json=signup_data)
+    assert response.status_code == 200
+
+    return client
+
+
+@pytest.fixture
+async def admin_client(authorized_client, test_session):
+    await test_session.execute(update(User).where(User.username == "teamowner").values(role="admin"))
+    await test_session.commit()
+
+    return authorized_client
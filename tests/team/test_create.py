@@ -0,0 +1,17 @@
+async def test_create_team(authorized_client):
+    response = authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": ["teamowner"]})
+
+    assert response.status_code == 200
+
+    json_response = response.json()
+    assert json_response["name"] == "Crew_one"
+    assert [user["username"] for user in json_response["users"]] == ["teamowner"]
+
+
+async def test_create_existed_team(authorized_client):
+    authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": []})
+
+    response = authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": []})
+
+    assert response.status_code == 400
+    assert "already exists" in response.json()["detail"]
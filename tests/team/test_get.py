@@ -0,0 +1,60 @@
+from uuid import UUID
+
+import orjson
+
+from app.api.responses import MsgPackResponse, RowsResponse, msgpack_loads
+
+
+async def test_get_team(authorized_client):
+    created = authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": ["teamowner"]}).json()
+
+    response = authorized_client.get("/teams/team/Crew_one")
+
+    assert response.status_code == 200
+    assert response.json() == created
+
+
+async def test_get_all_teams(authorized_client):
+    authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": ["teamowner"]})
+    authorized_client.post("/teams/create", json={"name": "Crew_two", "usernames": []})
+
+    response = authorized_client.get("/teams/teams")
+
+    assert response.status_code == 200
+    assert sorted(team["name"] for team in response.json()) == ["Crew_one", "Crew_two"]
+
+
+async def test_get_all_teams_matches_team_details(authorized_client):
+    authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": ["teamowner"]})
+
+    response = authorized_client.get("/teams/teams")
+
+    assert response.json() == [authorized_client.get("/teams/team/Crew_one").json()]
+
+
+async def test_get_all_teams_msgpack(authorized_client):
+    created = authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": ["teamowner"]}).json()
+
+    response = authorized_client.get("/teams/teams", headers={"Accept": "application/msgpack"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+
+    [team] = msgpack_loads(response.content)
+    assert UUID(bytes=team["id"]) == UUID(created["id"])
+    assert team["name"] == "Crew_one"
+    assert team["created"].isoformat().startswith(created["created"])
+    assert [user["username"] for user in team["users"]] == ["teamowner"]
+
+
+
+def test_rows_response_encodes_uuid_subclasses():
+    # asyncpg returns its own uuid.UUID subclass, for ORM attributes as well.
+    class DriverUUID(UUID):
+        pass
+
+    team_id = DriverUUID(int=1)
+
+    assert orjson.loads(RowsResponse({"id": team_id}).body) == {"id": str(team_id)}
+    assert msgpack_loads(MsgPackResponse({"id": team_id}).body) == {"id": team_id.bytes}
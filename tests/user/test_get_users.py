@@ -0,0 +1,33 @@
+from app.api.responses import msgpack_loads
+from app.config import settings
+
+
+async def test_get_all_users(authorized_client):
+    response = authorized_client.get("/api/users/")
+
+    assert response.status_code == 200
+    assert [(user["username"], user["surname"]) for user in response.json()] == [("teamowner", "Surname")]
+
+
+async def test_get_all_users_validated_output(authorized_client, monkeypatch):
+    trusted = authorized_client.get("/api/users/").json()
+
+    monkeypatch.setattr(settings, "trusted_output", False)
+    response = authorized_client.get("/api/users/")
+
+    assert response.status_code == 200
+    assert response.json() == trusted
+
+
+async def test_user_details_msgpack(authorized_client):
+    response = authorized_client.get("/api/users/me", headers={"Accept": "application/msgpack"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    assert msgpack_loads(response.content)["username"] == "teamowner"
+
+    response = authorized_client.get("/api/users/me")
+
+    assert response.json()["username"] == "teamowner"
+    assert response.headers["vary"] == "Accept"
@@ -0,0 +1,35 @@
+import pytest
+from fastapi import HTTPException
+
+from app.crud.user import create_new_password
+from app.models.user import User
+from app.schemas.user import ResetPasswordArgs
+from app.utils.auth import hash_password, utc_now, verify_password
+
+
+@pytest.fixture
+async def user(test_session) -> User:
+    user = User(
+        username="resetting",
+        surname="Surname",
+        email="resetting@example.com",
+        hashed_password=hash_password("old_password"),
+        created=utc_now(),
+    )
+    test_session.add(user)
+    await test_session.commit()
+    return user
+
+
+async def test_new_password_needs_the_old_one(test_session, user):
+    await create_new_password(test_session, user, ResetPasswordArgs(old_password="old_password", password="new_password"))
+
+    assert verify_password("new_password", user.hashed_password)
+
+
+async def test_wrong_old_password_rejected(test_session, user):
+    with pytest.raises(HTTPException) as error:
+        await create_new_password(test_session, user, ResetPasswordArgs(old_password="wrong_password", password="new_password"))
+
+    assert error.value.status_code == 400
+    assert verify_password("old_password", user.hashed_password)
@@ -0,0 +1,50 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import AccessLog
+from app.middleware import AccessLogMiddleware
+
+
+def make_client(sample_rate: float) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(AccessLogMiddleware, config=AccessLog(sample_rate=sample_rate))
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/broken")
+    async def broken():
+        raise ValueError("broken")
+
+    return TestClient(app)
+
+
+def test_access_log_keeps_only_allowed_headers(caplog):
+    client = make_client(sample_rate=1.0)
+
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        response = client.get("/items/1", headers={"Cookie": "session=secret", "User-Agent": "tests"})
+
+    assert response.status_code == 200
+    [record] = [record for record in caplog.records if record.name == "app.access"]
+    assert record.access["route"] == "/items/{item_id}"
+    assert record.access["status"] == 200
+    assert record.access["headers"]["user-agent"] == "tests"
+    assert "cookie" not in record.access["headers"]
+
+
+def test_access_log_always_logs_errors(caplog):
+    client = make_client(sample_rate=0.0)
+
+    with caplog.at_level(logging.INFO, logger="app.access"):
+        assert client.get("/items/1").status_code == 200
+        response = client.get("/broken")
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "broken"}
+    [record] = [record for record in caplog.records if record.name == "app.access"]
+    assert record.levelno == logging.ERROR
+    assert record.access["sampled"] is False
@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.config import Admission, settings
+from app.metrics import admission_rejected
+from app.middleware import AdmissionControlMiddleware
+from app.utils.admission import ConcurrencyLimiter
+
+
+async def test_limiter_queues_and_hands_over_slots():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, timeout_seconds=1)
+    assert await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    limiter.release()
+
+    assert await waiter
+    assert limiter.active == 1
+
+
+async def test_limiter_sheds_when_queue_full():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=0, timeout_seconds=1)
+    shed = admission_rejected.value("test", "queue_full")
+
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert admission_rejected.value("test", "queue_full") == shed + 1
+
+
+async def test_limiter_times_out_in_queue():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, timeout_seconds=0.01)
+    assert await limiter.acquire()
+
+    assert not await limiter.acquire()
+    assert not limiter._waiters
+
+    limiter.release()
+    assert limiter.active == 0
+
+
+async def test_limiter_cancelled_waiter_returns_handed_over_slot():
+    limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, timeout_seconds=1)
+    assert await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    limiter.release()
+    waiter.cancel()
+    [acquired] = await asyncio.gather(waiter, return_exceptions=True)
+    # Depending on the Python version wait_for either returns the slot or raises.
+    if acquired is True:
+        limiter.release()
+
+    assert limiter.active == 0
+    assert await limiter.acquire()
+
+
+async def test_middleware_sheds_with_retry_after():
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {}
+
+    @app.get("/teams/teams")
+    async def teams():
+        await release.wait()
+        return []
+
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        config=Admission(db_limit=1, db_queue=0, retry_after_seconds=3),
+    )
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        slow = asyncio.create_task(client.get("/teams/teams"))
+        await asyncio.sleep(0.05)
+
+        shed = await client.get("/teams/teams")
+        exempt = await client.get("/")
+
+        release.set()
+        assert (await slow).status_code == 200
+
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "3"
+    assert exempt.status_code == 200
+
+
+def test_hash_paths_are_routes(app):
+    paths = {route.path for route in app.routes}
+
+    assert settings.admission.hash_paths <= paths
@@ -0,0 +1,26 @@
+import asyncio
+import logging
+import time
+
+from app.metrics import event_loop_blocked
+from app.services.event_loop import BlockingDetector
+
+
+def blocking_call():
+    time.sleep(0.3)
+
+
+async def test_blocking_detector_reports_stack(caplog):
+    detector = BlockingDetector(asyncio.get_running_loop(), threshold_ms=50, interval_seconds=0.01)
+    blocked = event_loop_blocked.value()
+
+    with caplog.at_level(logging.WARNING, logger="app.services.event_loop"):
+        detector.start()
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+        detector.stop()
+
+    [record] = [record for record in caplog.records if record.name == "app.services.event_loop"]
+    assert "in blocking_call" in record.stack
+    assert event_loop_blocked.value() == blocked + 1
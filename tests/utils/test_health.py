@@ -0,0 +1,111 @@
+import asyncio
+import signal
+
+import pytest
+
+from app.config import Health
+from app.services import health, warmup
+from app.services.health import DatabaseProbe, install_drain_handler, pool_check
+from app.services.warmup import WarmupStatus
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(health, "draining", False)
+    monkeypatch.setattr(health, "database_probe", DatabaseProbe(ttl_seconds=60, timeout_seconds=1))
+    monkeypatch.setattr(warmup, "status", WarmupStatus(state="done", duration_ms=12.5))
+
+
+def test_healthz(client):
+    response = client.get("/healthz")
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz(client):
+    response = client.get("/readyz")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["database"]["reachable"] is True
+    assert body["warmup"] == {"state": "done", "duration_ms": 12.5}
+    assert body["pool"]["capacity"] > 0
+
+
+def test_readyz_waits_for_warmup(client, monkeypatch):
+    monkeypatch.setattr(warmup, "status", WarmupStatus(state="running"))
+
+    response = client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+
+
+def test_readyz_draining(client, monkeypatch):
+    monkeypatch.setattr(health, "draining", True)
+
+    response = client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "draining"
+    assert response.json()["database"] is None
+
+
+async def test_database_probe_is_cached_and_shared(monkeypatch):
+    probe = DatabaseProbe(ttl_seconds=60, timeout_seconds=1)
+    runs = 0
+    run = probe._run
+
+    async def counted_run():
+        nonlocal runs
+        runs += 1
+        return await run()
+
+    monkeypatch.setattr(probe, "_run", counted_run)
+
+    results = await asyncio.gather(*(probe.check() for _ in range(5)))
+    assert await probe.check() is results[0]
+
+    assert runs == 1
+    assert all(result.reachable for result in results)
+
+
+async def test_database_probe_reports_unreachable(monkeypatch):
+    probe = DatabaseProbe(ttl_seconds=60, timeout_seconds=0.01)
+
+    class SlowConnection:
+        async def __aenter__(self):
+            await asyncio.sleep(1)
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+    monkeypatch.setattr(health.sessionmanager, "connect", SlowConnection)
+
+    result = await probe.check()
+
+    assert result.reachable is False
+    assert "TimeoutError" in result.error
+
+
+def test_pool_saturation():
+    assert pool_check(threshold=0.0).saturated is True
+    assert pool_check(threshold=1.0).saturated is False
+
+
+async def test_drain_handler_delays_shutdown():
+    received = []
+    original = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    try:
+        install_drain_handler(Health(drain_delay_seconds=0.05))
+        signal.raise_signal(signal.SIGTERM)
+
+        assert health.draining is True
+        assert received == []
+
+        await asyncio.sleep(0.1)
+        assert received == [signal.SIGTERM]
+    finally:
+        signal.signal(signal.SIGTERM, original)
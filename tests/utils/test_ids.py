@@ -0,0 +1,20 @@
+import time
+
+from app.utils.ids import uuid7, uuid7_timestamp
+
+
+def test_uuid7_version_and_timestamp():
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+
+    assert value.version == 7
+    assert value.variant == "specified in RFC 4122"
+    assert before <= uuid7_timestamp(value) <= after + 1
+
+
+def test_uuid7_is_monotonic():
+    values = [uuid7() for _ in range(10_000)]
+
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from pathlib import Path
+
+# Cumulative import time of app.main, in microseconds. Measured at ~1.1-1.6 s,
+# most of it in fastapi.openapi.models and sqlalchemy; the headroom is for
+# slow CI machines, a regression past it means something heavy moved to
+# import time.
+IMPORT_BUDGET_US = 3_000_000
+
+CHECK = """
+import sys
+import app.main
+from app.database import sessionmanager
+from app.services.auth import jwt_private_key, jwt_public_key
+
+assert sessionmanager._engine is None, "engine created at import"
+assert "asyncpg" not in sys.modules, "database driver imported at import"
+assert jwt_private_key.cache_info().currsize == 0, "JWT private key read at import"
+assert jwt_public_key.cache_info().currsize == 0, "JWT public key read at import"
+"""
+
+
+def import_times(stderr: str) -> dict[str, int]:
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def test_import_has_no_side_effects_and_fits_budget():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK],
+        cwd=Path(__file__).resolve().parents[2],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    assert import_times(result.stderr)["app.main"] < IMPORT_BUDGET_US
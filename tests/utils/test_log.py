@@ -0,0 +1,33 @@
+import io
+import logging
+import queue
+
+import orjson
+
+from app.log import LogQueueHandler, LogWriter
+
+
+def test_log_writer_writes_json_lines():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    writer = LogWriter(log_queue, stream, batch_size=2)
+
+    logger = logging.getLogger("tests.log_writer")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(LogQueueHandler(log_queue))
+
+    writer.start()
+    logger.info("GET %s", "/teams/teams", extra={"access": {"status": 200}})
+    try:
+        raise ValueError("broken")
+    except ValueError:
+        logger.exception("failed")
+    logger.info("third")
+    writer.stop()
+
+    lines = [orjson.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["GET /teams/teams", "failed", "third"]
+    assert lines[0]["access"] == {"status": 200}
+    assert lines[1]["level"] == "ERROR"
+    assert "ValueError: broken" in lines[1]["exc_info"]
@@ -0,0 +1,60 @@
+import os
+import threading
+
+import pytest
+
+from app.metrics import Counter, Gauge, Histogram, REGISTRY, render_metrics, write_worker_metrics
+
+
+def test_metrics_endpoint(client):
+    client.get("/")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'app_requests_total{route="/",method="GET",status="200"}' in response.text
+    assert 'app_request_duration_seconds_bucket{route="/",method="GET",status="200",le="+Inf"}' in response.text
+    assert "# TYPE app_db_pool_checked_out gauge" in response.text
+
+
+def test_metrics_merge_thread_shards():
+    counter = Counter("test_events_total", "Test events.", ("kind",))
+    histogram = Histogram("test_duration_seconds", "Test durations.", buckets=(0.1, 1.0))
+    REGISTRY.remove(counter)
+    REGISTRY.remove(histogram)
+
+    def record():
+        for value in (0.05, 0.5, 5.0):
+            counter.inc("a")
+            histogram.observe(value)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert list(counter.samples()) == [("test_events_total", '{kind="a"}', 12)]
+    assert counter.value("a") == 12
+    assert counter.value("b") == 0
+    [(labels, counts, total)] = histogram.collect()
+    assert counts == [4, 8, 12]
+    assert total == pytest.approx(4 * 5.55)
+
+
+def test_metrics_add_up_across_workers(tmp_path):
+    counter = Counter("test_worker_events_total", "Test events.", ("kind",))
+    gauge = Gauge("test_worker_connections", "Test connections.")
+    try:
+        counter.inc("a", amount=2)
+        gauge.set(3)
+        # A worker that exited: its counters still count, its gauges are dropped.
+        write_worker_metrics(tmp_path, worker="999999999")
+        rendered = render_metrics(tmp_path)
+    finally:
+        REGISTRY.remove(counter)
+        REGISTRY.remove(gauge)
+
+    assert 'test_worker_events_total{kind="a"} 4' in rendered
+    assert f'test_worker_connections{{worker="{os.getpid()}"}} 3' in rendered
+    assert 'worker="999999999"' not in rendered
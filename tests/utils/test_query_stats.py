@@ -0,0 +1,49 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+
+from app.database import redact_parameters, sessionmanager
+from app.middleware import QueryStatsMiddleware
+from app.models import User
+
+
+def test_query_stats_headers():
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, headers=True)
+
+    @app.get("/users/{username}")
+    async def user(username: str):
+        async with sessionmanager.session() as session:
+            await session.execute(select(User).where(User.username == username))
+            await session.execute(select(User.id).where(User.username == username))
+        return {}
+
+    response = TestClient(app).get("/users/teamowner")
+
+    assert response.headers["X-DB-Queries"] == "2"
+    assert float(response.headers["X-DB-Time"]) > 0
+
+
+def test_query_stats_headers_disabled(client):
+    response = client.get("/")
+
+    assert "X-DB-Queries" not in response.headers
+
+
+async def test_slow_query_log_redacts_parameters(test_session, caplog, monkeypatch):
+    monkeypatch.setattr(sessionmanager, "_slow_query_ms", 0)
+
+    with caplog.at_level(logging.WARNING, logger="app.db"):
+        await test_session.execute(text("SELECT :email"), {"email": "teamowner@example.com"})
+
+    [record] = [record for record in caplog.records if record.name == "app.db"]
+    assert "SELECT" in record.getMessage()
+    assert record.parameters == {"email": "str"}
+    assert "teamowner@example.com" not in str(record.__dict__)
+
+
+def test_redact_parameters():
+    assert redact_parameters(("a", 1)) == ["str", "int"]
+    assert redact_parameters([{"a": 1}, {"a": 2}]) == [{"a": "int"}, {"a": "int"}]
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from app import server
+from app.config import Server, settings
+from app.database import worker_pool_size
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4, 8, 80, 200])
+def test_worker_pools_fit_connection_budget(workers):
+    config = Server(workers=workers, db_connection_budget=80, db_overflow_share=0.25)
+    pool_size, max_overflow = worker_pool_size(config)
+
+    assert pool_size >= 1
+    if workers <= 80:
+        assert workers * (pool_size + max_overflow) <= 80
+
+
+def test_worker_pool_size_split():
+    assert worker_pool_size(Server(workers=4, db_connection_budget=80, db_overflow_share=0.25)) == (15, 5)
+    assert worker_pool_size(Server(workers=1, db_connection_budget=80, db_overflow_share=0)) == (80, 0)
+
+
+def test_server_main(monkeypatch):
+    calls = []
+    monkeypatch.setattr(server.uvicorn, "run", lambda target, **kwargs: calls.append((target, kwargs)))
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    monkeypatch.setattr(settings.server, "workers", settings.server.workers)
+
+    server.main(["--workers", "4", "--port", "9000"])
+
+    [(target, kwargs)] = calls
+    assert target == "app.main:get_application"
+    assert kwargs["factory"] is True
+    assert kwargs["workers"] == 4
+    assert kwargs["port"] == 9000
+    assert kwargs["timeout_graceful_shutdown"] == settings.server.graceful_timeout_seconds
+    assert os.environ["WEB_CONCURRENCY"] == "4"
+    assert settings.server.workers == 4
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import inspect
+
+from app.crud.team import get_team
+from app.metrics import single_flight_calls
+from app.utils.single_flight import SingleFlight
+
+
+class Load:
+    def __init__(self, result="row", error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.runs = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.runs += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def test_concurrent_calls_share_one_load():
+    flight = SingleFlight("test_share")
+    load = Load()
+
+    callers = [asyncio.create_task(flight.do("key", load)) for _ in range(5)]
+    other = asyncio.create_task(flight.do("other", load))
+    await asyncio.sleep(0)
+    load.release.set()
+
+    assert await asyncio.gather(*callers, other) == ["row"] * 6
+    assert load.runs == 2
+    assert single_flight_calls.value("test_share", "leader") == 2
+    assert single_flight_calls.value("test_share", "coalesced") == 4
+    assert flight.calls == {}
+
+
+async def test_errors_are_shared():
+    flight = SingleFlight("test_errors")
+    load = Load(error=HTTPException(status_code=404))
+
+    callers = [asyncio.create_task(flight.do("key", load)) for _ in range(3)]
+    await asyncio.sleep(0)
+    load.release.set()
+
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    assert all(isinstance(result, HTTPException) for result in results)
+    assert load.runs == 1
+
+
+async def test_cancelled_waiter_does_not_cancel_the_others():
+    flight = SingleFlight("test_cancel_waiter")
+    load = Load()
+
+    leader = asyncio.create_task(flight.do("key", load))
+    waiters = [asyncio.create_task(flight.do("key", load)) for _ in range(2)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    load.release.set()
+
+    assert await leader == "row"
+    assert await waiters[1] == "row"
+    assert waiters[0].cancelled()
+    assert load.runs == 1
+
+
+async def test_waiter_takes_over_from_a_cancelled_leader():
+    flight = SingleFlight("test_cancel_leader")
+    load = Load()
+
+    leader = asyncio.create_task(flight.do("key", load))
+    waiter = asyncio.create_task(flight.do("key", load))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    load.release.set()
+
+    assert await waiter == "row"
+    assert leader.cancelled()
+    assert load.runs == 2
+    assert single_flight_calls.value("test_cancel_leader", "cancelled") == 1
+    assert flight.calls == {}
+
+
+async def test_get_team_is_coalesced(authorized_client, test_session):
+    authorized_client.post("/teams/create", json={"name": "Crew_one", "usernames": ["teamowner"]})
+    leaders = single_flight_calls.value("get_team", "leader")
+
+    teams = await asyncio.gather(*(get_team(test_session, "Crew_one") for _ in range(5)))
+
+    assert all(team is teams[0] for team in teams)
+    # Loaded in the caller's session, without a connection of its own.
+    assert inspect(teams[0]).session is test_session.sync_session
+    assert [user.username for user in teams[0].users] == ["teamowner"]
+    assert single_flight_calls.value("get_team", "leader") == leaders + 1
+    with pytest.raises(HTTPException):
+        await get_team(test_session, "missing")
@@ -0,0 +1,41 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.metrics import phase_duration
+from app.middleware import ServerTimingMiddleware, TimedSessionMiddleware
+from app.utils.timing import phase, request_timings, timed
+
+
+@timed("crud")
+async def load():
+    with phase("user"):
+        return "loaded"
+
+
+def test_server_timing_header():
+    app = FastAPI()
+    app.add_middleware(TimedSessionMiddleware, secret_key="tests")
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int, request: Request):
+        request.session["item"] = item_id
+        with phase("jwt"):
+            pass
+        return {"value": await load()}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    response = client.get("/items/2")
+
+    metrics = dict(entry.split(";dur=") for entry in response.headers["Server-Timing"].split(", "))
+    assert set(metrics) == {"session", "jwt", "crud", "total"}
+    assert all(float(duration) >= 0 for duration in metrics.values())
+
+    observed = {labels: counts[-1] for labels, counts, _ in phase_duration.collect()}
+    assert observed[("/items/{item_id}", "crud")] >= 2
+
+
+async def test_phase_without_request_is_noop():
+    assert await load() == "loaded"
+    assert request_timings.get() is None
@@ -0,0 +1,66 @@
+import os
+
+import orjson
+import pytest
+
+from app.config import Tracing, settings
+from app.utils import tracing, workers
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.setup_tracing(Tracing(path=path))
+    yield path
+    tracing.shutdown_tracing()
+
+
+def read_spans(path) -> list[dict]:
+    return [
+        span
+        for line in path.read_bytes().splitlines()
+        for span in orjson.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    ]
+
+
+@pytest.fixture
+def sample_all(monkeypatch):
+    monkeypatch.setattr(settings.tracing, "sample_rate", 1.0)
+
+
+def test_request_trace(authorized_client, trace_file, sample_all):
+    authorized_client.get("/teams/teams")
+    tracing.shutdown_tracing()
+
+    [trace_id] = {span["traceId"] for span in read_spans(trace_file) if span["name"] == "GET /teams/teams"}
+    spans = {span["name"]: span for span in read_spans(trace_file) if span["traceId"] == trace_id}
+    root = spans["GET /teams/teams"]
+    assert root["parentSpanId"] == ""
+    assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+    user = spans["app.api.dependencies.user.get_current_user"]
+    assert user["parentSpanId"] == root["spanId"]
+    token_payload = spans["app.services.auth.get_email_from_token_payload"]
+    assert spans["app.services.auth.decode_jwt"]["parentSpanId"] == token_payload["spanId"]
+    assert spans["app.crud.team.get_all_team_rows"]["parentSpanId"] == root["spanId"]
+    assert spans["SELECT"]["kind"] == tracing.SPAN_KIND_CLIENT
+
+
+def test_traceparent_continues_trace():
+    root = tracing.start_trace("GET /", 0.0, "00-" + "a" * 32 + "-" + "b" * 16 + "-01")
+
+    assert root.trace.trace_id == "a" * 32
+    assert root.parent_span_id == "b" * 16
+    assert tracing.start_trace("GET /", 0.0, "00-" + "a" * 32 + "-" + "b" * 16 + "-00") is None
+    assert tracing.start_trace("GET /", 0.0) is None
+
+
+def test_workers_write_their_own_trace_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(workers, "sibling_workers", lambda: True)
+    tracing.setup_tracing(Tracing(path=tmp_path / "traces.jsonl"))
+    try:
+        tracing.export(tracing.Trace("0" * 32))
+    finally:
+        tracing.shutdown_tracing()
+
+    assert [path.name for path in tmp_path.iterdir()] == [f"traces-{os.getpid()}.jsonl"]
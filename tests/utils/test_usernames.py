@@ -0,0 +1,34 @@
+import pytest
+
+from app.utils.auth import is_protected_username
+from app.utils.usernames import ReservedNames, normalize_username
+
+
+@pytest.mark.parametrize("username", [
+    "admin", "Admin", "admin1", "admin_01", "mail42", "support_team", "siteadmin", "4dm1n", "r00t", "he1p",
+    "a_d_m_i_n", "ádmin", "ＡＤＭＩＮ", "аdmin", "ѕupport",
+])
+def test_reserved(username):
+    assert is_protected_username(username)
+
+
+@pytest.mark.parametrize("username", ["testuser", "testuser2", "teamowner", "anna_smith", "mailman", "robert", "helpful"])
+def test_not_reserved(username):
+    assert not is_protected_username(username)
+
+
+def test_normalize_username():
+    assert normalize_username("Ｓúрроrt_Team") == "supportteam"
+
+
+def test_load_sections(tmp_path):
+    path = tmp_path / "reserved.txt"
+    path.write_text("# comment\nroot\n\n[prefix]\nstaff  # staff_anything\n[suffix]\nbot\n")
+
+    names = ReservedNames.from_file(path)
+
+    assert "root7" in names
+    assert "staffing" in names
+    assert "chatbot" in names
+    assert "rooted" not in names
+    assert "bottle" not in names
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from app.config import Warmup
+from app.database import sessionmanager
+from app.services import warmup
+from app.services.warmup import WarmupStatus, run_warmup
+
+
+@pytest.fixture(autouse=True)
+def status(monkeypatch):
+    monkeypatch.setattr(warmup, "status", WarmupStatus())
+
+
+async def test_warmup_opens_connections():
+    await sessionmanager._engine.dispose()
+
+    status = await run_warmup(pool_size=5, config=Warmup(connections=3))
+
+    assert status.state == "done"
+    assert status.connections == 3
+    assert status.duration_ms > 0
+    assert sessionmanager.pool_status()["checked_in"] == 3
+
+
+async def test_warmup_connections_capped_at_pool_size():
+    status = await run_warmup(pool_size=2, config=Warmup(connections=10))
+
+    assert status.state == "done"
+    assert status.connections == 2
+
+
+async def test_warmup_failure_does_not_stop_startup(monkeypatch):
+    async def slow_warm_up(connections):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(warmup, "warm_up", slow_warm_up)
+
+    status = await run_warmup(pool_size=5, config=Warmup(timeout_seconds=0.01))
+
+    assert status.state == "failed"
+    assert "TimeoutError" in status.error
+
+
+async def test_warmup_disabled():
+    status = await run_warmup(pool_size=5, config=Warmup(enabled=False))
+
+    assert status.state == "done"
+    assert status.connections == 0
+
+
+async def test_failed_connection_releases_the_others(monkeypatch):
+    session = sessionmanager.session
+    opened = 0
+
+    def failing_second_session():
+        nonlocal opened
+        opened += 1
+        if opened == 2:
+            raise ConnectionError("refused")
+        return session()
+
+    monkeypatch.setattr(warmup.sessionmanager, "session", failing_second_session)
+
+    status = await run_warmup(pool_size=5, config=Warmup(connections=3, timeout_seconds=5))
+
+    assert status.state == "failed"
+    assert "ConnectionError" in status.error
+    assert status.duration_ms < 2000
+    # The connections that were opened are not left checked out at the barrier.
+    await asyncio.sleep(0.1)
+    assert sessionmanager.pool_status()["checked_out"] == 0